@@ -0,0 +1,149 @@
+import asyncio, logging, time
+from concurrent.futures import ThreadPoolExecutor
+
+# Maximum number of samples of the requests run together in one handle call.
+DEFAULT_MAX_BATCH_SIZE = 32
+
+# Milliseconds the first request of a batch waits for other requests to join it.
+DEFAULT_MAX_BATCH_DELAY_MS = 5
+
+
+class BatchScheduler:
+    """
+    Coalesces the concurrent requests of a handler into batches, so the model runs once per batch
+    rather than once per request. A batch is formed from the queued requests until it holds
+    max_batch_size samples or its first request has waited max_batch_delay_ms, then the samples of
+    all its requests are handled in one call and the outputs are scattered back to the requests.
+
+    Handlers are run on a single thread, one batch at a time, so the event loop keeps accepting
+    requests meanwhile. Handlers must return one output per sample to be batched, batches whose
+    output doesn't match their samples are handled again request by request.
+    """
+
+    def __init__(self, handle, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_batch_delay_ms=DEFAULT_MAX_BATCH_DELAY_MS, metrics=None):
+        """
+        PARAMETERS
+        ----
+        handle: callable taking the list of samples of a batch and returning the list of their outputs
+        max_batch_size: int, maximum number of samples of a batch, larger requests are handled alone
+        max_batch_delay_ms: float, milliseconds a request waits for others to join its batch
+        metrics: MetricAggregator recording the BatchSize, BatchRequests and QueueWait histograms, optional
+        """
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size should be at least 1')
+        if max_batch_delay_ms < 0:
+            raise ValueError('max_batch_delay_ms should not be negative')
+        self._handle = handle
+        self._max_batch_size = max_batch_size
+        self._max_batch_delay = max_batch_delay_ms / 1000
+        self._metrics = metrics
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='handle_batch')
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, data):
+        """
+        Queues the samples of a request and returns their outputs once its batch is handled.
+        """
+        loop = asyncio.get_running_loop()
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        self._queue.put_nowait((list(data), future, time.monotonic()))
+        return await future
+
+    def close(self):
+        """
+        Stops forming batches and the handler thread, the queued requests are cancelled.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            while not self._queue.empty():
+                self._queue.get_nowait()[1].cancel()
+        self._executor.shutdown(wait=False)
+
+    async def _run(self):
+        """
+        Forms and handles batches as long as the scheduler is open.
+        """
+        carried = None
+        while True:
+            batch = [carried if carried is not None else await self._queue.get()]
+            carried = await self._fill(batch)
+            await self._handle_batch(batch)
+
+    async def _fill(self, batch):
+        """
+        Adds queued requests to a batch until it is full or its delay expired. Returns the request that
+        would have exceeded the batch size, which starts the next batch, if any.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_batch_delay
+        size = len(batch[0][0])
+        while size < self._max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    return None
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+            if size + len(item[0]) > self._max_batch_size:
+                return item
+            batch.append(item)
+            size += len(item[0])
+        return None
+
+    async def _handle_batch(self, batch, record=True):
+        """
+        Handles the samples of a batch in one call and scatters the outputs to its requests.
+        """
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+        samples = [sample for data, _, _ in batch for sample in data]
+        started = time.monotonic()
+        if record and self._metrics is not None:
+            self._metrics.record("BatchSize", len(samples))
+            self._metrics.record("BatchRequests", len(batch))
+            for _, _, queued in batch:
+                self._metrics.record("QueueWait", round((started - queued) * 1000, 3))
+
+        loop = asyncio.get_running_loop()
+        try:
+            outputs = await loop.run_in_executor(self._executor, self._handle, samples)
+        except Exception as e:
+            if len(batch) == 1:
+                self._set_exception(batch[0][1], e)
+                return
+            # A failing sample fails its own request only.
+            outputs = None
+        if len(batch) == 1:
+            self._set_result(batch[0][1], outputs)
+            return
+        if outputs is None or not isinstance(outputs, list) or len(outputs) != len(samples):
+            if outputs is not None:
+                logging.warning('Handler returned %s outputs for %d samples, handling the requests one by one',
+                                len(outputs) if isinstance(outputs, list) else 'no list of', len(samples))
+            for item in batch:
+                await self._handle_batch([item], record=False)
+            return
+        offset = 0
+        for data, future, _ in batch:
+            self._set_result(future, outputs[offset:offset + len(data)])
+            offset += len(data)
+
+    @staticmethod
+    def _set_result(future, result):
+        # The request may have been cancelled meanwhile, e.g., its client disconnected.
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future, exception):
+        if not future.done():
+            future.set_exception(exception)
@@ -1,19 +1,24 @@
 import os, tempfile
 from fastapi import FastAPI
+from batching import BatchScheduler, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_BATCH_DELAY_MS
 from models import Request
 from ts.context import Context
 from util import build_context, get_torch_handler
 from ntcore import Client
-from ntcore.monitor import Monitor, SystemMetricsPublisherDaemon
+from ntcore.monitor import Monitor, MetricAggregator, SystemMetricsPublisherDaemon
 import time
 
 # Config the enviroment
 workspace_id = os.environ["DSP_WORKSPACE_ID"]
 model_dir = tempfile.TemporaryDirectory()
+max_batch_size = int(os.environ.get("DSP_MAX_BATCH_SIZE", DEFAULT_MAX_BATCH_SIZE))
+max_batch_delay_ms = float(os.environ.get("DSP_MAX_BATCH_DELAY_MS", DEFAULT_MAX_BATCH_DELAY_MS))
 
 # Initialize NTCore client.
-client = Client(server="http://" + os.environ["DSP_API_ENDPOINT"])
-monitor = Monitor(workspace_id, server="http://" + os.environ["DSP_MONITORING_ENDPOINT"])
+client = Client(server="http://" + os.environ["DSP_API_ENDPOINT"], model_cache_dir=os.environ.get("DSP_MODEL_CACHE_DIR"))
+# Metric lines are buffered off the request path and posted together by the monitor's flush thread.
+monitor = Monitor(workspace_id, server="http://" + os.environ["DSP_MONITORING_ENDPOINT"], buffered=True)
+service_metrics = MetricAggregator(monitor)
 
 # Download serialized model
 client.download_model(os.path.join(model_dir.name, "model.pt"), workspace_id)
@@ -21,8 +26,9 @@ client.download_model(os.path.join(model_dir.name, "model.pt"), workspace_id)
 # Build inference context.
 context: Context = build_context(workspace_id, model_dir.name, "model.pt")
 
-# Initialize torch handler cache
+# Initialize torch handler cache, with the batch scheduler of every handler.
 torch_handlers = dict()
+batch_schedulers = dict()
 
 # Initialize Fast API server.
 app = FastAPI()
@@ -32,27 +38,40 @@ system_metrics_daemon = SystemMetricsPublisherDaemon(monitor)
 system_metrics_daemon.start()
 
 
+@app.on_event("shutdown")
+def shutdown():
+    """
+    Stops the batch schedulers and flushes the aggregated and buffered metrics before the server exits.
+    """
+    for batch_scheduler in batch_schedulers.values():
+        batch_scheduler.close()
+    service_metrics.close()
+    monitor.close()
+
+
 @app.post('/predict')
 async def predict(request: Request):
     """
     Returns predictions based on the input data and selected torch handler.
+    Concurrent requests of a handler are handled together in batches.
     """
     if (request.handler not in torch_handlers):
         torch_handler = get_torch_handler(request.handler)
         torch_handler.initialize(context)
         torch_handlers[request.handler] = torch_handler
-    else:
-        torch_handler = torch_handlers[request.handler]
+        batch_schedulers[request.handler] = BatchScheduler(
+            lambda data, torch_handler=torch_handler: torch_handler.handle(data, context),
+            max_batch_size, max_batch_delay_ms, service_metrics)
 
     start_time = round(time.time() * 1000)
     try:
-        prediction = torch_handler.handle(request.data, context)
-        monitor.add_metric("Success", 1.0)
+        prediction = await batch_schedulers[request.handler].submit(request.data)
+        service_metrics.increment("Success")
     except Exception as e:
         monitor.log("[Error] Unable to generate prediction: {0}".format(str(e)))
-        monitor.add_metric("Error", 1.0)
+        service_metrics.increment("Error")
     finally:
-        monitor.add_metric("Latency", round(time.time() * 1000) - start_time)
+        service_metrics.record("Latency", round(time.time() * 1000) - start_time)
 
     return prediction
 
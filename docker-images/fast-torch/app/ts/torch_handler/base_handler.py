@@ -10,7 +10,9 @@ import importlib.util
 import time
 import torch
 from torch.profiler import profile, record_function, ProfilerActivity
+from ntcore.libs import tensor_file
 from ..utils.util import list_classes_from_module, load_label_mapping
+from ..utils.onnx_runtime import OnnxModel, is_onnx_file
 
 
 logger = logging.getLogger(__name__)
@@ -82,10 +84,15 @@ class BaseHandler(abc.ABC):
             if not os.path.isfile(model_pt_path):
                 raise RuntimeError("Missing the model.pt file")
 
-            self.model = self._load_torchscript_model(model_pt_path)
+            if tensor_file.is_tensor_file(model_pt_path):
+                self.model = self._load_mapped_model(model_pt_path)
+            elif is_onnx_file(model_pt_path):
+                self.model = self._load_onnx_model(model_pt_path)
+            else:
+                self.model = self._load_torchscript_model(model_pt_path)
 
         self.model.eval()
-        if ipex_enabled:
+        if ipex_enabled and not isinstance(self.model, OnnxModel):
             self.model = self.model.to(memory_format=torch.channels_last)
             self.model = ipex.optimize(self.model)
 
@@ -108,6 +115,31 @@ class BaseHandler(abc.ABC):
         """
         return torch.jit.load(model_pt_path, map_location=self.device)
 
+    def _load_mapped_model(self, model_pt_path):
+        """Loads a model saved as a tensor file by the ntcore TorchModelSerializer.
+        The weights are read-only views of a memory mapping of the file, so the workers
+        serving the same file share its pages instead of each holding a copy.
+
+        Args:
+            model_pt_path (str): denotes the path of the tensor file.
+
+        Returns:
+            (NN Model Object) : Loads the model object.
+        """
+        return tensor_file.load_module(model_pt_path).to(self.device)
+
+    def _load_onnx_model(self, model_pt_path):
+        """Loads an ONNX model in an ONNX Runtime session with tuned session options,
+        see ts.utils.onnx_runtime. The session is called like a torch module.
+
+        Args:
+            model_pt_path (str): denotes the path of the ONNX model file.
+
+        Returns:
+            (OnnxModel) : Loads the model object.
+        """
+        return OnnxModel(model_pt_path, self.device)
+
     def _load_pickled_model(self, model_dir, model_file, model_pt_path):
         """
         Loads the pickle file from the given model path.
@@ -140,7 +172,14 @@ class BaseHandler(abc.ABC):
 
         model_class = model_class_definitions[0]
         model = model_class()
-        if model_pt_path:
+        if model_pt_path and tensor_file.is_tensor_file(model_pt_path):
+            state_dict = tensor_file.load_state_dict(model_pt_path)
+            try:
+                # Assigning keeps the parameters mapped rather than copying them into the model's.
+                model.load_state_dict(state_dict, assign=True)
+            except TypeError:
+                model.load_state_dict(state_dict)
+        elif model_pt_path:
             state_dict = torch.load(model_pt_path, map_location=self.device)
             model.load_state_dict(state_dict)
         return model
@@ -0,0 +1,102 @@
+"""
+ONNX Runtime backend, running ONNX models behind the torch handlers
+"""
+import logging
+import os
+import numpy as np
+import psutil
+import torch
+
+logger = logging.getLogger(__name__)
+
+# First byte of an ONNX model: the tag of ModelProto.ir_version, its first serialized field.
+ONNX_FIRST_BYTE = b'\x08'
+
+# Graph optimization levels by the value of TS_ORT_GRAPH_OPTIMIZATION.
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+# NumPy dtypes of the ONNX tensor types, inputs are cast to them.
+ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(float16)": np.float16,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(int8)": np.int8,
+    "tensor(uint8)": np.uint8,
+    "tensor(bool)": np.bool_,
+}
+
+
+def is_onnx_file(path):
+    """
+    Returns whether a file is an ONNX model rather than a TorchScript archive or a pickle,
+    which start with a zip header and a pickle opcode respectively.
+    """
+    with open(path, "rb") as f:
+        return f.read(1) == ONNX_FIRST_BYTE
+
+
+def session_options():
+    """
+    Returns the ONNX Runtime session options tuned for CPU serving, overridden by the
+    TS_ORT_GRAPH_OPTIMIZATION, TS_ORT_INTRA_OP_THREADS, TS_ORT_INTER_OP_THREADS and
+    TS_ORT_OPTIMIZED_MODEL_PATH environment variables.
+
+    The graph is fully optimized, operators run sequentially with one thread per physical
+    core, as hyper-threads mostly contend for the same execution units in dense kernels.
+    """
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    level = os.environ.get("TS_ORT_GRAPH_OPTIMIZATION", "all")
+    options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[level])
+    options.intra_op_num_threads = int(os.environ.get(
+        "TS_ORT_INTRA_OP_THREADS", psutil.cpu_count(logical=False) or os.cpu_count() or 1))
+    inter_op_threads = int(os.environ.get("TS_ORT_INTER_OP_THREADS", 1))
+    options.inter_op_num_threads = inter_op_threads
+    # Independent branches of the graph only run concurrently in parallel mode.
+    options.execution_mode = ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1 else ort.ExecutionMode.ORT_SEQUENTIAL
+    # Saving the optimized graph lets the next workers skip the optimization on load.
+    if os.environ.get("TS_ORT_OPTIMIZED_MODEL_PATH"):
+        options.optimized_model_filepath = os.environ["TS_ORT_OPTIMIZED_MODEL_PATH"]
+    return options
+
+
+class OnnxModel:
+    """
+    ONNX Runtime session called like a torch module: it takes and returns torch tensors,
+    so the handlers preprocess and postprocess ONNX models as they do TorchScript ones.
+    """
+
+    def __init__(self, model_path, device):
+        import onnxruntime as ort
+        providers = ["CPUExecutionProvider"]
+        if device.type == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, ("CUDAExecutionProvider", {"device_id": device.index or 0}))
+        self.session = ort.InferenceSession(model_path, sess_options=session_options(), providers=providers)
+        self.inputs = self.session.get_inputs()
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        logger.info("ONNX model loaded with providers %s", self.session.get_providers())
+
+    def __call__(self, *args):
+        if len(args) != len(self.inputs):
+            raise ValueError("Expected {} inputs, got {}".format(len(self.inputs), len(args)))
+        feed = {}
+        for node, value in zip(self.inputs, args):
+            array = value.detach().cpu().numpy() if isinstance(value, torch.Tensor) else np.asarray(value)
+            dtype = ONNX_DTYPES.get(node.type)
+            feed[node.name] = array.astype(dtype, copy=False) if dtype is not None else array
+        outputs = [torch.from_numpy(np.asarray(output)) for output in self.session.run(self.output_names, feed)]
+        return outputs[0] if len(outputs) == 1 else tuple(outputs)
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        # The session runs on the providers chosen at load time.
+        return self
@@ -1,6 +1,7 @@
-import logging, tarfile, os
+import logging, os
 from pathlib import Path
 from ntcore import Client
+from ntcore.libs.archive import extract_tar
 import proxy
 
 def download_model():
@@ -12,7 +13,8 @@ def download_model():
     api_endpoint = os.environ["DSP_API_ENDPOINT"]
     # Initialize ntcore client with given server url
     ntcore_server = api_endpoint if api_endpoint.startswith("http://") else "http://" + api_endpoint
-    ntcore_client = Client(server=ntcore_server)
+    # Models are cached across container starts if a host directory is mounted at DSP_MODEL_CACHE_DIR
+    ntcore_client = Client(server=ntcore_server, model_cache_dir=os.environ.get("DSP_MODEL_CACHE_DIR"))
 
     try:
         extract_path = os.path.join("/models", workspace_id)
@@ -20,9 +22,8 @@ def download_model():
         Path(extract_path).mkdir(parents=True, exist_ok=True)
         # download model from ntcore
         ntcore_client.download_model(model_path, workspace_id)
-        # Unzip the file to get the original saved model
-        with tarfile.open(model_path, "r:gz") as tar:
-            tar.extractall(extract_path)
+        # Extract the gzip or zstd archive to get the original saved model
+        extract_tar(model_path, extract_path)
         # Remove the binary model file
         os.remove(model_path)
         # tensorflow-serving requires version in number format
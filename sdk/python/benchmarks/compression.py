@@ -0,0 +1,63 @@
+'''
+Reports the bytes saved against the CPU time of request body compression per encoding and level.
+
+    python benchmarks/compression.py [--rows 2000] [--runs 10]
+
+The body is a ground truth upload of tabular input data, as sent to monitoring/performances.
+The CPU time is the median over the runs of compressing the body once. zstd levels are skipped
+if zstandard is not installed.
+'''
+import argparse, json, os, random, statistics, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ntcore.resources.compression import GZIP, ZSTD, compress
+
+LEVELS = [(GZIP, 1), (GZIP, 6), (GZIP, 9), (ZSTD, 1), (ZSTD, 3), (ZSTD, 9)]
+
+
+def body(rows):
+    '''
+    Returns the JSON body of a ground truth upload with the given number of input rows.
+    '''
+    generator = random.Random(0)
+    data = [dict(age=generator.randint(18, 90), income=round(generator.uniform(1e4, 1e5), 2), segment=generator.choice('ABC'))
+            for _ in range(rows)]
+    return json.dumps(dict(workspaceId='C123', inputData=json.dumps(data), groundTruth='1')).encode('utf-8')
+
+
+def measure(data, encoding, level, runs):
+    '''
+    Returns the compressed size in bytes and the median CPU milliseconds of compressing the body.
+    '''
+    times = []
+    for _ in range(runs):
+        start = time.process_time()
+        compressed = compress(data, encoding, level)
+        times.append((time.process_time() - start) * 1000)
+    return len(compressed), statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="number of input data rows of the body")
+    parser.add_argument("--runs", type=int, default=10, help="number of times each level compresses the body")
+    args = parser.parse_args()
+    try:
+        import zstandard
+    except ImportError:
+        zstandard = None
+
+    data = body(args.rows)
+    print("{:<8} {:>6} {:>10} {:>8} {:>8}".format("encoding", "level", "bytes", "saved", "cpu ms"))
+    print("{:<8} {:>6} {:>10} {:>8} {:>8}".format("identity", "-", len(data), "-", "-"))
+    for encoding, level in LEVELS:
+        if encoding == ZSTD and zstandard is None:
+            continue
+        size, cpu = measure(data, encoding, level, args.runs)
+        print("{:<8} {:>6} {:>10} {:>8.1%} {:>8.2f}".format(encoding, level, size, 1 - size / len(data), cpu))
+
+
+if __name__ == "__main__":
+    main()
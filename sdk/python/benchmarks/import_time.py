@@ -0,0 +1,55 @@
+'''
+Reports the import cost of the ntcore entry points in fresh interpreters.
+
+    python benchmarks/import_time.py [--runs 10] [--budget ntcore=50 --budget ntcore.monitor=50]
+
+The cost of each module is the median cumulative time reported by ``python -X importtime``,
+along with the heavy dependencies it loads. The script exits with status 1 if a module
+exceeds its budget in milliseconds, so it can guard against import time regressions in CI.
+'''
+import argparse, os, statistics, subprocess, sys
+
+MODULES = ["ntcore", "ntcore.monitor", "ntcore.cli.workflow"]
+
+# Dependencies which should only be loaded on first use.
+HEAVY_DEPENDENCIES = ["requests", "requests_toolbelt", "requests_futures", "jwcrypto", "jose", "psutil",
+                      "httpx", "numpy", "pandas", "sklearn", "tensorflow", "torch"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module):
+    '''
+    Returns the cumulative import time of the module in milliseconds and the heavy dependencies it loaded.
+    '''
+    code = "import sys, {0}; print(','.join(m for m in {1!r} if m in sys.modules))".format(module, HEAVY_DEPENDENCIES)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            cumulative = int(fields[1]) / 1000
+    return cumulative, [name for name in result.stdout.strip().split(",") if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="number of fresh interpreters per module")
+    parser.add_argument("--budget", action="append", default=[], help="module=milliseconds, fails if the median exceeds it")
+    args = parser.parse_args()
+    budgets = dict((name, float(value)) for name, value in (budget.split("=") for budget in args.budget))
+
+    failed = False
+    print("{:<24} {:>10} {:>10}  {}".format("module", "median ms", "min ms", "heavy dependencies"))
+    for module in MODULES:
+        samples = [measure(module) for _ in range(args.runs)]
+        times = [cumulative for cumulative, _ in samples]
+        median = statistics.median(times)
+        print("{:<24} {:>10.1f} {:>10.1f}  {}".format(module, median, min(times), ", ".join(samples[-1][1]) or "-"))
+        if module in budgets and median > budgets[module]:
+            print("  over budget of {:.1f} ms".format(budgets[module]))
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
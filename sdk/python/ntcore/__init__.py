@@ -1,8 +1,38 @@
-from ntcore.client import Client
 from importlib import import_module
+from .libs.import_hooks import register_post_import_hook
 
-for module in ["ntcore.integrations.sklearn", "ntcore.integrations.tensorflow", "ntcore.integrations.torch"]:
-    try:
-        import_module(module)
-    except Exception as e:
-        pass
+# Public classes and their modules, imported on first access to keep ``import ntcore`` cheap.
+_LAZY_ATTRIBUTES = {
+    "Client": ".client",
+    "AsyncClient": ".async_client",
+}
+
+# Autologging integrations, patching their framework once it is imported.
+_INTEGRATIONS = {
+    "sklearn": "ntcore.integrations.sklearn",
+    "tensorflow": "ntcore.integrations.tensorflow",
+    "pytorch_lightning": "ntcore.integrations.torch",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+def _integration_hook(module):
+    def load(framework):
+        try:
+            import_module(module)
+        except Exception as e:
+            pass
+    return load
+
+for framework, module in _INTEGRATIONS.items():
+    register_post_import_hook(framework, _integration_hook(module))
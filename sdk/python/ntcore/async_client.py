@@ -0,0 +1,191 @@
+from .models.experiment import Experiment
+from .resources.api_aio_client import ApiAioClient
+from .resources.api_client import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, DEFAULT_CONNECT_TIMEOUT, \
+    DEFAULT_READ_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_BACKOFF_FACTOR, DEFAULT_BACKOFF_JITTER
+from .resources.compression import DEFAULT_COMPRESSION_THRESHOLD
+from .resources.pagination import DEFAULT_PAGE_SIZE, aiterItems, pageParams
+from .integrations.utils import get_runtime_version
+from .libs.model_serializer import get_model_serializer
+import asyncio, json
+
+class AsyncClient(object):
+    '''
+    An asyncio Python interface for the NTCore API, covering the basic API of Client with coroutine methods:
+    workspaces, experiments, registration, deployment, model downloads and saves. It takes the connection,
+    retry and compression parameters of Client and requires the httpx package, i.e., ``pip install ntcore[async]``.
+
+    .. note::
+        Autologging integrations call ``experiment.save()`` synchronously, use Client for them.
+
+    .. note::
+        The following Client features are not supported, use Client if they are needed:
+        request hooks and stats (``add_request_hooks``, ``get_request_stats``, ``get_request_spans``),
+        the model cache (``model_cache_dir``) and metadata cache (``metadata_ttl``), multipart and
+        deduplicated model uploads (``upload_part_size``, ``upload_dedup``) and background saves
+        (``async_save``, ``flush``). Models are uploaded in a single streamed request.
+    '''
+
+    def __init__(self,
+                 api_token=None,
+                 username=None,
+                 password=None,
+                 program_token=None,
+                 server="http://localhost:8000/",
+                 encryption_data=None,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 backoff_jitter=DEFAULT_BACKOFF_JITTER,
+                 compression=None,
+                 compression_level=None,
+                 compression_threshold=DEFAULT_COMPRESSION_THRESHOLD):
+        '''
+        Create an instance of the asyncio API interface.
+        '''
+        self._username = username
+        self._password = password
+        self._program_token = program_token
+        self._active_experiments = set()
+        self._server = server
+        self._api_client = ApiAioClient(
+            self._username, self._password, self._server, encryption_data, api_token,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            compression=compression,
+            compression_level=compression_level,
+            compression_threshold=compression_threshold)
+
+    async def create_workspace(self, name):
+        '''
+        Creates a new workspace with the given name.
+        '''
+        return await self._api_client.doPost(self.__build_url('workspace'), dict(type = "API", name = name))
+
+    async def get_workspace(self, workspace_id):
+        '''
+        Retrieves metadata of a workspace with the given id.
+        '''
+        return await self._api_client.doGet(self.__build_url('workspace', workspace_id))
+
+    async def list_workspaces(self):
+        '''
+        Retrieves metadata of all the available workspaces.
+        '''
+        return await self._api_client.doGet(self.__build_url('workspaces'))
+
+    def iter_workspaces(self, page_size=DEFAULT_PAGE_SIZE, prefetch=True):
+        '''
+        Asynchronously iterates over the metadata of the available workspaces, see Client.iter_workspaces.
+        '''
+        url = self.__build_url('workspaces')
+        return aiterItems(lambda cursor: self._api_client.doGet(url, pageParams(page_size, cursor)), prefetch)
+
+    def iter_experiments(self, workspace_id, page_size=DEFAULT_PAGE_SIZE, prefetch=True):
+        '''
+        Asynchronously iterates over the experiments of a workspace, see Client.iter_experiments.
+        '''
+        url = self.__build_url('workspace', workspace_id, 'experiments')
+        return aiterItems(lambda cursor: self._api_client.doGet(url, pageParams(page_size, cursor)), prefetch)
+
+    async def delete_workspace(self, workspace_id):
+        '''
+        Deletes a given workspace with the given id.
+        '''
+        return await self._api_client.doDel(self.__build_url('workspace', workspace_id))
+
+    async def register_experiment(self, workspace_id, version):
+        '''
+        Register an experiment with the given workspace id and model version.
+        '''
+        return await self._api_client.doPost(self.__build_url('workspace', workspace_id, 'registry'), {"version": version})
+
+    async def get_registered_experiment(self, workspace_id):
+        '''
+        Retrieves the registered experiment for a workspace.
+        '''
+        return await self._api_client.doGet(self.__build_url('workspace', workspace_id, 'registry'))
+
+    async def unregister_experiment(self, workspace_id):
+        '''
+        Unregister an experiment with the given workspace id and model version.
+        '''
+        return await self._api_client.doDel(self.__build_url('workspace', workspace_id, 'registry'))
+
+    async def deploy_model(self, workspace_id):
+        '''
+        Deploy a trained model as API based on the given workspace id and version.
+        '''
+        return await self._api_client.doPost(self.__build_url('deployments'), data={'workspaceId': workspace_id})
+
+    async def download_model(self, path, workspace_id, version: int = 0, digest: str = None, resume: bool = True):
+        '''
+        Streams a trained model to the given path based on the given workspace id and version,
+        see Client.download_model. Returns the sha256 hex digest of the downloaded model.
+        '''
+        _version = version if version > 0 else (await self.get_registered_experiment(workspace_id))['version']
+        url = self.__build_url(workspace_id, 'models', str(_version))
+        return await self._api_client.doDownload(url, path, digest=digest, resume=resume)
+
+    def start_run(self, workspace_id):
+        '''
+        Starts a new experiment run with given workspace id.
+        '''
+        experiment = Experiment(self, workspace_id)
+        self._active_experiments.add(experiment)
+        return experiment
+
+    def stop_run(self, experiment):
+        '''
+        Stops the given experiment run.
+        '''
+        self._active_experiments.discard(experiment)
+
+    async def save(self, experiment: Experiment):
+        '''
+        Emits the metadata and serialized model to NTCore server.
+        The model is serialized on the default executor so the event loop is not blocked.
+        '''
+        workspace_id = experiment.workspace_id
+        if workspace_id is None:
+            raise ValueError('Workspace id is required')
+
+        serializer = get_model_serializer(experiment.serializable_model, experiment.framework)
+        payload = dict(
+            runtime = get_runtime_version(),
+            framework = serializer.framework().name,
+            parameters = json.dumps(experiment.pretraining_metadata).encode('utf-8'),
+            metrics = dict(experiment.posttraining_metadata))
+        try:
+            loop = asyncio.get_running_loop()
+            source = await loop.run_in_executor(None, serializer.serialize_stream, experiment.serializable_model)
+            payload.update(metrics = json.dumps(dict(payload['metrics'], **serializer.metadata())).encode('utf-8'))
+            await self._api_client.doPost(self.__build_url(workspace_id, 'experiment'), payload, files=dict(model = source))
+            self._active_experiments.discard(experiment)
+        finally:
+            serializer.close()
+
+    async def aclose(self):
+        '''
+        Closes the pooled connections.
+        '''
+        await self._api_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    def __build_url(self, *paths):
+        '''
+        Returns the NTCore endpoint for sending experiment data.
+        '''
+        return '/'.join(s.strip('/') for s in paths)
@@ -1,6 +1,4 @@
-import click, os, requests, json
-from ntcore import Client
-from ruamel import yaml
+import click, os, json
 from pathlib import Path
 from ..models.framework import Framework
 
@@ -24,6 +22,10 @@ def archive_model(server, workspace_id, framework, model):
         click.echo(click.style("Error", fg="red") + ": Unknown framework {0}".format(framework))
         exit(1)
 
+    # The client and its HTTP stack are imported by the commands using them to keep the CLI responsive.
+    from ntcore import Client
+    from ruamel import yaml
+
     yamlpath = os.path.join(str(Path.home()), ".ntcore", "access_token.yaml")
     try:
         yamlfile = open(yamlpath, "r")
@@ -50,6 +52,9 @@ def login(username, password, server):
     '''
     Input username and password. 
     '''
+    import requests
+    from ruamel import yaml
+
     url = server + '/dsp/api/v1/users/login'
     headers = {"Content-Type": "application/json"}
     data = {
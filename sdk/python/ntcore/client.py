@@ -1,10 +1,20 @@
 from .models.experiment import Experiment
-from .resources.api_client import ApiClient
+from .resources.api_client import ApiClient, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, DEFAULT_CONNECT_TIMEOUT, \
+    DEFAULT_READ_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_BACKOFF_FACTOR, DEFAULT_BACKOFF_JITTER
+from .resources.compression import DEFAULT_COMPRESSION_THRESHOLD
+from .resources.chunked_upload import DEFAULT_UPLOAD_CONCURRENCY, sourceSize
+from .resources.pagination import DEFAULT_PAGE_SIZE, iterItems, pageParams
 from .integrations.utils import get_runtime_version
-from .libs.model_serializer import BaseModelSerializer, SklearnModelSerializer, TensorflowModelSerializer, TorchModelSerializer
+from .libs.model_serializer import get_model_serializer
+from .libs.model_cache import ModelCache, DEFAULT_CACHE_MAX_BYTES
+from .libs.metadata_cache import MetadataCache, DEFAULT_METADATA_STALE_TTL
 from .models.framework import Framework
-from importlib import import_module
-import json
+from concurrent.futures import ThreadPoolExecutor, wait
+import json, logging, threading
+
+# Number of models serialized and uploaded at the same time by a client saving asynchronously,
+# one keeps the versions of a workspace in the order of the saves.
+DEFAULT_SAVE_WORKERS = 1
 
 class Client(object):
     '''
@@ -19,6 +29,54 @@ class Client(object):
         Your UAT or Production API URL if applicable.
     :param encryptionData:
         Dictionary with params for encrypted requests (keys: clientPrivateKeySetLocation, keySetLocation, etc).
+    :param pool_connections:
+        The number of per-host connection pools to keep alive.
+    :param pool_maxsize:
+        The maximum number of connections kept alive per host, raise it when many threads share a client.
+    :param connect_timeout:
+        Seconds to wait for a connection to the API, None waits forever.
+    :param read_timeout:
+        Seconds to wait between bytes received from the API, None waits forever.
+    :param max_retries:
+        The maximum number of retries per request, 0 disables retries.
+    :param backoff_factor:
+        Retries back off exponentially, ``backoff_factor * 2 ** (retries - 1)`` seconds.
+    :param backoff_jitter:
+        The upper bound in seconds of the random jitter added to every backoff.
+    :param compression:
+        The content encoding of request bodies, ``gzip`` or ``zstd``, None disables compression.
+    :param compression_level:
+        The compression level, the default of the encoding if None.
+    :param compression_threshold:
+        The size in bytes under which request bodies are sent uncompressed.
+    :param upload_part_size:
+        Models larger than this many bytes are uploaded in parts over concurrent connections,
+        None uploads every model as a single stream.
+    :param upload_concurrency:
+        The number of parts uploaded at the same time, up to ``pool_maxsize``.
+    :param upload_progress:
+        Callable invoked with the bytes uploaded so far and the total bytes, None if unknown,
+        every time a part completes.
+    :param upload_dedup:
+        Whether models are uploaded as content-defined chunks, sending only the chunks the workspace
+        doesn't store yet, e.g., the unchanged weights of a retrained model are not sent again.
+        It takes precedence over ``upload_part_size``.
+    :param model_cache_dir:
+        Directory of the on-disk model cache shared by the processes of the host, None disables the cache.
+    :param model_cache_max_bytes:
+        The budget in bytes of the model cache, the least recently used models are evicted beyond it.
+    :param metadata_ttl:
+        Seconds workspace and registry lookups are cached, e.g., ``DEFAULT_METADATA_TTL``, None disables
+        the cache. Only this client's own changes invalidate it, so a model registered by another process
+        may be downloaded after up to ``metadata_ttl + metadata_stale_ttl`` seconds.
+    :param metadata_stale_ttl:
+        Seconds past ``metadata_ttl`` a cached lookup is still returned while it is revalidated in the background.
+    :param async_save:
+        Whether save returns a future once the model is snapshotted, serializing and uploading it on
+        a background thread so that training goes on. Call flush, or use the client as a context
+        manager, to wait for the outstanding saves.
+    :param save_workers:
+        The number of models saved at the same time when saving asynchronously.
     .. note::
         **server** defaults to the NTCore Sandbox URL if not provided.
     '''
@@ -29,7 +87,27 @@ class Client(object):
                  password=None,
                  program_token=None,
                  server="http://localhost:8000/",
-                 encryption_data=None):
+                 encryption_data=None,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 backoff_jitter=DEFAULT_BACKOFF_JITTER,
+                 compression=None,
+                 compression_level=None,
+                 compression_threshold=DEFAULT_COMPRESSION_THRESHOLD,
+                 upload_part_size=None,
+                 upload_concurrency=DEFAULT_UPLOAD_CONCURRENCY,
+                 upload_progress=None,
+                 upload_dedup=False,
+                 model_cache_dir=None,
+                 model_cache_max_bytes=DEFAULT_CACHE_MAX_BYTES,
+                 metadata_ttl=None,
+                 metadata_stale_ttl=DEFAULT_METADATA_STALE_TTL,
+                 async_save=False,
+                 save_workers=DEFAULT_SAVE_WORKERS):
         '''
         Create an instance of the API interface.
         This is the main interface the user will call to interact with the API.
@@ -39,49 +117,96 @@ class Client(object):
         self._program_token = program_token
         self._active_experiments = set()
         self._server = server
-        self._api_client = ApiClient(self._username, self._password, self._server, encryption_data, api_token)
+        self._upload_part_size = upload_part_size
+        self._upload_concurrency = upload_concurrency
+        self._upload_progress = upload_progress
+        self._upload_dedup = upload_dedup
+        self._model_cache = ModelCache(model_cache_dir, model_cache_max_bytes) if model_cache_dir is not None else None
+        self._metadata_cache = MetadataCache(metadata_ttl, metadata_stale_ttl) if metadata_ttl is not None else None
+        self._save_executor = ThreadPoolExecutor(max_workers=save_workers, thread_name_prefix='save_model') if async_save else None
+        self._pending_saves = set()
+        self._pending_lock = threading.Lock()
+        self._api_client = ApiClient(
+            self._username, self._password, self._server, encryption_data, api_token,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            compression=compression,
+            compression_level=compression_level,
+            compression_threshold=compression_threshold)
 
     def create_workspace(self, name):
         '''
         Creates a new workspace with the given name.
         '''
-        return self._api_client.doPost(self.__build_url('workspace'), dict(type = "API", name = name))
+        response = self._api_client.doPost(self.__build_url('workspace'), dict(type = "API", name = name))
+        self.__invalidate(self.__build_url('workspaces'))
+        return response
 
     def get_workspace(self, workspace_id):
         '''
         Retrieves metadata of a workspace with the given id.
         '''
-        return self._api_client.doGet(self.__build_url('workspace', workspace_id))
+        return self.__get_metadata(self.__build_url('workspace', workspace_id))
 
     def list_workspaces(self):
         '''
         Retrieves metadata of all the available workspaces.
         '''
-        return self._api_client.doGet(self.__build_url('workspaces'))
+        return self.__get_metadata(self.__build_url('workspaces'))
+
+    def iter_workspaces(self, page_size=DEFAULT_PAGE_SIZE, prefetch=True):
+        '''
+        Iterates over the metadata of the available workspaces, fetching page_size of them per request.
+        The next page is fetched in the background while the current one is consumed if prefetch is set.
+        '''
+        url = self.__build_url('workspaces')
+        return iterItems(lambda cursor: self._api_client.doGet(url, pageParams(page_size, cursor)), prefetch)
+
+    def iter_experiments(self, workspace_id, page_size=DEFAULT_PAGE_SIZE, prefetch=True):
+        '''
+        Iterates over the experiments of a workspace, fetching page_size of them per request.
+        The next page is fetched in the background while the current one is consumed if prefetch is set.
+        '''
+        url = self.__build_url('workspace', workspace_id, 'experiments')
+        return iterItems(lambda cursor: self._api_client.doGet(url, pageParams(page_size, cursor)), prefetch)
 
     def delete_workspace(self, workspace_id):
         '''
         Deletes a given workspace with the given id.
         '''
-        return self._api_client.doDel(self.__build_url('workspace', workspace_id))
+        response = self._api_client.doDel(self.__build_url('workspace', workspace_id))
+        self.__invalidate(
+            self.__build_url('workspaces'),
+            self.__build_url('workspace', workspace_id),
+            self.__build_url('workspace', workspace_id, 'registry'))
+        return response
 
     def register_experiment(self, workspace_id, version):
         '''
         Register an experiment with the given workspace id and model version.
         '''
-        return self._api_client.doPost(self.__build_url('workspace', workspace_id, 'registry'), {"version": version})
+        response = self._api_client.doPost(self.__build_url('workspace', workspace_id, 'registry'), {"version": version})
+        self.__invalidate(self.__build_url('workspace', workspace_id, 'registry'))
+        return response
 
     def get_registered_experiment(self, workspace_id):
         '''
         Retrieves the registered experiment for a workspace.
         '''
-        return self._api_client.doGet(self.__build_url('workspace', workspace_id, 'registry'))
+        return self.__get_metadata(self.__build_url('workspace', workspace_id, 'registry'))
 
     def unregister_experiment(self, workspace_id):
         '''
         Unregister an experiment with the given workspace id and model version.
         '''
-        return self._api_client.doDel(self.__build_url('workspace', workspace_id, 'registry'))
+        response = self._api_client.doDel(self.__build_url('workspace', workspace_id, 'registry'))
+        self.__invalidate(self.__build_url('workspace', workspace_id, 'registry'))
+        return response
 
     def deploy_model(self, workspace_id):
         '''
@@ -89,15 +214,43 @@ class Client(object):
         '''
         return self._api_client.doPost(self.__build_url('deployments'), data={'workspaceId': workspace_id})
     
-    def download_model(self, path, workspace_id, version: int = 0):
+    def download_model(self, path, workspace_id, version: int = 0, digest: str = None, resume: bool = True):
         '''
-        Deploy a trained model as API based on the given workspace id and version.
+        Downloads a trained model to the given path based on the given workspace id and version.
+        The model is streamed to disk in fixed-size chunks, an interrupted download is resumed
+        on the next call and the sha256 digest is checked against ``digest`` if provided.
+        With a model cache, a cached version is validated with a conditional GET and placed
+        at path without downloading it again.
+        Returns the sha256 hex digest of the downloaded model.
         '''
         _version = version if version > 0 else self.get_registered_experiment(workspace_id)['version']
         url = self.__build_url(workspace_id, 'models', str(_version))
-        serialized: bytes = self._api_client.doGet(url)
-        with open(path, 'wb') as f:
-            f.write(serialized)
+        if self._model_cache is None:
+            return self._api_client.doDownload(url, path, digest=digest, resume=resume)
+
+        def download(target, etag, last_modified):
+            return self._api_client.doDownloadIfModified(url, target, etag, last_modified, digest=digest, resume=resume)
+        return self._model_cache.fetch(workspace_id, _version, path, download, digest=digest)
+
+    def add_request_hooks(self, pre=None, post=None):
+        '''
+        Registers callbacks invoked with the RequestSpan of every request to the API, before it is
+        sent and once it completes, e.g., to propagate a trace context or export spans.
+        '''
+        self._api_client.addRequestHooks(pre, post)
+
+    def get_request_stats(self):
+        '''
+        Returns the statistics of the requests sent so far: per endpoint the request count, bytes in
+        and out, retries, error codes and a latency summary in seconds, plus the encryption time.
+        '''
+        return self._api_client.stats.toDict()
+
+    def get_request_spans(self):
+        '''
+        Returns the most recent requests as spans in the OpenTelemetry format.
+        '''
+        return self._api_client.stats.toSpans()
 
     def start_run(self, workspace_id):
         '''
@@ -116,41 +269,142 @@ class Client(object):
     def save(self, experiment: Experiment):
         '''
         Emits the metadata and serialized model to NTCore server.
+        When saving asynchronously, the model is snapshotted and a future of the upload is returned.
         '''
         workspace_id = experiment.workspace_id
         if workspace_id is None:
             raise ValueError('Workspace id is required')
 
-        serializer = self.__get_model_serializer(experiment.serializable_model, experiment.framework)
+        serializer = get_model_serializer(experiment.serializable_model, experiment.framework)
         payload = dict(
             runtime = get_runtime_version(),
             framework = serializer.framework().name,
             parameters = json.dumps(experiment.pretraining_metadata).encode('utf-8'),
-            metrics = json.dumps(experiment.posttraining_metadata).encode('utf-8'))
-        files = dict(model = serializer.serialize(experiment.serializable_model))
+            metrics = dict(experiment.posttraining_metadata))
+        if self._save_executor is None:
+            self.__upload(workspace_id, serializer, experiment.serializable_model, payload)
+            self._active_experiments.discard(experiment)
+            return None
 
-        self._api_client.doPost(self.__build_url(workspace_id, 'experiment'), payload, files=files)
-        self._active_experiments.discard(experiment)
-        serializer.close()
+        try:
+            model = serializer.snapshot(experiment.serializable_model)
+        except BaseException:
+            serializer.close()
+            raise
+        future = self._save_executor.submit(self.__save_snapshot, experiment, serializer, model, payload)
+        with self._pending_lock:
+            self._pending_saves.add(future)
+        future.add_done_callback(self.__discard_save)
+        return future
+
+    def flush(self, timeout=None):
+        '''
+        Waits for the outstanding asynchronous saves.
+        Returns whether they all completed, failed saves are logged and raised by their future.
 
-    def __get_model_serializer(self, model, framework: Framework) -> BaseModelSerializer:
+        PARAMETERS
+        ----
+        timeout: float, seconds to wait, None waits forever
         '''
-        Returns the model serializer for frameworks, i.e., sklearn, tensorflow, pytorch
+        with self._pending_lock:
+            pending = list(self._pending_saves)
+        return not wait(pending, timeout=timeout).not_done
+
+    def close(self, timeout=None):
+        '''
+        Waits for the outstanding asynchronous saves and stops the save threads.
+
+        PARAMETERS
+        ----
+        timeout: float, seconds to wait for the saves, None waits forever
         '''
-        if self.__isinstance(model, 'sklearn.base', 'BaseEstimator') or (isinstance(model, str) and framework == Framework.sklearn):
-            return SklearnModelSerializer()
-        elif self.__isinstance(model, 'tensorflow.keras', 'Model') or (isinstance(model, str) and framework == Framework.tensorflow):
-            return TensorflowModelSerializer()
-        elif self.__isinstance(model, 'torch.nn', 'Module') or (isinstance(model, str) and framework == Framework.pytorch):
-            return TorchModelSerializer()
-        else:
-            raise Exception('Unable to determine model framework.')
+        self.flush(timeout)
+        if self._save_executor is not None:
+            self._save_executor.shutdown(wait=False)
 
-    def __isinstance(self, model, module: str, cls: str) -> bool:
+    def __enter__(self):
+        '''
+        Returns self as a client object.
+        '''
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        '''
+        Waits for the outstanding asynchronous saves.
+        '''
+        self.close()
+
+    def __save_snapshot(self, experiment, serializer, model, payload):
+        '''
+        Uploads the snapshot of an asynchronous save, on a save thread.
+        '''
+        try:
+            self.__upload(experiment.workspace_id, serializer, model, payload)
+            self._active_experiments.discard(experiment)
+        except Exception as e:
+            logging.warning('Unable to save model of workspace {0}: {1}'.format(experiment.workspace_id, e))
+            raise
+
+    def __discard_save(self, future):
+        '''
+        Removes a completed asynchronous save from the outstanding ones.
+        '''
+        with self._pending_lock:
+            self._pending_saves.discard(future)
+
+    def __upload(self, workspace_id, serializer, model, payload):
+        '''
+        Serializes and uploads a model with its metadata, then closes the serializer.
+        '''
         try:
-            return isinstance(model, getattr(import_module(module), cls))
-        except Exception:
+            # The serialized model is streamed from its source rather than loaded in memory.
+            source = serializer.serialize_stream(model)
+            # Metadata of the serialization, e.g., optimization results, is recorded with the metrics.
+            payload.update(metrics = json.dumps(dict(payload['metrics'], **serializer.metadata())).encode('utf-8'))
+            if self._upload_dedup:
+                upload = self._api_client.doUploadChunks(
+                    self.__build_url(workspace_id, 'chunks'), source,
+                    concurrency=self._upload_concurrency,
+                    progress=self._upload_progress)
+                payload.update(chunks = json.dumps(upload['digests']))
+                self._api_client.doPost(self.__build_url(workspace_id, 'experiment'), payload)
+            elif self.__should_upload_parts(source):
+                upload = self._api_client.doUploadParts(
+                    self.__build_url(workspace_id, 'uploads'), source,
+                    partSize=self._upload_part_size,
+                    concurrency=self._upload_concurrency,
+                    progress=self._upload_progress)
+                payload.update(uploadId = upload['uploadId'], parts = json.dumps(upload['parts']))
+                self._api_client.doPost(self.__build_url(workspace_id, 'experiment'), payload)
+            else:
+                self._api_client.doPost(self.__build_url(workspace_id, 'experiment'), payload, files=dict(model = source))
+        finally:
+            serializer.close()
+
+    def __should_upload_parts(self, source):
+        '''
+        Returns whether the serialized model is uploaded in parts, i.e., it is larger than one part.
+        '''
+        if self._upload_part_size is None:
             return False
+        size = sourceSize(source)
+        return size is None or size > self._upload_part_size
+
+    def __get_metadata(self, url):
+        '''
+        Retrieves workspace or registry metadata, through the metadata cache if enabled.
+        Cached metadata is revalidated with a conditional GET.
+        '''
+        if self._metadata_cache is None:
+            return self._api_client.doGet(url)
+        return self._metadata_cache.get(url, lambda etag: self._api_client.doGetIfModified(url, etag))
+
+    def __invalidate(self, *urls):
+        '''
+        Drops metadata changed by this client from the metadata cache.
+        '''
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(*urls)
 
     def __build_url(self, *paths):
         '''
@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+import os, queue, tarfile, threading, zlib
+
+# Content encodings of model archives.
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+# Default compression level of each encoding.
+DEFAULT_LEVELS = {GZIP: 6, ZSTD: 3}
+
+# Bytes of tar stream compressed at a time, each block is an independent gzip member.
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Magic numbers of the archive encodings.
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Seconds between two checks that the consumer of an archive stream is still there.
+_POLL_INTERVAL = 0.1
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _BlockWriter:
+    '''
+    File object the tar stream is written to, handing every block to a compression function.
+    '''
+    def __init__(self, submit, block_size):
+        self._submit = submit
+        self._block_size = block_size
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]))
+            del self._buffer[:self._block_size]
+        return len(data)
+
+    def close(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+
+
+def _compress_gzip(block, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush()
+
+
+def stream_tar(path, arcname, compression=GZIP, level=None, threads=None, block_size=DEFAULT_BLOCK_SIZE):
+    '''
+    Yields the compressed tar archive of a directory as it is produced, without writing the archive to disk.
+
+    The tar stream is written on a background thread and compressed in parallel: with gzip every
+    block of block_size bytes is compressed as its own gzip member on a pool of threads, which any
+    gzip reader decompresses as one stream, while zstd uses the multi-threaded compressor of the
+    zstandard package. At most a few blocks per thread are held in memory.
+
+    PARAMETERS
+    ----
+    path: str, directory to archive
+    arcname: str, name of the directory in the archive
+    compression: str, gzip or zstd, the latter requires the zstandard package
+    level: int, compression level, the default of the encoding if None
+    threads: int, number of compression threads, the number of CPUs if None
+    block_size: int, bytes of tar stream compressed at a time with gzip
+    '''
+    if compression not in DEFAULT_LEVELS:
+        raise ValueError('Unsupported compression {}, expected one of {}, {}'.format(compression, GZIP, ZSTD))
+    level = DEFAULT_LEVELS[compression] if level is None else level
+    threads = threads or os.cpu_count() or 1
+    # Compressed blocks in archive order, bounded so that the tar thread waits on a slow consumer.
+    blocks = queue.Queue(maxsize=2 * threads)
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='compress_archive') if compression == GZIP else None
+
+    def put(item):
+        while True:
+            if cancelled.is_set():
+                raise _Cancelled()
+            try:
+                return blocks.put(item, timeout=_POLL_INTERVAL)
+            except queue.Full:
+                pass
+
+    def produce():
+        try:
+            if compression == GZIP:
+                writer = _BlockWriter(lambda block: put(executor.submit(_compress_gzip, block, level)), block_size)
+            else:
+                import zstandard
+                compressor = zstandard.ZstdCompressor(level=level, threads=threads).compressobj()
+                writer = _BlockWriter(lambda block: put(compressor.compress(block)), block_size)
+            with tarfile.open(fileobj=writer, mode='w|') as tar:
+                tar.add(path, arcname=arcname)
+            writer.close()
+            if compression == ZSTD:
+                put(compressor.flush())
+            put(None)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            try:
+                put(e)
+            except _Cancelled:
+                pass
+
+    producer = threading.Thread(name='write_archive', target=produce)
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            item = blocks.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            block = item.result() if executor is not None else item
+            if block:
+                yield block
+    finally:
+        cancelled.set()
+        producer.join()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _check_member(member, destination):
+    '''
+    Raises if extracting a tar member would write outside the destination, the checks of the data
+    extraction filter for Python versions that lack it.
+    '''
+    root = os.path.realpath(destination)
+
+    def inside(target):
+        return os.path.commonpath([root, os.path.realpath(target)]) == root
+
+    target = os.path.join(root, member.name)
+    if os.path.isabs(member.name) or not inside(target):
+        raise tarfile.TarError('Member {} is outside of the destination'.format(member.name))
+    if member.issym() or member.islnk():
+        # Symbolic links are relative to their directory, hard links to the archive root.
+        base = os.path.dirname(target) if member.issym() else root
+        if os.path.isabs(member.linkname) or not inside(os.path.join(base, member.linkname)):
+            raise tarfile.TarError('Link {} points outside of the destination'.format(member.name))
+    if member.isdev():
+        raise tarfile.TarError('Member {} is a device file'.format(member.name))
+
+
+def _extract(tar, destination):
+    '''
+    Extracts the members of a tar archive, rejecting those that would write outside the destination.
+    '''
+    if getattr(tarfile, 'data_filter', None) is not None:
+        tar.extractall(destination, filter='data')
+        return
+    for member in tar:
+        _check_member(member, destination)
+        tar.extract(member, destination)
+
+
+def extract_tar(path, destination):
+    '''
+    Extracts a gzip or zstd compressed tar archive, the encoding is detected from its content.
+    Archives come from the server, so members that would be written outside the destination, e.g., with
+    ``..`` components, links pointing outside of it and device files are rejected with a tarfile.TarError.
+
+    PARAMETERS
+    ----
+    path: str, archive file
+    destination: str, directory the archive is extracted to
+    '''
+    with open(path, 'rb') as f:
+        magic = f.read(len(_ZSTD_MAGIC))
+        f.seek(0)
+        if magic == _ZSTD_MAGIC:
+            import zstandard
+            with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                with tarfile.open(fileobj=reader, mode='r|') as tar:
+                    _extract(tar, destination)
+        else:
+            with tarfile.open(fileobj=f, mode='r:*') as tar:
+                _extract(tar, destination)
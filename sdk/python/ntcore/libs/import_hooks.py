@@ -0,0 +1,68 @@
+from importlib.abc import MetaPathFinder
+import sys, threading
+
+_hooks = {}
+_lock = threading.RLock()
+
+
+def register_post_import_hook(name, hook):
+    '''
+    Calls hook with the module of the given name once it is imported, right away if it already is.
+
+    PARAMETERS
+    ----
+    name: str, absolute name of the module
+    hook: callable taking the imported module
+    '''
+    with _lock:
+        module = sys.modules.get(name)
+        if module is None:
+            _hooks.setdefault(name, []).append(hook)
+            if not any(isinstance(finder, _PostImportFinder) for finder in sys.meta_path):
+                sys.meta_path.insert(0, _PostImportFinder())
+            return
+    hook(module)
+
+
+def _run_hooks(module):
+    with _lock:
+        hooks = _hooks.pop(module.__name__, [])
+    for hook in hooks:
+        hook(module)
+
+
+class _PostImportLoader(object):
+    '''
+    Executes a module with its own loader, then runs the hooks registered for it.
+    '''
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        module.__loader__ = module.__spec__.loader = self._loader
+        _run_hooks(module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _PostImportFinder(MetaPathFinder):
+    '''
+    Finds the modules with registered hooks through the other finders and wraps their loaders.
+    '''
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in _hooks:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _PostImportLoader(spec.loader)
+                return spec
+        return None
@@ -0,0 +1,118 @@
+import copy, logging, threading, time
+
+# Seconds a cached lookup is served without revalidation.
+DEFAULT_METADATA_TTL = 10.0
+
+# Seconds past the TTL a cached lookup is still served while it is revalidated in the background.
+DEFAULT_METADATA_STALE_TTL = 60.0
+
+
+class _Entry:
+    def __init__(self, value, etag, fresh_until, stale_until):
+        self.value = value
+        self.etag = etag
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class MetadataCache:
+    '''
+    In-process cache of metadata lookups, e.g., workspaces and registered experiments.
+
+    A lookup is served from the cache for ttl seconds. For stale_ttl more seconds the cached value
+    is still served while a single background call revalidates it, and past that the caller
+    waits for the revalidation. Concurrent lookups of the same key share a single call.
+    Every caller gets its own copy of the value, so changing it doesn't change the cache.
+    '''
+    def __init__(self, ttl=DEFAULT_METADATA_TTL, stale_ttl=DEFAULT_METADATA_STALE_TTL, clock=time.monotonic):
+        '''
+        Initialize the metadata cache.
+
+        PARAMETERS
+        ----
+        ttl: float, seconds a cached lookup is served without revalidation
+        stale_ttl: float, seconds past the ttl a cached lookup is served while it is revalidated
+        clock: callable, returns the current time in seconds
+        '''
+        if ttl < 0 or stale_ttl < 0:
+            raise ValueError('ttl and stale_ttl should not be negative')
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._clock = clock
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        '''
+        Returns the cached value of a key, loading or revalidating it as needed.
+
+        PARAMETERS
+        ----
+        key: hashable
+        load: callable taking the etag of the cached value, None if not cached, and returning
+            None if the cached value is still current, otherwise a tuple of the value and its etag
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            now = self._clock()
+            if entry is not None and now < entry.fresh_until:
+                return copy.deepcopy(entry.value)
+            flight = self._flights.get(key)
+            if entry is not None and now < entry.stale_until:
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    thread = threading.Thread(name='revalidate_metadata', target=self.__load, args=(key, load, entry, flight, True))
+                    thread.daemon = True
+                    thread.start()
+                return copy.deepcopy(entry.value)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self.__load(key, load, entry, flight, False)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.value)
+
+    def invalidate(self, *keys):
+        '''
+        Drops the given keys from the cache, or every key if none is given. Lookups in flight are
+        not cached once they complete.
+        '''
+        with self._lock:
+            for key in keys or list(self._entries) + list(self._flights):
+                self._entries.pop(key, None)
+                self._flights.pop(key, None)
+
+    def __load(self, key, load, entry, flight, background):
+        '''
+        Runs a lookup on behalf of every caller waiting on the flight and caches its result.
+        '''
+        try:
+            result = load(entry.etag if entry is not None else None)
+            value, etag = (entry.value, entry.etag) if result is None else result
+            flight.value = value
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    now = self._clock()
+                    self._entries[key] = _Entry(value, etag, now + self._ttl, now + self._ttl + self._stale_ttl)
+        except Exception as e:
+            flight.error = e
+            if background:
+                logging.warning('Failed to revalidate {}: {}'.format(key, e))
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,172 @@
+from contextlib import contextmanager
+import json, os, shutil, stat
+try:
+    import fcntl
+except ImportError:
+    # Windows, the cache is then safe for a single process only.
+    fcntl = None
+
+# Default budget in bytes of the cached models.
+DEFAULT_CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024
+
+
+class ModelCache:
+    '''
+    On-disk cache of downloaded models shared by the processes of a host.
+
+    Models are stored once per content digest under ``objects/``, and ``refs/{workspace}/{version}.json``
+    points a workspace version to its digest with the validators of the download, so the next
+    download of the same version is a conditional GET. The least recently used objects are
+    evicted once the cache exceeds max_bytes. Mutations hold a file lock on the cache root and
+    concurrent downloads of the same version wait for the first one.
+    '''
+    def __init__(self, root, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        '''
+        Initialize the model cache.
+
+        PARAMETERS
+        ----
+        root: str, cache directory, created if missing
+        max_bytes: int, budget in bytes of the cached models
+        '''
+        self._root = root
+        self._max_bytes = max_bytes
+        for folder in ('objects', 'refs', 'tmp'):
+            os.makedirs(os.path.join(root, folder), exist_ok=True)
+
+    def fetch(self, workspace_id, version, path, download, digest=None):
+        '''
+        Places the model of the given workspace version at path, downloading it only if the cached
+        copy is missing or stale.
+
+        PARAMETERS
+        ----
+        workspace_id: str
+        version: int
+        path: str, where the model is placed
+        download: callable taking the target path and the etag and lastModified of the cached copy,
+            returning None if it is still current, otherwise a dict with digest, etag and lastModified
+        digest: str, expected sha256 hex digest of the model
+
+        RETURNS
+        ----
+        The sha256 hex digest of the model.
+        '''
+        key = '{}-{}'.format(workspace_id, version)
+        temp_path = os.path.join(self._root, 'tmp', key)
+        with self.__lock(temp_path + '.lock', exclusive=True):
+            ref = self.__read_ref(workspace_id, version)
+            if ref is not None and digest is not None and ref['digest'] != digest.lower():
+                ref = None
+            result = None
+            if ref is not None:
+                result = download(temp_path, ref.get('etag'), ref.get('lastModified'))
+                if result is None and self.__materialize(ref['digest'], path):
+                    return ref['digest']
+            if result is None:
+                # Not cached, or evicted since the conditional request.
+                result = download(temp_path, None, None)
+            self.__store(workspace_id, version, temp_path, result)
+            if not self.__materialize(result['digest'], path):
+                raise FileNotFoundError('Model {} was evicted while being placed'.format(result['digest']))
+            return result['digest']
+
+    def size(self):
+        '''
+        Returns the number of bytes of the cached models.
+        '''
+        return sum(size for _, _, size in self.__objects())
+
+    def __store(self, workspace_id, version, file_path, result):
+        '''
+        Moves a downloaded model into the cache, records its ref and evicts the least recently used models.
+        '''
+        object_path = self.__object_path(result['digest'])
+        with self.__lock(os.path.join(self._root, '.lock'), exclusive=True):
+            if os.path.exists(object_path):
+                os.remove(file_path)
+            else:
+                # Read-only as the cached copy is hard linked into place.
+                os.chmod(file_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                os.replace(file_path, object_path)
+            os.utime(object_path)
+            ref_dir = os.path.join(self._root, 'refs', str(workspace_id))
+            os.makedirs(ref_dir, exist_ok=True)
+            ref_path = os.path.join(ref_dir, '{}.json'.format(version))
+            with open(ref_path + '.tmp', 'w') as f:
+                json.dump(dict(digest=result['digest'], etag=result.get('etag'), lastModified=result.get('lastModified')), f)
+            os.replace(ref_path + '.tmp', ref_path)
+            self.__evict(keep=result['digest'])
+
+    def __evict(self, keep):
+        '''
+        Removes the least recently used models until the cache fits in its budget, the lock must be held.
+        '''
+        objects = sorted(self.__objects(), key=lambda item: item[1])
+        total = sum(size for _, _, size in objects)
+        for digest, _, size in objects:
+            if total <= self._max_bytes:
+                break
+            if digest != keep:
+                os.remove(self.__object_path(digest))
+                total -= size
+
+    def __materialize(self, digest, path):
+        '''
+        Hard links the cached model to path, or copies it across file systems, and marks it as used.
+        Returns False if the model is no longer cached.
+        '''
+        object_path = self.__object_path(digest)
+        with self.__lock(os.path.join(self._root, '.lock'), exclusive=False):
+            if not os.path.exists(object_path):
+                return False
+            os.utime(object_path)
+            temp_path = '{}.{}.tmp'.format(path, os.getpid())
+            try:
+                os.link(object_path, temp_path)
+            except OSError:
+                shutil.copyfile(object_path, temp_path)
+            os.replace(temp_path, path)
+            return True
+
+    def __read_ref(self, workspace_id, version):
+        '''
+        Returns the ref of a workspace version if its model is cached, otherwise None.
+        '''
+        try:
+            with open(os.path.join(self._root, 'refs', str(workspace_id), '{}.json'.format(version))) as f:
+                ref = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return ref if os.path.exists(self.__object_path(ref['digest'])) else None
+
+    def __objects(self):
+        '''
+        Returns the digest, last use time and size of every cached model.
+        '''
+        objects = []
+        with os.scandir(os.path.join(self._root, 'objects')) as entries:
+            for entry in entries:
+                try:
+                    info = entry.stat()
+                except FileNotFoundError:
+                    continue
+                objects.append((entry.name, info.st_mtime, info.st_size))
+        return objects
+
+    def __object_path(self, digest):
+        return os.path.join(self._root, 'objects', digest)
+
+    @contextmanager
+    def __lock(self, path, exclusive):
+        '''
+        Holds a shared or exclusive lock on the given lock file across processes.
+        '''
+        with open(path, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -1,93 +1,175 @@
 from abc import ABC, abstractmethod
 from ..models.framework import Framework
-import pickle, tarfile, tempfile, os
+from .archive import GZIP, stream_tar
+from .oob_pickle import dump_stream
+from . import tensor_file
+from .torch_optimization import DEFAULT_TOLERANCE, optimize_torch
+import copy, pickle, tempfile, os, io, sys
 
 
 class BaseModelSerializer(ABC):
 
     def __init__(self) -> None:
         super().__init__()
+        self._streams = []
 
     def serialize(self, model) -> bytes:
-        return self._from_disk(model) if isinstance(model, str) else self._from_memory(model)
+        source = self.serialize_stream(model)
+        return source.read() if hasattr(source, 'read') else b''.join(source)
 
+    def serialize_stream(self, model):
+        '''
+        Returns the serialized model as a source that can be consumed incrementally,
+        i.e., a readable binary file object or an iterable of bytes chunks.
+        The source remains valid until close() is called.
+        '''
+        source = self._from_disk(model) if isinstance(model, str) else self._from_memory(model)
+        return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+    def metadata(self) -> dict:
+        '''
+        Returns the metadata of the last serialized model recorded with the experiment metrics,
+        e.g., the results of optimizations applied while serializing.
+        '''
+        return {}
+
+    def snapshot(self, model):
+        '''
+        Returns a copy of the model that serialize_stream can serialize later on, on another thread,
+        while the model keeps changing, e.g., training goes on. Paths are returned as is.
+        '''
+        return model if isinstance(model, str) else copy.deepcopy(model)
+
+    def _open(self, path: str):
+        '''
+        Opens the serialized file for reading, the file is closed with the serializer.
+        '''
+        stream = open(path, "rb")
+        self._streams.append(stream)
+        return stream
 
     @abstractmethod
-    def _from_memory(self, model) -> bytes:
+    def _from_memory(self, model):
         pass
 
     @abstractmethod
-    def _from_disk(self, path: str) -> bytes:
+    def _from_disk(self, path: str):
         pass
 
     @abstractmethod
     def framework(self) -> Framework:
         pass
 
-    @abstractmethod
     def close(self) -> None:
-        pass
+        for stream in self._streams:
+            stream.close()
+        self._streams = []
 
 
 class SklearnModelSerializer(BaseModelSerializer):
+    '''
+    Serializes a scikit-learn model as a pickle file. With out_of_band, the arrays of the model are
+    streamed to the upload without being copied and can be memory-mapped on load, see oob_pickle.
+    Use e.g. functools.partial(SklearnModelSerializer, out_of_band=True) with register_model_serializer.
+    '''
+
+    def __init__(self, out_of_band=False) -> None:
+        super().__init__()
+        self._out_of_band = out_of_band
 
     def _from_disk(self, path: str):
         if not path.endswith(".pkl"):
             raise ValueError('Sklearn model should be a file with extension as .pkl')
-        return open(path, "rb").read()
+        return self._open(path)
 
     def _from_memory(self, model):
-        return pickle.dumps(model)
+        if self._out_of_band:
+            stream = dump_stream(model)
+            self._streams.append(stream)
+            return stream
+        model_file = tempfile.TemporaryFile(suffix='.pkl')
+        self._streams.append(model_file)
+        pickle.dump(model, model_file)
+        model_file.seek(0)
+        return model_file
 
     def framework(self) -> Framework:
         return Framework.sklearn
 
-    def close(self) -> None:
-        pass
-
 
 class TensorflowModelSerializer(BaseModelSerializer):
+    '''
+    Serializes a SavedModel directory as a compressed tar archive streamed straight into the upload,
+    see stream_tar. Use e.g. functools.partial(TensorflowModelSerializer, compression='zstd') with
+    register_model_serializer to change the compression.
+    '''
 
-    def __init__(self) -> None:
+    def __init__(self, compression=GZIP, compression_level=None, threads=None) -> None:
         super().__init__()
-        self._model_file = tempfile.NamedTemporaryFile(suffix='.tar.gz')
-        
-    def _gzip(self, dir) -> None:
-        tar = tarfile.open(self._model_file.name, "w:gz")
-        tar.add(dir, arcname="model")
-        tar.close()
-
-    def _from_disk(self, path: str) -> bytes:
+        self._compression = compression
+        self._compression_level = compression_level
+        self._threads = threads
+        self._model_dir = None
+
+    def _archive(self, dir):
+        archive = stream_tar(dir, "model", self._compression, self._compression_level, self._threads)
+        self._streams.append(archive)
+        return archive
+
+    def _from_disk(self, path: str):
         if not os.path.isdir(path):
             raise ValueError('Tensorflow model should be a directory')
-        self._gzip(path)
-        return open(self._model_file.name, "rb").read()
+        return self._archive(path)
 
-    def _from_memory(self, model) -> bytes:
-        with tempfile.TemporaryDirectory() as model_dir:
-            model.save(model_dir)
-            self._gzip(model_dir)
-        return open(self._model_file.name, "rb").read()
+    def _from_memory(self, model):
+        return self._archive(self.snapshot(model))
+
+    def snapshot(self, model):
+        # Keras models can't be copied reliably, the saved model directory is the snapshot instead.
+        # It is archived as the upload reads it, so it is kept until close().
+        if isinstance(model, str):
+            return model
+        self._model_dir = tempfile.TemporaryDirectory()
+        model.save(self._model_dir.name)
+        return self._model_dir.name
 
     def framework(self) -> Framework:
         return Framework.tensorflow
 
     def close(self) -> None:
-        self._model_file.close()
+        super().close()
+        if self._model_dir is not None:
+            self._model_dir.cleanup()
+            self._model_dir = None
 
 
 class TorchModelSerializer(BaseModelSerializer):
+    '''
+    Serializes a PyTorch model as a TorchScript file. With mapped, the model is rather streamed as a
+    tensor file whose weights the server memory-maps read-only and shares across workers, see tensor_file.
+    With quantize or freeze, the TorchScript module is optimized for CPU inference and checked on
+    sample_input, see optimize_torch, the results are recorded with the experiment metrics.
+    Use e.g. functools.partial(TorchModelSerializer, mapped=True) with register_model_serializer.
+    '''
 
-    def __init__(self) -> None:
+    def __init__(self, mapped=False, quantize=False, freeze=False, sample_input=None, tolerance=DEFAULT_TOLERANCE) -> None:
         super().__init__()
+        if mapped and (quantize or freeze):
+            raise ValueError('Mapped models are saved as tensors and can\'t be quantized or frozen')
+        self._mapped = mapped
+        self._quantize = quantize
+        self._freeze = freeze
+        self._sample_input = sample_input
+        self._tolerance = tolerance
+        self._metadata = {}
         self._model_file = tempfile.NamedTemporaryFile(suffix='.pt')
 
-    def _from_disk(self, path: str) -> bytes:
+    def _from_disk(self, path: str):
         if not ((path.endswith(".pt") or path.endswith(".pth"))):
             raise ValueError('Pytorch model should be a file with extension as .pt or .pth')
-        return open(self._model_file.name, "rb").read()
+        return self._open(path)
 
-    def _from_memory(self, model) -> bytes:
+    def _from_memory(self, model):
         ##################################
         ## Saving and loading extra files
         ##################################
@@ -96,13 +178,161 @@ class TorchModelSerializer(BaseModelSerializer):
         # extra_files = {'transform': None}
         # model = torch.jit.load('model_script.pt', _extra_files=extra_files)
         # transform = pickle.loads(extra_files['transform'])
-        from torch.jit import script
-        buffer = script(model)
+        if self._mapped:
+            stream = tensor_file.dump_stream(model)
+            self._streams.append(stream)
+            return stream
+        if self._quantize or self._freeze:
+            buffer, report = optimize_torch(model, self._quantize, self._freeze, self._sample_input, self._tolerance)
+        else:
+            from torch.jit import script
+            buffer, report = script(model), None
         buffer.save(self._model_file.name)
-        return open(self._model_file.name, "rb").read()
+        if report is not None:
+            self._metadata = self.__report_metadata(model, report)
+        return self._open(self._model_file.name)
+
+    def __report_metadata(self, model, report):
+        '''
+        Returns the optimization report as flat experiment metrics, with the sizes of the weights and artifact.
+        '''
+        metadata = dict(
+            archive_stages = ','.join(report['stages']),
+            archive_rejected_stages = ','.join(report['rejected']),
+            archive_max_error = report['max_error'],
+            archive_source_weight_bytes = sum(t.numel() * t.element_size() for t in model.state_dict().values()),
+            archive_bytes = os.path.getsize(self._model_file.name))
+        if 'latency_ms' in report:
+            metadata.update(archive_latency_ms = report['latency_ms'], archive_optimized_latency_ms = report['optimized_latency_ms'])
+        return metadata
+
+    def metadata(self) -> dict:
+        return self._metadata
 
     def framework(self) -> Framework:
         return Framework.pytorch
 
     def close(self) -> None:
-        self._model_file.close()
\ No newline at end of file
+        super().close()
+        self._model_file.close()
+
+
+class OnnxModelSerializer(BaseModelSerializer):
+    '''
+    Serializes a model as an ONNX file, which fast-torch serves with ONNX Runtime. PyTorch models are
+    exported with torch.onnx by tracing them on sample_input, scikit-learn models are converted with
+    skl2onnx, which infers the input types from sample_input, and ONNX models are saved as is.
+    Use e.g. functools.partial(OnnxModelSerializer, sample_input=x) with register_model_serializer
+    under Framework.onnx, it then serializes the PyTorch and scikit-learn models of the experiments
+    whose framework is set to Framework.onnx.
+    '''
+
+    def __init__(self, sample_input=None, opset=None, dynamic_batch=True) -> None:
+        super().__init__()
+        self._sample_input = sample_input
+        self._opset = opset
+        self._dynamic_batch = dynamic_batch
+
+    def _from_disk(self, path: str):
+        if not path.endswith(".onnx"):
+            raise ValueError('ONNX model should be a file with extension as .onnx')
+        return self._open(path)
+
+    def _from_memory(self, model):
+        framework = detect_framework(model)
+        if framework == Framework.onnx:
+            return model.SerializeToString()
+        if self._sample_input is None:
+            raise ValueError('A sample input is required to export a {} model to ONNX'.format(framework.name))
+        if framework == Framework.pytorch:
+            return self._from_torch(model)
+        if framework == Framework.sklearn:
+            return self._from_sklearn(model)
+        raise ValueError('Unable to export a {} model to ONNX'.format(framework.name))
+
+    def _from_sklearn(self, model):
+        from skl2onnx import to_onnx
+        from sklearn.base import is_classifier
+        # Classifiers output probabilities as a tensor rather than a list of dicts, as torch models do.
+        final = model.steps[-1][1] if hasattr(model, 'steps') else model
+        options = {id(final): {'zipmap': False}} if is_classifier(final) else None
+        return to_onnx(model, self._sample_input, target_opset=self._opset, options=options).SerializeToString()
+
+    def _from_torch(self, model):
+        import torch
+        args = self._sample_input if isinstance(self._sample_input, tuple) else (self._sample_input,)
+        names = ['input_{}'.format(i) for i in range(len(args))]
+        model_file = tempfile.TemporaryFile(suffix='.onnx')
+        self._streams.append(model_file)
+        torch.onnx.export(model, args, model_file, input_names=names, opset_version=self._opset,
+                          dynamic_axes={name: {0: 'batch'} for name in names} if self._dynamic_batch else None)
+        model_file.seek(0)
+        return model_file
+
+    def framework(self) -> Framework:
+        return Framework.onnx
+
+
+# Frameworks of the in-memory models the ONNX serializer converts when Framework.onnx is given explicitly.
+ONNX_CONVERTIBLE_FRAMEWORKS = (Framework.pytorch, Framework.sklearn)
+
+# Registered serializers by framework, with the public paths of the model base classes they handle.
+_SERIALIZERS = {}
+_BASE_CLASSES = []
+
+
+def register_model_serializer(framework: Framework, serializer, base_classes=()) -> None:
+    '''
+    Registers the serializer of a framework, replacing the previous one if any.
+
+    PARAMETERS
+    ----
+    framework: Framework
+    serializer: callable returning a new BaseModelSerializer, e.g., its class
+    base_classes: public paths of the model classes of the framework, e.g., ``torch.nn.Module``
+    '''
+    _SERIALIZERS[framework] = serializer
+    _BASE_CLASSES[:] = [entry for entry in _BASE_CLASSES if entry[2] != framework]
+    for path in base_classes:
+        module, name = path.rsplit('.', 1)
+        _BASE_CLASSES.append((module, name, framework))
+
+
+def detect_framework(model) -> Framework:
+    '''
+    Returns the framework of an in-memory model without importing any module, Framework.unknown if
+    no registered base class matches. The classes of the model's MRO are matched by name and top level
+    package first, then models of virtual subclasses are checked against the base classes of modules
+    that are already imported.
+    '''
+    for cls in type(model).__mro__:
+        package = cls.__module__.split('.')[0]
+        for module, name, framework in _BASE_CLASSES:
+            if cls.__name__ == name and package == module.split('.')[0]:
+                return framework
+    for module, name, framework in _BASE_CLASSES:
+        base = getattr(sys.modules.get(module), name, None)
+        if isinstance(base, type) and isinstance(model, base):
+            return framework
+    return Framework.unknown
+
+
+def get_model_serializer(model, framework: Framework) -> BaseModelSerializer:
+    '''
+    Returns the model serializer for frameworks, i.e., sklearn, tensorflow, pytorch, onnx. The framework of
+    an in-memory model is detected from its class, the given framework is used for paths or as a fallback.
+    Framework.onnx given for a PyTorch or scikit-learn model selects the ONNX serializer, which converts it.
+    '''
+    detected = Framework.unknown if isinstance(model, str) else detect_framework(model)
+    if framework == Framework.onnx and detected in ONNX_CONVERTIBLE_FRAMEWORKS:
+        detected = Framework.onnx
+    serializer = _SERIALIZERS.get(detected if detected != Framework.unknown else framework)
+    if serializer is None:
+        raise Exception('Unable to determine model framework.')
+    return serializer()
+
+
+register_model_serializer(Framework.sklearn, SklearnModelSerializer, ['sklearn.base.BaseEstimator'])
+register_model_serializer(Framework.tensorflow, TensorflowModelSerializer, ['tensorflow.keras.Model', 'keras.Model', 'tf_keras.Model'])
+register_model_serializer(Framework.pytorch, TorchModelSerializer, ['torch.nn.Module'])
+register_model_serializer(Framework.onnx, OnnxModelSerializer, ['onnx.ModelProto'])
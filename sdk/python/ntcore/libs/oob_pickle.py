@@ -0,0 +1,92 @@
+import mmap, os, pickle, struct
+
+# Magic bytes starting a pickle with out-of-band buffers.
+MAGIC = b'NTCPKL5\x00'
+
+# Alignment in bytes of the buffers in the file, so memory-mapped arrays are aligned for any dtype.
+BUFFER_ALIGNMENT = 64
+
+# Bytes of buffer yielded at a time, as zero-copy slices of the buffer.
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Magic, pickle length and number of buffers, then the offset and length of every buffer.
+_HEADER = struct.Struct('<8sQQ')
+_ENTRY = struct.Struct('<QQ')
+
+
+def _align(offset):
+    return (offset + BUFFER_ALIGNMENT - 1) // BUFFER_ALIGNMENT * BUFFER_ALIGNMENT
+
+
+def dump_stream(obj):
+    '''
+    Yields a pickle of obj whose large buffers, e.g., the data of NumPy arrays, are written after
+    the pickle rather than copied into it.
+
+    The object is pickled with protocol 5 and its out-of-band buffers are yielded as memoryview
+    slices of the buffers themselves, so they are never copied in memory. The layout is a header
+    with the offset and length of every buffer, the pickle, then the buffers aligned on
+    BUFFER_ALIGNMENT bytes, which load memory-maps.
+
+    PARAMETERS
+    ----
+    obj: any picklable object, e.g., a scikit-learn estimator
+    '''
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    views = [buffer.raw() for buffer in buffers]
+    offset = _HEADER.size + _ENTRY.size * len(views) + len(data)
+    entries = []
+    for view in views:
+        offset = _align(offset)
+        entries.append(_ENTRY.pack(offset, view.nbytes))
+        offset += view.nbytes
+    yield _HEADER.pack(MAGIC, len(data), len(views)) + b''.join(entries) + data
+
+    offset = _HEADER.size + _ENTRY.size * len(views) + len(data)
+    for view in views:
+        padding = _align(offset) - offset
+        if padding:
+            yield b'\0' * padding
+        for start in range(0, view.nbytes, STREAM_CHUNK_SIZE):
+            yield view[start:start + STREAM_CHUNK_SIZE]
+        offset += padding + view.nbytes
+
+
+def is_oob_pickle(path):
+    '''
+    Returns whether a file is a pickle written by dump_stream.
+    '''
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load(path, mmap_mode=True):
+    '''
+    Loads a pickle written by dump_stream, or a plain pickle.
+
+    With mmap_mode, the file is memory-mapped copy-on-write and the arrays are views of the mapping
+    instead of copies on the heap: pages are read lazily, shared by the processes loading the same
+    file, and copied only if an array is written to.
+
+    PARAMETERS
+    ----
+    path: str, pickle file
+    mmap_mode: bool, whether the buffers are memory-mapped rather than read into memory
+    '''
+    if not is_oob_pickle(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    with open(path, 'rb') as f:
+        if mmap_mode:
+            content = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+        else:
+            content = memoryview(bytearray(os.fstat(f.fileno()).st_size))
+            f.readinto(content)
+    _, length, count = _HEADER.unpack_from(content)
+    start = _HEADER.size + _ENTRY.size * count
+    buffers = []
+    for i in range(count):
+        offset, size = _ENTRY.unpack_from(content, _HEADER.size + _ENTRY.size * i)
+        buffers.append(content[offset:offset + size])
+    return pickle.loads(content[start:start + length], buffers=buffers)
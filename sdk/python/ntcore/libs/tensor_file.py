@@ -0,0 +1,172 @@
+import io, json, mmap, pickle, struct, warnings
+
+# Magic bytes starting and ending a tensor file.
+MAGIC = b'NTCTNSR\x00'
+
+# Alignment in bytes of the tensors in the file, so mapped tensors are aligned for any dtype.
+TENSOR_ALIGNMENT = 64
+
+# Bytes of tensor yielded at a time, as zero-copy slices of the tensor.
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Offset and length of the JSON index, then the magic bytes, at the end of the file.
+_FOOTER = struct.Struct('<QQ8s')
+
+
+def _align(offset):
+    return (offset + TENSOR_ALIGNMENT - 1) // TENSOR_ALIGNMENT * TENSOR_ALIGNMENT
+
+
+class _TensorPickler(pickle.Pickler):
+    '''
+    Pickles a module with its parameters and buffers replaced by their names.
+    '''
+    def __init__(self, file, names):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._names = names
+
+    def persistent_id(self, obj):
+        name = self._names.get(id(obj))
+        return ('tensor', name) if name is not None else None
+
+
+class _TensorUnpickler(pickle.Unpickler):
+    '''
+    Unpickles a module whose parameters and buffers are the mapped tensors of a tensor file.
+    '''
+    def __init__(self, file, tensors):
+        super().__init__(file)
+        self._tensors = tensors
+
+    def persistent_load(self, pid):
+        kind, name = pid
+        if kind != 'tensor':
+            raise pickle.UnpicklingError('Unknown persistent id {}'.format(kind))
+        return self._tensors[name]
+
+
+def dump_stream(module, include_module=True):
+    '''
+    Yields a tensor file of a PyTorch module: its parameters and buffers, flat and aligned on
+    TENSOR_ALIGNMENT bytes so they can be memory-mapped, then the module pickled without them.
+
+    Tensors on the CPU are yielded as zero-copy views of their storage. Tensors shared by several
+    names, e.g., tied weights, are written once. The module's class must be importable where it is
+    loaded with load_module, as with torch.load, while load_state_dict only needs the tensors.
+
+    PARAMETERS
+    ----
+    module: torch.nn.Module
+    include_module: bool, whether the pickled module is included besides its tensors
+    '''
+    import torch
+    names, entries, aliases = {}, [], {}
+    for name, tensor in module.state_dict(keep_vars=True).items():
+        if id(tensor) in names:
+            aliases[name] = names[id(tensor)]
+            continue
+        if tensor.is_quantized or tensor.is_sparse:
+            raise ValueError('Tensor {} is quantized or sparse, only dense tensors can be mapped'.format(name))
+        names[id(tensor)] = name
+        entries.append((name, tensor))
+
+    index = dict(tensors={}, aliases=aliases, module=None)
+    offset = TENSOR_ALIGNMENT
+    yield MAGIC + b'\0' * (TENSOR_ALIGNMENT - len(MAGIC))
+    if include_module:
+        buffer = io.BytesIO()
+        _TensorPickler(buffer, names).dump(module)
+        index['module'] = dict(offset=offset, nbytes=buffer.tell())
+        yield buffer.getvalue()
+        offset += buffer.tell()
+
+    for name, tensor in entries:
+        data = tensor.detach().cpu().contiguous()
+        padding = _align(offset) - offset
+        if padding:
+            yield b'\0' * padding
+        offset += padding
+        nbytes = data.numel() * data.element_size()
+        index['tensors'][name] = dict(
+            dtype=str(data.dtype).split('.')[-1],
+            shape=list(data.shape),
+            offset=offset,
+            nbytes=nbytes,
+            parameter=isinstance(tensor, torch.nn.Parameter),
+            requires_grad=tensor.requires_grad)
+        if nbytes:
+            view = memoryview(data.reshape(-1).view(torch.uint8).numpy())
+            for start in range(0, nbytes, STREAM_CHUNK_SIZE):
+                yield view[start:start + STREAM_CHUNK_SIZE]
+        offset += nbytes
+
+    content = json.dumps(index).encode('utf-8')
+    yield content + _FOOTER.pack(offset, len(content), MAGIC)
+
+
+def is_tensor_file(path):
+    '''
+    Returns whether a file is a tensor file written by dump_stream.
+    '''
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _map(path):
+    '''
+    Maps a tensor file read-only and returns its index and the tensors by name, aliases included.
+    '''
+    import torch
+    with open(path, 'rb') as f:
+        content = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    offset, length, magic = _FOOTER.unpack_from(content, len(content) - _FOOTER.size)
+    if content[:len(MAGIC)] != MAGIC or magic != MAGIC:
+        raise ValueError('{} is not a tensor file'.format(path))
+    index = json.loads(bytes(content[offset:offset + length]))
+
+    tensors = {}
+    with warnings.catch_warnings():
+        # The tensors are views of a read-only mapping, which torch warns about as writing them would fail.
+        warnings.simplefilter('ignore', UserWarning)
+        for name, entry in index['tensors'].items():
+            dtype = getattr(torch, entry['dtype'])
+            if entry['nbytes']:
+                tensor = torch.frombuffer(content, dtype=dtype, count=entry['nbytes'] // torch.empty(0, dtype=dtype).element_size(),
+                                          offset=entry['offset']).reshape(entry['shape'])
+            else:
+                tensor = torch.empty(entry['shape'], dtype=dtype)
+            if entry['parameter']:
+                tensor = torch.nn.Parameter(tensor, requires_grad=entry['requires_grad'])
+            tensors[name] = tensor
+    for alias, name in index['aliases'].items():
+        tensors[alias] = tensors[name]
+    return index, content, tensors
+
+
+def load_state_dict(path):
+    '''
+    Returns the tensors of a tensor file by name as read-only views of a shared mapping of the file,
+    so processes loading the same file share one physical copy of the weights. Load them into a
+    module with ``module.load_state_dict(state_dict, assign=True)`` to keep them mapped.
+
+    PARAMETERS
+    ----
+    path: str, tensor file
+    '''
+    return _map(path)[2]
+
+
+def load_module(path):
+    '''
+    Returns the module of a tensor file, its parameters and buffers being read-only views of a shared
+    mapping of the file, see load_state_dict.
+
+    PARAMETERS
+    ----
+    path: str, tensor file written with include_module
+    '''
+    index, content, tensors = _map(path)
+    if index['module'] is None:
+        raise ValueError('{} has no module, use load_state_dict'.format(path))
+    module = index['module']
+    return _TensorUnpickler(io.BytesIO(content[module['offset']:module['offset'] + module['nbytes']]), tensors).load()
@@ -0,0 +1,106 @@
+import statistics, time
+
+# Maximum error of an optimized model's outputs relative to the largest output of the original model.
+DEFAULT_TOLERANCE = 0.01
+
+# Number of timed runs on the sample input whose median latency is recorded.
+DEFAULT_TIMED_RUNS = 5
+
+
+def _outputs(output):
+    '''
+    Returns the tensors of a model output, e.g., a tensor, a tuple or a dict of tensors.
+    '''
+    import torch
+    if isinstance(output, torch.Tensor):
+        return [output]
+    if isinstance(output, dict):
+        output = list(output.values())
+    if isinstance(output, (list, tuple)):
+        return [tensor for item in output for tensor in _outputs(item)]
+    return []
+
+
+def output_error(expected, actual):
+    '''
+    Returns the largest absolute difference between the outputs of two models relative to the
+    largest absolute expected output, inf if the outputs don't have the same structure.
+    '''
+    import torch
+    expected, actual = _outputs(expected), _outputs(actual)
+    if len(expected) != len(actual) or any(e.shape != a.shape for e, a in zip(expected, actual)):
+        return float('inf')
+    if not expected:
+        return 0.0
+    difference = max(float((e.float() - a.float()).abs().max()) if e.numel() else 0.0 for e, a in zip(expected, actual))
+    scale = max(float(e.float().abs().max()) if e.numel() else 0.0 for e in expected)
+    return difference / max(scale, torch.finfo(torch.float32).eps)
+
+
+def _latency(model, args, runs):
+    '''
+    Returns the median milliseconds of a run of the model on the sample input.
+    '''
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def optimize_torch(model, quantize=False, freeze=False, sample_input=None, tolerance=DEFAULT_TOLERANCE, timed_runs=DEFAULT_TIMED_RUNS):
+    '''
+    Returns the TorchScript module of a PyTorch model optimized for CPU inference, with a report of
+    the optimization, i.e., the stages applied and rejected, the output error and latencies.
+
+    Stages are applied in order: dynamic int8 quantization of the Linear and LSTM layers, then
+    torch.jit.freeze and optimize_for_inference. With a sample input, the outputs of every stage are
+    compared to those of the original model and a stage whose error exceeds the tolerance is rejected,
+    the model keeps the previous stages. The model is scripted in eval mode, its mode is restored.
+
+    PARAMETERS
+    ----
+    model: torch.nn.Module
+    quantize: bool, whether Linear and LSTM weights are quantized to int8, requires a sample input
+    freeze: bool, whether the scripted module is frozen and optimized for inference
+    sample_input: tensor or tuple of tensors, the arguments of the model the stages are checked on
+    tolerance: float, maximum output error of a stage, see output_error
+    timed_runs: int, number of runs of the original and optimized models timed on the sample input
+    '''
+    import torch
+    if quantize and sample_input is None:
+        raise ValueError('A sample input is required to check the quantized model')
+    args = None if sample_input is None else sample_input if isinstance(sample_input, tuple) else (sample_input,)
+    report = dict(stages=[], rejected=[], max_error=0.0)
+    training = model.training
+    model.eval()
+    try:
+        with torch.no_grad():
+            expected = model(*args) if args is not None else None
+
+            def accept(stage, candidate):
+                error = output_error(expected, candidate(*args)) if args is not None else 0.0
+                if error > tolerance:
+                    report['rejected'].append(stage)
+                    return False
+                report['stages'].append(stage)
+                report['max_error'] = max(report['max_error'], error)
+                return True
+
+            scripted = torch.jit.script(model)
+            if quantize:
+                quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+                candidate = torch.jit.script(quantized)
+                if accept('quantize', candidate):
+                    scripted = candidate
+            if freeze:
+                candidate = torch.jit.optimize_for_inference(torch.jit.freeze(scripted.eval()))
+                if accept('freeze', candidate):
+                    scripted = candidate
+            if args is not None and timed_runs:
+                report['latency_ms'] = _latency(model, args, timed_runs)
+                report['optimized_latency_ms'] = _latency(scripted, args, timed_runs)
+    finally:
+        model.train(training)
+    return scripted, report
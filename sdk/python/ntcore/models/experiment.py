@@ -82,9 +82,11 @@ class Experiment(object):
     def save_model(self, serializable_model):
         '''
         Saves the serializable model to NTCore server.
+        Returns the result of the client's save, i.e., a coroutine to await with an AsyncClient,
+        or a future with a Client saving asynchronously.
         '''
         self.serializable_model = serializable_model
-        self._client.save(self)
+        return self._client.save(self)
 
     def save(self):
         '''
@@ -92,7 +94,7 @@ class Experiment(object):
         '''
         if self._serializable_model is None:
             raise ValueError('Serializable model is not provided.')
-        self._client.save(self)
+        return self._client.save(self)
 
     def __enter__(self):
         '''
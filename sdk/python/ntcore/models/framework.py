@@ -12,6 +12,9 @@ class Framework(Enum):
 
     # Pytorch
     pytorch = "pytorch"
+
+    # ONNX
+    onnx = "onnx"
     
     # Unknown
     unknown = "unknown"
\ No newline at end of file
@@ -1,3 +1,23 @@
-from .monitor import Monitor
-from .system_metrics import SystemMetricsPublisherDaemon
-from .service_metrics import service_metrics
\ No newline at end of file
+from importlib import import_module
+from .service_metrics import service_metrics
+from .metric_aggregator import MetricAggregator
+
+# Public classes and their modules, imported on first access so that psutil and the HTTP stack
+# load only when they are used.
+_LAZY_ATTRIBUTES = {
+    "Monitor": ".monitor",
+    "AsyncMonitor": ".async_monitor",
+    "SystemMetricsPublisherDaemon": ".system_metrics",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES) + ["service_metrics", "MetricAggregator"]
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
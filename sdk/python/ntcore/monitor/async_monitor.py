@@ -0,0 +1,143 @@
+from ..resources.api_aio_client import ApiAioClient
+from ..resources.api_client import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, DEFAULT_CONNECT_TIMEOUT, \
+    DEFAULT_READ_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_BACKOFF_FACTOR, DEFAULT_BACKOFF_JITTER
+from ..resources.compression import DEFAULT_COMPRESSION_THRESHOLD
+import json, time
+
+class AsyncMonitor(object):
+    """
+    NTcore Monitor module for asyncio, mirroring Monitor with coroutine methods.
+
+    """
+
+    def __init__(self,
+                workspace_id,
+                username=None,
+                password=None,
+                program_token=None,
+                server="http://localhost:8000/",
+                encryption_data=None,
+                api_token=None,
+                pool_connections=DEFAULT_POOL_CONNECTIONS,
+                pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                read_timeout=DEFAULT_READ_TIMEOUT,
+                max_retries=DEFAULT_MAX_RETRIES,
+                backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                backoff_jitter=DEFAULT_BACKOFF_JITTER,
+                compression=None,
+                compression_level=None,
+                compression_threshold=DEFAULT_COMPRESSION_THRESHOLD):
+        '''
+        Generate AsyncMonitor class, it takes the same parameters as Monitor
+        and requires the httpx package, i.e., pip install ntcore[async].
+
+        PARAMETERS
+        ----
+        workspace_id: str
+        '''
+        self._workspace_id = workspace_id
+        self._username = username
+        self._password = password
+        self._program_token = program_token
+        self._server = server
+        self._api_client = ApiAioClient(
+            self._username, self._password, self._server, encryption_data, api_token,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            compression=compression,
+            compression_level=compression_level,
+            compression_threshold=compression_threshold,
+            json_body=True)
+
+    async def add_metric(self, name, value):
+        '''
+        Emits the metric line to ntcore monitoring service.
+
+        PARAMETERS
+        ----
+        name: str
+        value: float
+        '''
+        data = dict(workspaceId = self._workspace_id, name = name, value = value)
+        return await self._api_client.doPost(self.__build_url("monitoring", "metrics"), data)
+
+    async def add_custom_metric(self, name, type, formula):
+        '''
+        Emits the custom metric line to ntcore monitoring service.
+
+        PARAMETERS
+        ----
+        name: str
+        type: str
+        formula: str
+        '''
+        data = dict(workspaceId = self._workspace_id, name = name, type = type, formula = formula)
+        return await self._api_client.doPost(self.__build_url("monitoring", "custommetrics"), data)
+
+    async def read_custom_metric(self, workspace_id):
+        '''
+        Read the custom metric line to ntcore monitoring service.
+
+        PARAMETERS
+        ----
+        workspace_id: str
+        '''
+        return await self._api_client.doGet(self.__build_url("monitoring", "custommetrics", workspace_id))
+
+    async def upload_ground_truth(self, input_data, ground_truth, timestamp=None):
+        '''
+        Upload ground truth data to ntcore monitoring service.
+
+        PARAMETERS
+        ----
+        input_data: JSON String
+        ground_truth: any
+        timestamp: long
+        '''
+        input_data_json_string = json.dumps(input_data)
+        data = dict(workspaceId = self._workspace_id, inputData = input_data_json_string, groundTruth = ground_truth)
+        if timestamp:
+            data['timestamp'] = timestamp
+
+        return await self._api_client.doPost(self.__build_url("monitoring", "performances"), data)
+
+    async def log(self, message):
+        '''
+        Emits the log event to ntcore monitoring service.
+
+        PARAMETERS
+        ----
+        message: str
+        '''
+        data = dict(event = dict(message = message, time = int(time.time() * 1000)))
+        return await self._api_client.doPost(self.__build_url("monitoring", self._workspace_id, "events"), data)
+
+    async def aclose(self):
+        '''
+        Closes the pooled connections.
+        '''
+        await self._api_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    def __build_url(self, *paths):
+        '''
+        Returns the NTCore endpoint for sending experiment data.
+        '''
+        return '/'.join(s.strip('/') for s in paths)
+
+    def get_workspace_id(self):
+        '''
+        Returns the workspace id for this monitor.
+        '''
+        return self._workspace_id
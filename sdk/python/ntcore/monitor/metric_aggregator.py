@@ -0,0 +1,191 @@
+import atexit, logging, math, threading
+
+# Relative error of the quantiles reported by a histogram.
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Quantiles emitted for every histogram, with the suffix of their metric names.
+DEFAULT_QUANTILES = ((0.5, "P50"), (0.9, "P90"), (0.99, "P99"))
+
+# Seconds between two emissions of the aggregated metrics.
+DEFAULT_AGGREGATION_INTERVAL = 60.0
+
+# Values below this are counted in the zero bucket.
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class Histogram:
+    '''
+    Mergeable quantile sketch with logarithmic buckets, so that every reported quantile
+    is within relative_accuracy of an actual value. Memory grows with the logarithm of the
+    value range rather than the number of values.
+    '''
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        '''
+        Initialize an empty histogram.
+
+        PARAMETERS
+        ----
+        relative_accuracy: float, between 0 and 1 exclusive
+        '''
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy should be between 0 and 1')
+        self._relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = {}
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        '''
+        Adds a value, negative values are counted as zero for the quantiles.
+        '''
+        if value > MIN_INDEXABLE_VALUE:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[key] = self._buckets.get(key, 0) + 1
+        else:
+            self._zero_count += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        '''
+        Adds the values of another histogram with the same relative accuracy.
+        '''
+        if other._gamma != self._gamma:
+            raise ValueError('Histograms with different relative accuracies cannot be merged')
+        for key, count in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + count
+        self._zero_count += other._zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        '''
+        Returns the estimated q-quantile, or None if the histogram is empty.
+
+        PARAMETERS
+        ----
+        q: float, between 0 and 1 inclusive
+        '''
+        if not 0 <= q <= 1:
+            raise ValueError('q should be between 0 and 1')
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self._zero_count:
+            value = 0.0
+        else:
+            running = self._zero_count
+            for key in sorted(self._buckets):
+                running += self._buckets[key]
+                if running > rank:
+                    value = 2 * self._gamma ** key / (self._gamma + 1)
+                    break
+        return min(max(value, self.min), self.max)
+
+    def summary(self, quantiles=DEFAULT_QUANTILES):
+        '''
+        Returns count, sum, min, max and the given quantiles keyed by metric name suffix.
+        '''
+        summary = dict(Count = self.count, Sum = self.sum)
+        if self.count > 0:
+            summary.update(Min = self.min, Max = self.max)
+            for q, suffix in quantiles:
+                summary[suffix] = self.quantile(q)
+        return summary
+
+
+class MetricAggregator:
+    '''
+    Aggregates metrics in process and emits them through the monitor every interval, so
+    that the monitoring traffic stays constant whatever the request rate.
+    Counters are emitted as their total, e.g., Success, and histograms as one metric per
+    statistic, e.g., LatencyCount, LatencySum, LatencyMin, LatencyMax, LatencyP50.
+    '''
+    def __init__(self, monitor, interval=DEFAULT_AGGREGATION_INTERVAL,
+                 quantiles=DEFAULT_QUANTILES, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        '''
+        Initialize the aggregator and start its emission thread.
+
+        PARAMETERS
+        ----
+        monitor: Monitor
+        interval: float, seconds between two emissions
+        quantiles: tuple of (quantile, metric name suffix)
+        relative_accuracy: float, relative error of the emitted quantiles
+        '''
+        if interval <= 0:
+            raise ValueError('interval should be positive')
+        self._monitor = monitor
+        self._interval = interval
+        self._quantiles = quantiles
+        self._relative_accuracy = relative_accuracy
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(name='aggregate_metrics', target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def increment(self, name, value=1.0):
+        '''
+        Adds the value to the counter with the given name.
+        '''
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record(self, name, value):
+        '''
+        Adds the value to the histogram with the given name.
+        '''
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self._relative_accuracy)
+            histogram.add(value)
+
+    def flush(self):
+        '''
+        Emits the metrics aggregated since the last emission.
+        '''
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+        for name, value in counters.items():
+            self._monitor.add_metric(name, value)
+        for name, histogram in histograms.items():
+            for suffix, value in histogram.summary(self._quantiles).items():
+                self._monitor.add_metric(name + suffix, value)
+        if (counters or histograms) and hasattr(self._monitor, 'flush'):
+            self._monitor.flush()
+
+    def close(self):
+        '''
+        Stops the emission thread and emits the remaining metrics.
+        '''
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        atexit.unregister(self.close)
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        '''
+        Emits the aggregated metrics every interval.
+        '''
+        while not self._closed.wait(self._interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.warning('Unable to emit aggregated metrics: {0}'.format(e))
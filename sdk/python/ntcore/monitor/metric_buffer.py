@@ -0,0 +1,153 @@
+import atexit, logging, threading, time
+
+# Number of buffered metric points that triggers a flush.
+DEFAULT_BATCH_SIZE = 500
+
+# Seconds a metric point may wait in the buffer before it is flushed.
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+# Seconds to wait for the pending batches on close.
+DEFAULT_CLOSE_TIMEOUT = 10.0
+
+
+class MetricBuffer:
+    '''
+    Collects metric points in memory and hands them to the sender in batches, once the buffer
+    holds batch_size points or its oldest point is flush_interval seconds old. The remaining
+    points are flushed on close, which also runs at interpreter exit.
+    '''
+    def __init__(self, send, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        '''
+        Initialize the metric buffer and start its flush thread.
+
+        PARAMETERS
+        ----
+        send: callable, sends a list of metric points and returns a future, a list of futures or the response
+        batch_size: int, number of buffered points that triggers a flush
+        flush_interval: float, seconds a point may wait in the buffer before it is flushed
+        '''
+        if batch_size < 1:
+            raise ValueError('batch_size should be at least 1')
+        if flush_interval <= 0:
+            raise ValueError('flush_interval should be positive')
+        self._send = send
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._points = []
+        self._oldest = None
+        self._pending = set()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(name='flush_metrics', target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, name, value, timestamp=None):
+        '''
+        Buffers a metric point, the batch is sent on the caller's thread if it is full.
+
+        PARAMETERS
+        ----
+        name: str
+        value: float
+        timestamp: long, milliseconds since epoch, defaults to now
+        '''
+        point = dict(name = name, value = value, timestamp = timestamp or int(time.time() * 1000))
+        with self._condition:
+            if self._closed:
+                raise ValueError('Metric buffer is closed')
+            if not self._points:
+                self._oldest = time.monotonic()
+                self._condition.notify()
+            self._points.append(point)
+            batch = self._drain() if len(self._points) >= self._batch_size else None
+        if batch:
+            self._dispatch(batch)
+
+    def flush(self):
+        '''
+        Sends the buffered points now.
+        '''
+        with self._condition:
+            batch = self._drain()
+        if batch:
+            self._dispatch(batch)
+
+    def close(self, timeout=DEFAULT_CLOSE_TIMEOUT):
+        '''
+        Stops the flush thread, sends the buffered points and waits for the pending batches.
+
+        PARAMETERS
+        ----
+        timeout: float, seconds to wait for the pending batches
+        '''
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            batch = self._drain()
+            self._condition.notify()
+        atexit.unregister(self.close)
+        if batch:
+            self._dispatch(batch)
+        deadline = time.monotonic() + timeout
+        # The flush thread may be sending a batch it drained before close, which is pending once it returns.
+        if self._thread is not threading.current_thread():
+            self._thread.join(max(deadline - time.monotonic(), 0))
+        with self._condition:
+            pending = list(self._pending)
+        for future in pending:
+            try:
+                future.result(timeout=max(deadline - time.monotonic(), 0))
+            except Exception as e:
+                logging.warning('Unable to flush metrics: {0}'.format(e))
+
+    def __len__(self):
+        with self._condition:
+            return len(self._points)
+
+    def _drain(self):
+        '''
+        Returns and clears the buffered points, the condition must be held.
+        '''
+        batch, self._points, self._oldest = self._points, [], None
+        return batch
+
+    def _dispatch(self, batch):
+        '''
+        Sends a batch, keeping track of it until it completes.
+        '''
+        try:
+            result = self._send(batch)
+        except Exception as e:
+            logging.warning('Unable to flush {0} metrics: {1}'.format(len(batch), e))
+            return
+        for future in result if isinstance(result, list) else [result]:
+            if hasattr(future, 'add_done_callback'):
+                with self._condition:
+                    self._pending.add(future)
+                future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._condition:
+            self._pending.discard(future)
+
+    def _run(self):
+        '''
+        Flushes the buffer once its oldest point is flush_interval seconds old.
+        '''
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if not self._points:
+                        self._condition.wait()
+                        continue
+                    remaining = self._oldest + self._flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+                batch = self._drain()
+            self._dispatch(batch)
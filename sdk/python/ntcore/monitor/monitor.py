@@ -1,6 +1,16 @@
 from abc import ABC
 from ..resources.api_async_client import ApiAsyncClient
-import json, time
+from .metric_buffer import MetricBuffer, DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL
+from .spool import Spool, DEFAULT_SHIP_BATCH_SIZE, DEFAULT_SHIP_INTERVAL, DEFAULT_SEGMENT_BYTES, DEFAULT_SPOOL_MAX_BYTES
+from ..resources.api_client import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, DEFAULT_CONNECT_TIMEOUT, \
+    DEFAULT_READ_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_BACKOFF_FACTOR, DEFAULT_BACKOFF_JITTER
+from ..resources.compression import DEFAULT_COMPRESSION_THRESHOLD
+from ..resources.bounded_executor import DEFAULT_QUEUE_TIMEOUT
+from ..exceptions.exceptions import NTCoreAPIException
+import json, logging, time
+
+# Suggested maximum number of monitoring calls waiting to be sent, a bound on the memory and the staleness of telemetry.
+DEFAULT_QUEUE_SIZE = 10000
 
 class Monitor(ABC):
     """
@@ -15,7 +25,28 @@ class Monitor(ABC):
                 program_token=None, 
                 server="http://localhost:8000/",
                 encryption_data=None,
-                api_token=None):
+                api_token=None,
+                pool_connections=DEFAULT_POOL_CONNECTIONS,
+                pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                read_timeout=DEFAULT_READ_TIMEOUT,
+                max_retries=DEFAULT_MAX_RETRIES,
+                backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                backoff_jitter=DEFAULT_BACKOFF_JITTER,
+                compression=None,
+                compression_level=None,
+                compression_threshold=DEFAULT_COMPRESSION_THRESHOLD,
+                buffered=False,
+                batch_size=DEFAULT_BATCH_SIZE,
+                flush_interval=DEFAULT_FLUSH_INTERVAL,
+                spool_dir=None,
+                spool_batch_size=DEFAULT_SHIP_BATCH_SIZE,
+                spool_interval=DEFAULT_SHIP_INTERVAL,
+                spool_segment_bytes=DEFAULT_SEGMENT_BYTES,
+                spool_max_bytes=DEFAULT_SPOOL_MAX_BYTES,
+                queue_size=None,
+                queue_policy='block',
+                queue_timeout=DEFAULT_QUEUE_TIMEOUT):
         '''
         Generate Monitor class
         This is the general Python interface that user can monitor the ML/AL models.
@@ -28,17 +59,57 @@ class Monitor(ABC):
         program_token: str 
         server: str
         encryption_data: str
+        pool_connections: int, number of per-host connection pools to keep alive
+        pool_maxsize: int, maximum connections kept alive per host, also the number of sender threads
+        connect_timeout: float, seconds to wait for a connection
+        read_timeout: float, seconds to wait between bytes received
+        max_retries: int, maximum retries per request, 0 disables retries
+        backoff_factor: float, retries back off backoff_factor * 2 ** (retries - 1) seconds
+        backoff_jitter: float, upper bound in seconds of the random jitter added to every backoff
+        compression: str, content encoding of request bodies, gzip or zstd, None disables compression
+        compression_level: int, compression level, the default of the encoding if None
+        compression_threshold: int, size in bytes under which request bodies are sent uncompressed
+        buffered: bool, whether add_metric buffers the metric points and posts them together from the flush thread, each through monitoring/metrics
+        batch_size: int, number of buffered metric points that triggers a flush
+        flush_interval: float, seconds a buffered metric point may wait before it is posted
+        spool_dir: str, directory of a local spool that metrics, logs and ground truth are written to and shipped from in the background, one request per record through their usual routes and at least once, None sends them right away
+        spool_batch_size: int, number of spooled records shipped per batch
+        spool_interval: float, seconds between two shipments of the spool
+        spool_segment_bytes: int, bytes of a spool segment before it is sealed for shipping
+        spool_max_bytes: int, budget in bytes of the spool, the oldest records are dropped beyond it
+        queue_size: int, maximum number of calls waiting to be sent, e.g., DEFAULT_QUEUE_SIZE, None leaves the queue unbounded
+        queue_policy: str, what to do with a call made while the queue is full, block, drop_oldest, drop_newest or sample, the future of a dropped call is cancelled, reads such as read_custom_metric are never dropped
+        queue_timeout: float, seconds a call waits for room in the queue with the block policy before it is dropped
         '''
         self._workspace_id = workspace_id
         self._username = username
         self._password = password
         self._program_token = program_token
         self._server = server
-        self._api_client = ApiAsyncClient(self._username, self._password, self._server, encryption_data, api_token)
+        self._api_client = ApiAsyncClient(
+            self._username, self._password, self._server, encryption_data, api_token,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            compression=compression,
+            compression_level=compression_level,
+            compression_threshold=compression_threshold,
+            queue_size=queue_size,
+            queue_policy=queue_policy,
+            queue_timeout=queue_timeout)
+        self._metric_buffer = MetricBuffer(self._add_metrics, batch_size, flush_interval) if buffered and spool_dir is None else None
+        self._spool = Spool(spool_dir, self._ship, spool_batch_size, spool_interval, spool_segment_bytes, spool_max_bytes) \
+            if spool_dir is not None else None
 
     def add_metric(self, name, value):
         '''
         Emits the metric line to ntcore monitoring service.
+        In buffered mode the metric line is posted with the next flush and None is returned,
+        with a spool it is written to the spool and None is returned.
         
         PARAMETERS
         ----
@@ -46,8 +117,70 @@ class Monitor(ABC):
         name: str
         value: float
         '''
+        if self._metric_buffer is not None:
+            return self._metric_buffer.add(name, value)
         data = dict(workspaceId = self._workspace_id, name = name, value = value)
-        return self._api_client.doPost(self.__build_url("monitoring", "metrics"), data)
+        return self.__send(self.__build_url("monitoring", "metrics"), data)
+
+    def _add_metrics(self, metrics):
+        '''
+        Emits a batch of metric lines to ntcore monitoring service, one request per metric line
+        as the monitoring service has no batch route. Returns the futures of the requests.
+
+        PARAMETERS
+        ----
+        metrics: list of dict with name, value and timestamp, the monitoring service stamps the metric lines on arrival
+        '''
+        url = self.__build_url("monitoring", "metrics")
+        return [self._api_client.doPost(url, dict(workspaceId = self._workspace_id, name = metric['name'], value = metric['value']))
+                for metric in metrics]
+
+    def _ship(self, records):
+        '''
+        Sends a batch of spooled records and waits for the answers, one request per record through its
+        usual route as the monitoring service has no batch route. Raises if a record should be shipped
+        again later, the spool then ships the whole batch again, records already accepted included,
+        so delivery is at least once. Records rejected as invalid are dropped.
+
+        PARAMETERS
+        ----
+        records: list of dict with the url and data of a request
+        '''
+        futures = [self._api_client.doPost(record['url'], record['data']) for record in records]
+        for future in futures:
+            response = future.result()
+            if response.status_code == 429 or response.status_code >= 500:
+                raise NTCoreAPIException({'errors': [{'code': 'INTERNAL_ERROR', 'message': 'Monitoring answered {}'.format(response.status_code)}]})
+            if response.status_code >= 400:
+                logging.warning('Dropping spooled monitoring records rejected with {}'.format(response.status_code))
+
+    def __send(self, url, data):
+        '''
+        Posts data to the monitoring service, through the spool if there is one.
+        '''
+        if self._spool is not None:
+            return self._spool.append(dict(url = url, data = data))
+        return self._api_client.doPost(url, data)
+
+    def flush(self):
+        '''
+        Sends the buffered metric lines now, or ships the spool, a no-op if the monitor is neither buffered nor spooled.
+        '''
+        if self._metric_buffer is not None:
+            self._metric_buffer.flush()
+        if self._spool is not None:
+            self._spool.flush()
+
+    def close(self):
+        '''
+        Sends the buffered metric lines and waits for the pending requests.
+        With a spool, what could not be shipped stays on disk for the next monitor using the same spool_dir.
+        It also runs at interpreter exit.
+        '''
+        if self._metric_buffer is not None:
+            self._metric_buffer.close()
+        if self._spool is not None:
+            self._spool.close()
 
     def add_custom_metric(self, name, type, formula):
          '''
@@ -63,7 +196,7 @@ class Monitor(ABC):
          data = dict(workspaceId = self._workspace_id, name = name, type = type, formula = formula)
          return self._api_client.doPost(self.__build_url("monitoring", "custommetrics"), data)
 
-     def read_custom_metric(self, workspace_id):
+    def read_custom_metric(self, workspace_id):
          '''
          Read the custom metric line to ntcore monitoring service.
          
@@ -76,6 +209,7 @@ class Monitor(ABC):
     def upload_ground_truth(self, input_data, ground_truth, timestamp=None):
         '''
         Upload ground truth data to ntcore monitoring service.
+        With a spool it is written to the spool and None is returned.
         
         PARAMETERS
         ----
@@ -90,18 +224,19 @@ class Monitor(ABC):
         if timestamp:
             data['timestamp'] = timestamp
             
-        return self._api_client.doPost(self.__build_url("monitoring", "performances"), data)
+        return self.__send(self.__build_url("monitoring", "performances"), data)
 
     def log(self, message):
         '''
         Emits the log event to ntcore monitoring service.
+        With a spool it is written to the spool and None is returned.
 
         PARAMETERS
         ----
         message: str
         '''
         data = dict(event = dict(message = message, time = int(time.time() * 1000)))
-        return self._api_client.doPost(self.__build_url("monitoring", self._workspace_id, "events"), data)
+        return self.__send(self.__build_url("monitoring", self._workspace_id, "events"), data)
 
     def __build_url(self, *paths):
         '''
@@ -109,6 +244,13 @@ class Monitor(ABC):
         '''
         return '/'.join(s.strip('/') for s in paths)
 
+    def get_queue_stats(self):
+        '''
+        Returns the number of calls submitted, dropped and delayed by a full queue, the seconds
+        spent waiting for room and the number of calls waiting to be sent.
+        '''
+        return self._api_client.queueStats()
+
     def get_workspace_id(self):
         '''
         Returns the workspace id for this monitor.
@@ -1,10 +1,19 @@
 import time
 from functools import wraps
+from .metric_aggregator import MetricAggregator, DEFAULT_AGGREGATION_INTERVAL
 
-def service_metrics(monitor):
+def service_metrics(monitor, aggregate=False, interval=DEFAULT_AGGREGATION_INTERVAL):
     """
     Decorator for publishing service metrics.
+    With aggregate, Success and Error are counted and Latency goes into a histogram, emitted
+    as totals and LatencyCount, LatencySum, LatencyMin, LatencyMax, LatencyP50, LatencyP90
+    and LatencyP99 every interval seconds instead of one metric line per call.
     """
+    if aggregate:
+        aggregator = MetricAggregator(monitor, interval)
+        count, observe = aggregator.increment, aggregator.record
+    else:
+        count, observe = lambda name: monitor.add_metric(name, 1.0), monitor.add_metric
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
@@ -12,13 +21,13 @@ def service_metrics(monitor):
             res = None
             try:
                 res = fn(*args, **kwargs), 200
-                monitor.add_metric("Success", 1.0)
+                count("Success")
             except Exception as e:
-                monitor.add_metric("Error", 1.0)
+                count("Error")
                 res = {"error": str(e)}, 403
             finally:
-                monitor.add_metric("Latency", round(time.time() * 1000) - start_time)
+                observe("Latency", round(time.time() * 1000) - start_time)
             return res
         return decorator
-    
-    return wrapper
\ No newline at end of file
+
+    return wrapper
@@ -0,0 +1,277 @@
+import atexit, json, logging, os, random, shutil, threading, time, uuid
+try:
+    import fcntl
+except ImportError:
+    # Windows, spool directories left by other processes are then not adopted.
+    fcntl = None
+
+# Bytes of a segment file before it is sealed and a new one is started.
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+
+# Budget in bytes of the spool of a process, the oldest segments are dropped beyond it.
+DEFAULT_SPOOL_MAX_BYTES = 1024 * 1024 * 1024
+
+# Number of records shipped per batch.
+DEFAULT_SHIP_BATCH_SIZE = 1000
+
+# Seconds between two shipments, the active segment is sealed once it is this old.
+DEFAULT_SHIP_INTERVAL = 5.0
+
+# Upper bound in seconds of the backoff after a failed shipment.
+DEFAULT_MAX_BACKOFF = 300.0
+
+# Seconds to wait for the spool to drain on close.
+DEFAULT_CLOSE_TIMEOUT = 10.0
+
+_SEGMENT_SUFFIX = '.jsonl'
+
+
+class Spool:
+    '''
+    Write-ahead spool of monitoring records on local disk.
+
+    Records are appended as JSON lines to the active segment of the process's own directory under
+    root, so appending never waits on the network. Segments are sealed once they reach segment_bytes
+    or are ship_interval seconds old, and a background thread ships sealed segments in batches of
+    batch_size records, backing off exponentially while shipping fails. The position reached in a
+    segment is checkpointed after every batch, so records are delivered at least once, and the
+    directories left by processes that exited are drained too.
+    '''
+    def __init__(self, root, ship, batch_size=DEFAULT_SHIP_BATCH_SIZE, ship_interval=DEFAULT_SHIP_INTERVAL,
+                 segment_bytes=DEFAULT_SEGMENT_BYTES, max_bytes=DEFAULT_SPOOL_MAX_BYTES, max_backoff=DEFAULT_MAX_BACKOFF):
+        '''
+        Initialize the spool and start its shipping thread.
+
+        PARAMETERS
+        ----
+        root: str, spool directory shared by the processes of a host, created if missing
+        ship: callable, sends a list of records and raises if they should be shipped again later
+        batch_size: int, number of records shipped per batch
+        ship_interval: float, seconds between two shipments
+        segment_bytes: int, bytes of a segment before it is sealed
+        max_bytes: int, budget in bytes of the spool of this process, the oldest segments are dropped beyond it
+        max_backoff: float, upper bound in seconds of the backoff after a failed shipment
+        '''
+        if batch_size < 1:
+            raise ValueError('batch_size should be at least 1')
+        if ship_interval <= 0:
+            raise ValueError('ship_interval should be positive')
+        self._root = root
+        self._ship = ship
+        self._batch_size = batch_size
+        self._ship_interval = ship_interval
+        self._segment_bytes = segment_bytes
+        self._max_bytes = max_bytes
+        self._max_backoff = max_backoff
+        name = '{}-{}'.format(os.getpid(), uuid.uuid4().hex[:8])
+        self._dir = os.path.join(root, name)
+        # The directory is locked under a hidden name, which other processes don't adopt, before it
+        # appears under its own name, so it can't be adopted and removed while it is being created.
+        pending_dir = os.path.join(root, '.' + name)
+        os.makedirs(pending_dir)
+        self._lock_file = self.__lock(pending_dir, blocking=True)
+        os.rename(pending_dir, self._dir)
+        self._sequence = 0
+        self._active = None
+        self._active_bytes = 0
+        self._active_since = None
+        self._flushing = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(name='ship_spool', target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, record):
+        '''
+        Appends a JSON serializable record to the spool.
+        '''
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._condition:
+            if self._closed:
+                raise ValueError('Spool is closed')
+            if self._active is None:
+                self._active = open(self.__segment_path(self._dir, self._sequence), 'ab')
+                self._active_since = time.monotonic()
+            # Written through to the OS, so records survive the process exiting.
+            self._active.write(line)
+            self._active.flush()
+            self._active_bytes += len(line)
+            if self._active_bytes >= self._segment_bytes:
+                self._seal()
+
+    def flush(self, timeout=DEFAULT_CLOSE_TIMEOUT):
+        '''
+        Seals the active segment and waits until the spool is drained. Returns False if records
+        are still spooled after timeout seconds.
+        '''
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+            while self.size() > 0 and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            self._flushing = False
+            return self.size() == 0
+
+    def close(self, timeout=DEFAULT_CLOSE_TIMEOUT):
+        '''
+        Ships what it can within timeout seconds and stops the shipping thread. Records left on
+        disk are shipped by the next spool opened on the same root.
+        '''
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._seal()
+            self._condition.notify_all()
+        atexit.unregister(self.close)
+        self._thread.join(timeout)
+        if not self.__segments(self._dir):
+            shutil.rmtree(self._dir, ignore_errors=True)
+        self._lock_file.close()
+
+    def size(self):
+        '''
+        Returns the number of spooled bytes of this process, shipped or not.
+        '''
+        return sum(os.path.getsize(path) for path in self.__segments(self._dir))
+
+    def _seal(self):
+        '''
+        Seals the active segment and drops the oldest segments beyond the budget, the condition must be held.
+        '''
+        if self._active is None:
+            return
+        self._active.close()
+        self._active, self._active_bytes, self._active_since = None, 0, None
+        self._sequence += 1
+        segments = self.__segments(self._dir)
+        total = sum(os.path.getsize(path) for path in segments)
+        for path in segments:
+            if total <= self._max_bytes:
+                break
+            size = os.path.getsize(path)
+            logging.warning('Monitoring spool is over budget, dropping {} bytes'.format(size))
+            self.__remove(path)
+            total -= size
+
+    def _run(self):
+        '''
+        Ships the sealed segments every ship_interval, backing off while shipping fails.
+        '''
+        failures = 0
+        while True:
+            with self._condition:
+                if failures > 0:
+                    self._condition.wait(self.__backoff(failures))
+                elif not self._closed and not self._flushing:
+                    self._condition.wait(self._ship_interval)
+                if self._active is not None and (self._flushing or self._closed or time.monotonic() - self._active_since >= self._ship_interval):
+                    self._seal()
+                sealed = [path for path in self.__segments(self._dir) if self.__sequence(path) < self._sequence]
+                closed = self._closed
+            try:
+                for path in sealed:
+                    self._ship_segment(path)
+                self._adopt()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logging.warning('Unable to ship monitoring records, retrying: {}'.format(e))
+            with self._condition:
+                self._condition.notify_all()
+            if closed:
+                return
+
+    def _ship_segment(self, path):
+        '''
+        Ships the records of a sealed segment from its checkpoint on, then removes it.
+        '''
+        offset_path = path + '.offset'
+        try:
+            with open(offset_path) as f:
+                offset = int(f.read())
+        except (OSError, ValueError):
+            offset = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                lines = [line for line in (f.readline() for _ in range(self._batch_size)) if line]
+                if not lines:
+                    break
+                records = []
+                for line in lines:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A record torn by a crash while it was appended.
+                        logging.warning('Skipping a corrupt monitoring record in {}'.format(path))
+                if records:
+                    self._ship(records)
+                offset = f.tell()
+                with open(offset_path + '.tmp', 'w') as checkpoint:
+                    checkpoint.write(str(offset))
+                os.replace(offset_path + '.tmp', offset_path)
+        self.__remove(path)
+
+    def _adopt(self):
+        '''
+        Ships and removes the spool directories of the processes which exited.
+        '''
+        if fcntl is None:
+            return
+        for name in os.listdir(self._root):
+            directory = os.path.join(self._root, name)
+            if name.startswith('.') or directory == self._dir or not os.path.isdir(directory):
+                continue
+            lock_file = self.__lock(directory, blocking=False)
+            if lock_file is None:
+                continue
+            try:
+                for path in self.__segments(directory):
+                    self._ship_segment(path)
+                shutil.rmtree(directory, ignore_errors=True)
+            finally:
+                lock_file.close()
+
+    def __backoff(self, failures):
+        return min(self._ship_interval * 2 ** (failures - 1), self._max_backoff) * random.uniform(0.5, 1)
+
+    def __lock(self, directory, blocking):
+        '''
+        Returns the open lock file of a spool directory, or None if another process holds it.
+        '''
+        lock_file = open(os.path.join(directory, '.lock'), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except OSError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    def __segments(self, directory):
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(directory, name) for name in names if name.endswith(_SEGMENT_SUFFIX))
+
+    def __segment_path(self, directory, sequence):
+        return os.path.join(directory, '{:012d}{}'.format(sequence, _SEGMENT_SUFFIX))
+
+    def __sequence(self, path):
+        return int(os.path.basename(path)[:-len(_SEGMENT_SUFFIX)])
+
+    def __remove(self, path):
+        for target in (path, path + '.offset'):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
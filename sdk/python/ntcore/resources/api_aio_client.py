@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import json
+import os
+from .api_client import ApiClient, DOWNLOAD_CHUNK_SIZE
+from .multipart import encodeMultipart, UPLOAD_CHUNK_SIZE
+from .retry import IDEMPOTENT_METHODS, RETRY_STATUSES, backoffTime
+from ..exceptions.exceptions import NTCoreAPIException
+try:
+    from urllib.parse import urljoin
+except ImportError:
+    from urlparse import urljoin  # Python 2
+
+
+class ApiAioClient(ApiClient):
+    '''
+    The NTCore API Client for asyncio, built on httpx.
+
+    Every request method is a coroutine and responses go through the same JSON, error and
+    decryption handling as ApiClient.
+
+    :param username:
+        The username of this API user. **REQUIRED**
+    :param password:
+        The password of this API user. **REQUIRED**
+    :param server:
+        The base URL of the API. **REQUIRED**
+    :param encryptionData:
+        Array with params for encrypted requests(Fields: clientPrivateKeySetLocation, keySetLocation).
+
+    :param json_body:
+        Whether dictionary bodies are sent as JSON, as the monitoring endpoints expect, rather than form encoded.
+
+    Connection pool, timeout, retry and compression options are the same as ApiClient's.
+
+    .. note::
+        Requires the httpx package, i.e., ``pip install ntcore[async]``.
+    '''
+
+    def __init__(self, *args, json_body=False, **kwargs):
+        self.jsonBody = json_body
+        super().__init__(*args, **kwargs)
+
+    def _createSession(self, api_token):
+        '''
+        Returns the httpx client used to send requests.
+
+        :param api_token:
+            Bearer token used instead of the username and password if provided.
+        '''
+
+        import httpx
+
+        headers = dict(self.baseHeaders)
+        auth = None
+        if api_token is not None:
+            headers['Authorization'] = 'Bearer {0}'.format(api_token)
+        elif self.username is not None or self.password is not None:
+            auth = (self.username or '', self.password or '')
+        connectTimeout, readTimeout = self.timeout
+        return httpx.AsyncClient(
+            headers=headers,
+            auth=auth,
+            timeout=httpx.Timeout(connect=connectTimeout, read=readTimeout, write=readTimeout, pool=connectTimeout),
+            limits=httpx.Limits(max_connections=self.poolConnections * self.poolMaxsize, max_keepalive_connections=self.poolMaxsize))
+
+    async def aclose(self):
+        '''
+        Closes the pooled connections.
+        '''
+        await self.session.aclose()
+
+    async def _send(self, method, url, stream=False, replayable=True, **kwargs):
+        '''
+        Sends a request, retrying connection failures and, for idempotent methods, read failures
+        and transient statuses with exponential backoff.
+
+        :param method:
+            The HTTP method to use for the request. **REQUIRED**
+        :param url:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param stream:
+            Whether to return the response before its body is read, it must then be closed by the caller.
+        :param replayable:
+            Whether the request body can be sent again, streamed bodies are only retried on connection failures.
+        :returns:
+            The httpx response.
+        '''
+
+        import httpx
+
+        retryable = method in IDEMPOTENT_METHODS and replayable
+        retries = 0
+        span = self._startSpan(method, url, kwargs.get('headers'), kwargs.get('content', kwargs.get('data')))
+        kwargs['headers'] = span.headers
+        while True:
+            request = self.session.build_request(method, urljoin(self.baseUrl, url), **kwargs)
+            retryAfter = None
+            try:
+                response = await self.session.send(request, stream=stream)
+                if retries >= self.maxRetries or not retryable or response.status_code not in RETRY_STATUSES:
+                    self._finishSpan(span, response, retries=retries, streamed=stream)
+                    return response
+                retryAfter = response.headers.get('Retry-After')
+                await response.aclose()
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached the server.
+                if retries >= self.maxRetries:
+                    self._finishSpan(span, error=e, retries=retries)
+                    raise self._connectionError(e)
+            except httpx.TransportError as e:
+                if retries >= self.maxRetries or not retryable:
+                    self._finishSpan(span, error=e, retries=retries)
+                    raise self._connectionError(e)
+            retries += 1
+            await asyncio.sleep(backoffTime(retries, self.backoffFactor, self.backoffJitter, retryAfter))
+
+    async def _makeRequest(self,
+                           method=None,
+                           url=None,
+                           data=None,
+                           headers=None,
+                           params=None,
+                           files=None):
+        '''
+        Process an API response to ensure a JSON object is returned always.
+
+        :param method:
+            The HTTP method to use for the request. **REQUIRED**
+        :param url:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param data:
+            A dictionary containing data for the request body.
+        :param headers:
+            A dictionary containing additional request headers.
+        :param params:
+            A dictionary containing query parameters.
+        :returns:
+            A JSON object containing the response data or an error object.
+        '''
+
+        headers = dict(headers or {})
+        if files is not None:
+            data = encodeMultipart(data, files)
+            headers['Content-Type'] = data.content_type
+
+        body = self._getRequestData(data)
+        compressedBody, compressedHeaders = self._compressRequestData(body, headers, jsonEncode=self.jsonBody)
+        response = await self._send(method, url, **self.__requestArgs(compressedBody, compressedHeaders, params))
+        if response.status_code == 415 and compressedBody is not body:
+            # The API doesn't decode this content encoding, send it as it is from now on.
+            self.compression = None
+            response = await self._send(method, url, **self.__requestArgs(body, headers, params))
+        return self._processResponse(response)
+
+    def __requestArgs(self, body, headers, params):
+        '''
+        Returns the arguments passing the body to httpx, blocking file objects and iterables
+        are read on the default executor.
+        '''
+
+        kwargs = dict(headers=headers, params=params)
+        if isinstance(body, dict) and self.jsonBody:
+            headers.setdefault('Content-Type', 'application/json')
+            kwargs['content'] = json.dumps(body).encode('utf-8')
+        elif isinstance(body, dict):
+            kwargs['data'] = body
+        elif hasattr(body, 'read') or (hasattr(body, '__iter__') and not isinstance(body, (bytes, str))):
+            if hasattr(body, 'len'):
+                headers['Content-Length'] = str(body.len)
+            kwargs['content'] = _aiterBody(body)
+            kwargs['replayable'] = False
+        elif body is not None:
+            kwargs['content'] = body
+        return kwargs
+
+    async def doGet(self, partialUrl, params={}):
+        '''
+        Submit a GET to the API.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param params:
+            A dictionary containing query parameters.
+        :returns:
+            The API response.
+        '''
+
+        return await self._makeRequest(method='GET', url=partialUrl, params=params)
+
+    async def doPost(self, partialUrl, data, files=None, headers={}):
+        '''
+        Submit a POST to the API.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param data:
+            A dictionary containing data for the request body. **REQUIRED**
+        :param files:
+            A dictionary of file parts as ``bytes``, readable binary file objects or iterables of
+            ``bytes``, streamed as a multipart body.
+        :param headers:
+            A dictionary containing additional request headers.
+        :returns:
+            The API response.
+        '''
+
+        return await self._makeRequest(method='POST', url=partialUrl, data=data, files=files, headers=headers)
+
+    async def doPut(self, partialUrl, data):
+        '''
+        Submit a PUT to the API.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param data:
+            A dictionary containing data for the request body. **REQUIRED**
+        :returns:
+            The API response.
+        '''
+
+        return await self._makeRequest(method='PUT', url=partialUrl, data=json.dumps(data).encode('utf-8'))
+
+    async def doDel(self, partialUrl):
+        '''
+        Submit a DELETE to the API.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :returns:
+            The API response.
+        '''
+
+        return await self._makeRequest(method='DELETE', url=partialUrl)
+
+    async def putDocument(self, partialUrl, data, files):
+        '''
+        Submit a multipart PUT to the API.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param data:
+            A dictionary containing data for the input documents. **REQUIRED**
+        :param files: Dictionary of ``'filename': file-like-objects``
+            for multipart encoding upload. **REQUIRED**
+        :returns:
+            The API response.
+        '''
+
+        return await self._makeRequest(method='PUT', url=partialUrl, data=data, files=files)
+
+    async def doDownload(self, partialUrl, path, params={}, digest=None, digestAlgorithm='sha256', chunkSize=DOWNLOAD_CHUNK_SIZE, resume=True):
+        '''
+        Stream a GET response from the API to a file on disk, see ApiClient.doDownload.
+
+        :returns:
+            The hex digest of the downloaded file.
+        '''
+
+        loop = asyncio.get_running_loop()
+        partialPath = path + '.part'
+        offset = os.path.getsize(partialPath) if resume and os.path.isfile(partialPath) else 0
+        headers = {}
+        if offset > 0:
+            # Byte ranges refer to the encoded representation, so ask for the identity encoding.
+            headers = {'Range': 'bytes={}-'.format(offset), 'Accept-Encoding': 'identity'}
+
+        response = await self._send('GET', partialUrl, stream=True, headers=headers, params=params)
+        try:
+            if response.status_code == 416 and offset > 0:
+                # The partial file is no longer a prefix of the remote object, start over.
+                os.remove(partialPath)
+                return await self.doDownload(partialUrl, path, params, digest, digestAlgorithm, chunkSize, resume=False)
+
+            if response.status_code >= 400 or response.status_code == 204:
+                await response.aread()
+                self._processResponse(response)
+                raise NTCoreAPIException({
+                    'errors': [{
+                        'code': 'DOWNLOAD_FAILED',
+                        'message': 'Unexpected status {} for {}'.format(response.status_code, partialUrl)
+                    }]
+                })
+
+            hasher = hashlib.new(digestAlgorithm)
+            if response.status_code == 206 and self._getRangeStart(response) == offset:
+                await loop.run_in_executor(None, self._hashFile, partialPath, hasher, chunkSize)
+                mode = 'ab'
+            else:
+                mode = 'wb'
+
+            import httpx
+            try:
+                with open(partialPath, mode) as f:
+                    async for chunk in response.aiter_bytes(chunk_size=chunkSize):
+                        await loop.run_in_executor(None, f.write, chunk)
+                        hasher.update(chunk)
+            except httpx.TransportError as e:
+                # The connection dropped mid-transfer, the partial file is kept for resuming.
+                raise NTCoreAPIException({
+                    'errors': [{
+                        'code': 'COMMUNICATION_ERROR',
+                        'message': 'Download from {} interrupted: {}'.format(self.server, e)
+                    }]
+                })
+        finally:
+            await response.aclose()
+
+        actual = hasher.hexdigest()
+        if digest is not None and actual != digest.lower():
+            os.remove(partialPath)
+            raise NTCoreAPIException({
+                'errors': [{
+                    'code': 'CHECKSUM_MISMATCH',
+                    'message': 'Expected {} digest {} but got {}'.format(digestAlgorithm, digest, actual)
+                }]
+            })
+
+        os.replace(partialPath, path)
+        return actual
+
+
+async def _aiterBody(body, chunkSize=UPLOAD_CHUNK_SIZE):
+    '''
+    Reads a blocking file object or iterable body on the default executor, one chunk at a time.
+    '''
+
+    loop = asyncio.get_running_loop()
+    if hasattr(body, 'read'):
+        read = lambda: body.read(chunkSize) or None
+    else:
+        iterator = iter(body)
+        read = lambda: next(iterator, None)
+    while True:
+        chunk = await loop.run_in_executor(None, read)
+        if chunk is None:
+            return
+        yield chunk
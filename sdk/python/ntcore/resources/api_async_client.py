@@ -1,11 +1,7 @@
 from .api_client import ApiClient
+from .bounded_executor import BoundedExecutor, DEFAULT_QUEUE_TIMEOUT
 from ..exceptions.exceptions import NTCoreAPIException
 from requests_futures.sessions import FuturesSession
-from requests_toolbelt.adapters.ssl import SSLAdapter
-try:
-    from urllib.parse import urljoin
-except ImportError:
-    from urlparse import urljoin  # Python 2
 
 
 class ApiAsyncClient(ApiClient):
@@ -20,20 +16,39 @@ class ApiAsyncClient(ApiClient):
         The base URL of the API. **REQUIRED**
     :param encryptionData:
         Array with params for encrypted requests(Fields: clientPrivateKeySetLocation, keySetLocation).
+
+    :param queue_size:
+        The maximum number of requests waiting for a thread, None leaves the queue unbounded.
+    :param queue_policy:
+        What to do with a request sent while the queue is full, one of QUEUE_POLICIES, see BoundedExecutor.
+        The future of a dropped request is cancelled, GET requests are never dropped.
+    :param queue_timeout:
+        Seconds a request waits for room in the queue with the block policy.
+
+    Connection pool, timeout, retry and compression options are the same as ApiClient's,
+    except that a 415 answer to a compressed body is returned as it is.
     '''
 
-    def __init__(self, username, password, server, encryptionData=None, api_token=None):
+    def __init__(self, *args, queue_size=None, queue_policy='block', queue_timeout=DEFAULT_QUEUE_TIMEOUT, **kwargs):
+        self.queueSize = queue_size
+        self.queuePolicy = queue_policy
+        self.queueTimeout = queue_timeout
+        super().__init__(*args, **kwargs)
+
+    def _newSession(self):
         '''
-        Create an instance of the API async client.
-        This client is used to make the calls to the NTCore API.
+        Returns a session sending requests on a thread pool as large as the connection pool.
         '''
-        super(ApiAsyncClient, self).__init__(username, password, server, encryptionData=encryptionData, api_token=api_token)
+        # Reads are awaited by their caller, only writes may be dropped by the queue policy.
+        self.executor = BoundedExecutor(self.poolMaxsize, self.queueSize, self.queuePolicy, self.queueTimeout,
+                                        droppable=lambda args, kwargs: kwargs.get('method') != 'GET')
+        return FuturesSession(executor=self.executor)
 
-        defaultSession = FuturesSession()
-        defaultSession.mount(self.server, SSLAdapter())
-        defaultSession.auth = (self.username, self.password)
-        defaultSession.headers = self.baseHeaders
-        self.session = defaultSession
+    def queueStats(self):
+        '''
+        Returns the counters of the request queue, see BoundedExecutor.stats.
+        '''
+        return self.executor.stats()
 
     def _makeRequest(self,
                      method=None,
@@ -62,11 +77,14 @@ class ApiAsyncClient(ApiClient):
             The NTCore API supports **GET**, **POST**, **PUT** and **DELETE**.
         '''
 
+        body = self._getRequestData(data)
+        compressedBody, headers = self._compressRequestData(body, headers, jsonEncode=True)
         try:
-            return self.session.request(
-                method=method,
-                url=urljoin(self.baseUrl, url),
-                json=self._getRequestData(data),
+            return self._sendRequest(
+                method,
+                url,
+                json=body if compressedBody is body else None,
+                data=None if compressedBody is body else compressedBody,
                 headers=headers,
                 params=params,
                 files=files
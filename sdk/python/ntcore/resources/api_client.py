@@ -1,17 +1,38 @@
 #!/usr/bin/env python
+import hashlib
 import json
+import os
 import requests
 import uuid
 from abc import ABC
-from .encryption import Encryption
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import closing
+from .chunked_upload import DEFAULT_PART_SIZE, DEFAULT_UPLOAD_CONCURRENCY, iterParts, sourceSize
+from .chunking import DEFAULT_CHUNK_BATCH, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_CHUNK_SIZE, DEFAULT_MIN_CHUNK_SIZE, chunkDigest, iterChunks
+from .compression import ACCEPT_ENCODING, DEFAULT_COMPRESSION_THRESHOLD, checkEncoding, compress
+from .instrumentation import RequestSpan, RequestStats, bodySize, endpointTemplate, runHooks
+from .multipart import encodeMultipart, isMultipartBody
+from .retry import buildRetry
 from ..exceptions.exceptions import NTCoreAPIException
 from ..__about__ import __version__
 from requests_toolbelt.adapters.ssl import SSLAdapter
 try:
-    from urllib.parse import urljoin
+    from urllib.parse import urljoin, urlencode
 except ImportError:
     from urlparse import urljoin  # Python 2
+    from urllib import urlencode
 
+# Number of bytes held in memory at a time while streaming a download to disk.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Connection pool, timeout and retry defaults.
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 300
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_BACKOFF_JITTER = 0.5
 
 class ApiClient(ABC):
     '''
@@ -25,16 +46,62 @@ class ApiClient(ABC):
         The base URL of the API. **REQUIRED**
     :param encryptionData:
         Array with params for encrypted requests(Fields: clientPrivateKeySetLocation, keySetLocation).
+    :param pool_connections:
+        The number of per-host connection pools to keep alive.
+    :param pool_maxsize:
+        The maximum number of connections kept alive per host.
+    :param connect_timeout:
+        Seconds to wait for a connection to the API, None waits forever.
+    :param read_timeout:
+        Seconds to wait between bytes received from the API, None waits forever.
+    :param max_retries:
+        The maximum number of retries per request, 0 disables retries. Connection failures are
+        retried for every method, read failures and 429/502/503/504 for idempotent methods only.
+    :param backoff_factor:
+        Retries back off exponentially, ``backoff_factor * 2 ** (retries - 1)`` seconds.
+    :param backoff_jitter:
+        The upper bound in seconds of the random jitter added to every backoff.
+    :param compression:
+        The content encoding of request bodies, ``gzip`` or ``zstd`` (requires the zstandard
+        package), None disables compression. Streamed multipart bodies are sent as they are.
+        If the API answers 415 to a compressed body, compression is turned off and the request sent again.
+    :param compression_level:
+        The compression level, 6 for gzip and 3 for zstd if None.
+    :param compression_threshold:
+        The size in bytes under which request bodies are sent uncompressed.
     '''
 
-    def __init__(self, username, password, server, encryptionData=None, api_token=None):
+    def __init__(self,
+                 username,
+                 password,
+                 server,
+                 encryptionData=None,
+                 api_token=None,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 backoff_jitter=DEFAULT_BACKOFF_JITTER,
+                 compression=None,
+                 compression_level=None,
+                 compression_threshold=DEFAULT_COMPRESSION_THRESHOLD):
         '''
         Create an instance of the API client.
         This client is used to make the calls to the NTCore API.
         '''
 
-        # Setup encryption for request/responses.
-        self.encryption = Encryption(**encryptionData) if encryptionData is not None else None
+        # Always-on request statistics and the request hooks, see addRequestHooks.
+        self.stats = RequestStats()
+        self.preRequestHooks = []
+        self.postRequestHooks = []
+
+        # Setup encryption for request/responses, the JOSE libraries are only imported when it is used.
+        self.encryption = None
+        if encryptionData is not None:
+            from .encryption import Encryption
+            self.encryption = Encryption(**encryptionData)
 
         # Base headers and the custom User-Agent to identify this client as the
         # NTCore SDK.
@@ -44,6 +111,8 @@ class ApiClient(ABC):
             'x-sdk-version': __version__,
             'x-sdk-contextId': str(uuid.uuid4()),
             'Accept': 'application/jose+json' if self.encrypted else 'application/json',
+            # Every response encoding the installed urllib3 can decode.
+            'Accept-Encoding': ACCEPT_ENCODING,
             # 'Content-Type': 'application/jose+json' if self.encrypted else 'application/json'
         }
 
@@ -54,21 +123,126 @@ class ApiClient(ABC):
         # The complete base URL of the API.
         self.baseUrl = urljoin(self.server, '/dsp/api/v1/')
 
-        # The default connection to persist authentication and SSL settings.
-        defaultSession = requests.Session()
-        defaultSession.mount(self.server, SSLAdapter())
+        # Timeouts applied to every request, as (connect, read).
+        self.timeout = (connect_timeout, read_timeout)
+        self.poolConnections = pool_connections
+        self.poolMaxsize = pool_maxsize
+        self.maxRetries = max_retries
+        self.backoffFactor = backoff_factor
+        self.backoffJitter = backoff_jitter
+
+        # Request body compression.
+        if compression is not None:
+            checkEncoding(compression)
+        self.compression = compression
+        self.compressionLevel = compression_level
+        self.compressionThreshold = compression_threshold
+
+        self.session = self._createSession(api_token)
+
+    def _createSession(self, api_token):
+        '''
+        Returns the session used to send requests.
+
+        :param api_token:
+            Bearer token used instead of the username and password if provided.
+        '''
+
+        # The default connection to persist authentication and SSL settings, the adapter
+        # keeps connections alive and retries transient failures.
+        defaultSession = self._newSession()
+        defaultSession.mount(self.server, SSLAdapter(
+            pool_connections=self.poolConnections,
+            pool_maxsize=self.poolMaxsize,
+            max_retries=buildRetry(self.maxRetries, self.backoffFactor, self.backoffJitter)))
         defaultSession.headers = self.baseHeaders
         if api_token is not None:
             defaultSession.headers['Authorization'] = 'Bearer {0}'.format(api_token)
         else:
             defaultSession.auth = (self.username, self.password)
+        return defaultSession
 
-        self.session = defaultSession
+    def _newSession(self):
+        '''
+        Returns a new, unconfigured session.
+        '''
+        return requests.Session()
 
     @property
     def encrypted(self):
         return self.encryption is not None
 
+    def addRequestHooks(self, pre=None, post=None):
+        '''
+        Registers callbacks invoked around every request sent to the API.
+
+        :param pre:
+            Callable taking the RequestSpan of a request before it is sent, it may add headers to ``span.headers``.
+        :param post:
+            Callable taking the finished RequestSpan and the response, None if the request failed.
+            It runs on the thread completing the request.
+        '''
+
+        if pre is not None:
+            self.preRequestHooks.append(pre)
+        if post is not None:
+            self.postRequestHooks.append(post)
+
+    def _startSpan(self, method, partialUrl, headers, data):
+        '''
+        Returns the span of a request about to be sent, once the pre-request hooks ran.
+        '''
+
+        span = RequestSpan(method, urljoin(self.baseUrl, partialUrl), endpointTemplate(partialUrl), dict(headers or {}), bodySize(data))
+        runHooks(self.preRequestHooks, span)
+        return span
+
+    def _finishSpan(self, span, response=None, error=None, retries=0, streamed=False):
+        '''
+        Records the outcome of a request and runs the post-request hooks. The size of a streamed
+        response is only known from its Content-Length as its body is not read yet.
+        '''
+
+        status = bytesIn = None
+        if response is not None:
+            status = response.status_code
+            contentLength = response.headers.get('Content-Length')
+            if contentLength is not None:
+                bytesIn = int(contentLength)
+            elif not streamed and isinstance(response.content, (bytes, str)):
+                bytesIn = len(response.content)
+            history = getattr(getattr(getattr(response, 'raw', None), 'retries', None), 'history', None)
+            if isinstance(history, tuple):
+                retries = len(history)
+        span.finish(status, bytesIn, retries, error)
+        self.stats.record(span)
+        runHooks(self.postRequestHooks, span, response)
+
+    def _sendRequest(self, method, partialUrl, **kwargs):
+        '''
+        Sends a request through the session, recording its span.
+
+        :param method:
+            The HTTP method to use for the request. **REQUIRED**
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :returns:
+            The session's response, or its future for sessions sending requests in the background.
+        '''
+
+        span = self._startSpan(method, partialUrl, kwargs.get('headers'), kwargs.get('data', kwargs.get('json')))
+        kwargs['headers'] = span.headers
+        try:
+            response = self.session.request(method=method, url=span.url, timeout=self.timeout, **kwargs)
+        except Exception as e:
+            self._finishSpan(span, error=e)
+            raise
+        if isinstance(response, Future):
+            response.add_done_callback(lambda future: self._finishSpan(span, *_futureOutcome(future)))
+        else:
+            self._finishSpan(span, response, streamed=kwargs.get('stream', False))
+        return response
+
     def _makeRequest(self,
                      method=None,
                      url=None,
@@ -96,26 +270,82 @@ class ApiClient(ABC):
             The NTCore API supports **GET**, **POST**, **PUT** and **DELETE**.
         '''
 
+        body = self._getRequestData(data)
+        compressedBody, compressedHeaders = self._compressRequestData(body, headers) if files is None else (body, headers)
         try:
-            response = self.session.request(
-                method=method,
-                url=urljoin(self.baseUrl, url),
-                data=self._getRequestData(data),
-                headers=headers,
+            response = self._sendRequest(
+                method,
+                url,
+                data=compressedBody,
+                headers=compressedHeaders,
                 params=params,
                 files=files
             )
+            if response.status_code == 415 and compressedBody is not body:
+                # The API doesn't decode this content encoding, send it as it is from now on.
+                self.compression = None
+                response = self._sendRequest(
+                    method,
+                    url,
+                    data=body,
+                    headers=headers,
+                    params=params,
+                    files=files
+                )
         except Exception as e:
             # The request failed to connect
-            raise NTCoreAPIException({
-                'errors': [{
-                    'code': 'COMMUNICATION_ERROR',
-                    'message': 'Connection to {} failed: {}'.format(
-                        self.server,
-                        e.args[0]
-                    )
-                }]
-            })
+            raise self._connectionError(e)
+
+        return self._processResponse(response)
+
+    def _compressRequestData(self, data, headers, jsonEncode=False):
+        '''
+        Compresses the request body with the configured content encoding if it is large enough.
+
+        :param data:
+            Request data as bytes, a string or a dictionary. **REQUIRED**
+        :param headers:
+            A dictionary containing additional request headers.
+        :param jsonEncode:
+            Whether a dictionary is sent as JSON rather than form encoded.
+        :returns:
+            The request data and headers to send, unchanged if the body is not compressed.
+        '''
+
+        if self.compression is None or not isinstance(data, (bytes, str, dict)):
+            # Streamed bodies are sent as they are.
+            return data, headers
+
+        contentType = None
+        if isinstance(data, dict):
+            if jsonEncode:
+                body, contentType = json.dumps(data), 'application/json'
+            else:
+                body, contentType = urlencode(data, doseq=True), 'application/x-www-form-urlencoded'
+        else:
+            body = data
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if len(body) < self.compressionThreshold:
+            return data, headers
+
+        compressed = compress(body, self.compression, self.compressionLevel)
+        if len(compressed) >= len(body):
+            return data, headers
+        headers = dict(headers or {}, **{'Content-Encoding': self.compression})
+        if contentType is not None:
+            headers.setdefault('Content-Type', contentType)
+        return compressed, headers
+
+    def _processResponse(self, response):
+        '''
+        Convert an API response into a JSON object, raw content or an error.
+
+        :param response:
+            The response returned by the session. **REQUIRED**
+        :returns:
+            A JSON object containing the response data, or the raw content for non-JSON responses.
+        '''
 
         if response.status_code == 204:
             return {}
@@ -135,7 +365,9 @@ class ApiClient(ABC):
         if hasattr(content, 'decode'):  # Python 2
             content = content.decode('utf-8')
 
-        content = self.encryption.decrypt(content) if self.encrypted else content
+        if self.encrypted:
+            with self.stats.timeEncryption():
+                content = self.encryption.decrypt(content)
 
         try:
             json_body = json.loads(content)
@@ -172,6 +404,155 @@ class ApiClient(ABC):
             params=params
         )
 
+    def doGetIfModified(self, partialUrl, etag=None, params={}):
+        '''
+        Submit a conditional GET to the API, see doGet.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param etag:
+            The ETag of the current copy, sent as If-None-Match.
+        :param params:
+            A dictionary containing query parameters.
+        :returns:
+            None if the API answered 304 Not Modified, otherwise a tuple of the API response and its
+            ETag, None if not provided.
+        '''
+
+        headers = {} if etag is None else {'If-None-Match': etag}
+        try:
+            response = self._sendRequest(
+                'GET',
+                partialUrl,
+                headers=headers,
+                params=params
+            )
+        except Exception as e:
+            # The request failed to connect
+            raise self._connectionError(e)
+
+        if response.status_code == 304 and etag is not None:
+            return None
+        return self._processResponse(response), response.headers.get('ETag')
+
+    def doDownload(self, partialUrl, path, params={}, digest=None, digestAlgorithm='sha256', chunkSize=DOWNLOAD_CHUNK_SIZE, resume=True):
+        '''
+        Stream a GET response from the API to a file on disk.
+
+        The body is written in fixed-size chunks to ``path + '.part'``, which is renamed to ``path``
+        once the transfer completes and the digest matches. An interrupted transfer leaves the
+        partial file in place and the next call resumes it with an HTTP Range request.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param path:
+            The file the response body is written to. **REQUIRED**
+        :param params:
+            A dictionary containing query parameters.
+        :param digest:
+            The expected hex digest of the complete file, verified before the file is moved into place.
+        :param digestAlgorithm:
+            The hashlib algorithm used to compute the digest.
+        :param chunkSize:
+            The number of bytes read from the connection and written to disk at a time.
+        :param resume:
+            Whether to resume from an existing partial file.
+        :returns:
+            The hex digest of the downloaded file.
+        '''
+
+        return self.doDownloadIfModified(partialUrl, path, params=params, digest=digest, digestAlgorithm=digestAlgorithm,
+                                         chunkSize=chunkSize, resume=resume)['digest']
+
+    def doDownloadIfModified(self, partialUrl, path, etag=None, lastModified=None, params={}, digest=None, digestAlgorithm='sha256', chunkSize=DOWNLOAD_CHUNK_SIZE, resume=True):
+        '''
+        Stream a GET response from the API to a file on disk unless the copy identified by the
+        given validators is still current, see doDownload.
+
+        :param etag:
+            The ETag of the current copy, sent as If-None-Match.
+        :param lastModified:
+            The Last-Modified date of the current copy, sent as If-Modified-Since.
+        :returns:
+            None if the API answered 304 Not Modified, otherwise a dictionary with the hex digest of
+            the downloaded file and its etag and lastModified validators, None if not provided.
+        '''
+
+        partialPath = path + '.part'
+        offset = os.path.getsize(partialPath) if resume and os.path.isfile(partialPath) else 0
+        headers = {}
+        if offset > 0:
+            # Byte ranges refer to the encoded representation, so ask for the identity encoding.
+            headers = {'Range': 'bytes={}-'.format(offset), 'Accept-Encoding': 'identity'}
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if lastModified is not None:
+            headers['If-Modified-Since'] = lastModified
+
+        try:
+            response = self._sendRequest(
+                'GET',
+                partialUrl,
+                headers=headers,
+                params=params,
+                stream=True
+            )
+        except Exception as e:
+            # The request failed to connect
+            raise self._connectionError(e)
+
+        with closing(response):
+            if response.status_code == 304 and (etag is not None or lastModified is not None):
+                return None
+
+            if response.status_code == 416 and offset > 0:
+                # The partial file is no longer a prefix of the remote object, start over.
+                os.remove(partialPath)
+                return self.doDownloadIfModified(partialUrl, path, etag, lastModified, params, digest, digestAlgorithm, chunkSize, resume=False)
+
+            if response.status_code >= 300 or response.status_code == 204:
+                self._processResponse(response)
+                raise NTCoreAPIException({
+                    'errors': [{
+                        'code': 'DOWNLOAD_FAILED',
+                        'message': 'Unexpected status {} for {}'.format(response.status_code, partialUrl)
+                    }]
+                })
+
+            hasher = hashlib.new(digestAlgorithm)
+            if response.status_code == 206 and self._getRangeStart(response) == offset:
+                self._hashFile(partialPath, hasher, chunkSize)
+                mode = 'ab'
+            else:
+                mode = 'wb'
+
+            try:
+                with open(partialPath, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunkSize):
+                        f.write(chunk)
+                        hasher.update(chunk)
+            except requests.exceptions.RequestException as e:
+                # The connection dropped mid-transfer, the partial file is kept for resuming.
+                raise NTCoreAPIException({
+                    'errors': [{
+                        'code': 'COMMUNICATION_ERROR',
+                        'message': 'Download from {} interrupted: {}'.format(self.server, e)
+                    }]
+                })
+
+        actual = hasher.hexdigest()
+        if digest is not None and actual != digest.lower():
+            os.remove(partialPath)
+            raise NTCoreAPIException({
+                'errors': [{
+                    'code': 'CHECKSUM_MISMATCH',
+                    'message': 'Expected {} digest {} but got {}'.format(digestAlgorithm, digest, actual)
+                }]
+            })
+
+        os.replace(partialPath, path)
+        return dict(digest=actual, etag=response.headers.get('ETag'), lastModified=response.headers.get('Last-Modified'))
+
     def doPost(self, partialUrl, data, files=None, headers={}):
         '''
         Submit a POST to the API.
@@ -180,20 +561,191 @@ class ApiClient(ABC):
             A partial URL to specify the API endpoint. **REQUIRED**
         :param data:
             A dictionary containing data for the request body. **REQUIRED**
+        :param files:
+            A dictionary of file parts as ``bytes``, readable binary file objects or iterables of
+            ``bytes``, streamed as a multipart body.
         :param headers:
             A dictionary containing additional request headers.
         :returns:
             The API response.
         '''
 
+        if files is not None:
+            data = encodeMultipart(data, files)
+            headers = dict(headers, **{'Content-Type': data.content_type})
+
         return self._makeRequest(
             method='POST',
             url=partialUrl,
-            files=files,
             data=data,
             headers=headers
         )
 
+    def doUploadParts(self, partialUrl, source, partSize=DEFAULT_PART_SIZE, concurrency=DEFAULT_UPLOAD_CONCURRENCY, progress=None):
+        '''
+        Upload a source in parts over concurrent pooled connections.
+
+        A POST to ``partialUrl`` starts the upload, then every part is PUT to
+        ``partialUrl/{uploadId}/parts/{partNumber}``. Parts are sent as their own requests, so a
+        failed part is retried on its own by the retry policy. At most ``concurrency`` parts are
+        held in memory at a time. The returned upload id and parts commit the upload.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param source:
+            The content as ``bytes``, a readable binary file object or an iterable of ``bytes``. **REQUIRED**
+        :param partSize:
+            The number of bytes of each part but the last one.
+        :param concurrency:
+            The number of parts uploaded at the same time, up to the connection pool size.
+        :param progress:
+            Callable invoked on the calling thread with the bytes uploaded so far and the total
+            number of bytes, None if unknown, every time a part completes.
+        :returns:
+            A dictionary with the uploadId and the parts as a list of partNumber and etag.
+        '''
+
+        uploadId = self.doPost(partialUrl, {})['uploadId']
+        total = sourceSize(source)
+        parts = []
+        uploaded = 0
+
+        def collect(done):
+            nonlocal uploaded
+            for future in done:
+                partNumber, size, etag = future.result()
+                parts.append(dict(partNumber=partNumber, etag=etag))
+                uploaded += size
+                if progress is not None:
+                    progress(uploaded, total)
+
+        partsUrl = '/'.join([partialUrl.rstrip('/'), uploadId, 'parts'])
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            try:
+                for partNumber, part in enumerate(iterParts(source, partSize), 1):
+                    if len(pending) >= concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(self._putPart, '{}/{}'.format(partsUrl, partNumber), partNumber, part))
+                done, pending = wait(pending)
+                collect(done)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        parts.sort(key=lambda part: part['partNumber'])
+        return dict(uploadId=uploadId, parts=parts)
+
+    def _putPart(self, partialUrl, partNumber, part):
+        '''
+        Submit a PUT of a raw upload part to the API.
+
+        :returns:
+            The part number, size and etag of the uploaded part.
+        '''
+
+        try:
+            response = self._sendRequest(
+                'PUT',
+                partialUrl,
+                data=part,
+                headers={'Content-Type': 'application/octet-stream'}
+            )
+        except Exception as e:
+            # The request failed to connect
+            raise self._connectionError(e)
+
+        return partNumber, len(part), self._processResponse(response)['etag']
+
+    def doUploadChunks(self, partialUrl, source, minSize=DEFAULT_MIN_CHUNK_SIZE, avgSize=DEFAULT_CHUNK_SIZE,
+                       maxSize=DEFAULT_MAX_CHUNK_SIZE, concurrency=DEFAULT_UPLOAD_CONCURRENCY, batch=DEFAULT_CHUNK_BATCH, progress=None):
+        '''
+        Upload the content-defined chunks of a source the server doesn't store yet.
+
+        The source is cut into chunks with iterChunks, and every ``batch`` chunks a POST to
+        ``partialUrl/missing`` with their sha256 digests returns those the server is missing, which
+        are PUT to ``partialUrl/{digest}`` over concurrent pooled connections. Chunks matching a
+        previous upload, e.g., unchanged weights of a retrained model, are not sent again. At most
+        ``batch`` chunks are held in memory at a time. The returned digests commit the upload.
+
+        :param partialUrl:
+            A partial URL to specify the API endpoint. **REQUIRED**
+        :param source:
+            The content as ``bytes``, a readable binary file object or an iterable of ``bytes``. **REQUIRED**
+        :param minSize:
+            The minimum number of bytes of a chunk.
+        :param avgSize:
+            The number of bytes chunks average.
+        :param maxSize:
+            The maximum number of bytes of a chunk.
+        :param concurrency:
+            The number of chunks uploaded at the same time, up to the connection pool size.
+        :param batch:
+            The number of chunks whose digests are checked in one request.
+        :param progress:
+            Callable invoked on the calling thread with the bytes processed so far and the total
+            number of bytes, None if unknown, every time a batch completes.
+        :returns:
+            A dictionary with the digests of the chunks in order and the number of bytes sent.
+        '''
+
+        total = sourceSize(source)
+        digests = []
+        processed = 0
+        sent = 0
+
+        def upload(chunks):
+            nonlocal processed, sent
+            batchDigests = [chunkDigest(chunk) for chunk in chunks]
+            unique = dict(zip(batchDigests, chunks))
+            digests.extend(batchDigests)
+            missing = self.doPost(partialUrl.rstrip('/') + '/missing', dict(digests=json.dumps(list(unique))))['missing']
+            futures = [executor.submit(self._putChunk, '{}/{}'.format(partialUrl.rstrip('/'), digest), unique[digest])
+                       for digest in missing if digest in unique]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            processed += sum(len(chunk) for chunk in chunks)
+            sent += sum(len(unique[digest]) for digest in missing if digest in unique)
+            if progress is not None:
+                progress(processed, total)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            chunks = []
+            for chunk in iterChunks(source, minSize, avgSize, maxSize):
+                chunks.append(chunk)
+                if len(chunks) >= batch:
+                    upload(chunks)
+                    chunks = []
+            if chunks:
+                upload(chunks)
+
+        return dict(digests=digests, bytesSent=sent)
+
+    def _putChunk(self, partialUrl, chunk):
+        '''
+        Submit a PUT of a raw chunk to the API.
+        '''
+
+        try:
+            response = self._sendRequest(
+                'PUT',
+                partialUrl,
+                data=chunk,
+                headers={'Content-Type': 'application/octet-stream'}
+            )
+        except Exception as e:
+            # The request failed to connect
+            raise self._connectionError(e)
+
+        return self._processResponse(response)
+
     def doPut(self, partialUrl, data):
         '''
         Submit a PUT to the API.
@@ -241,6 +793,47 @@ class ApiClient(ABC):
         expectedContentType = 'application/jose+json' if self.encrypted else 'application/json'
         return response.status_code != 204 and contentType is not None and expectedContentType in contentType
 
+    def _connectionError(self, e):
+        '''
+        Returns the exception raised when a request fails to reach the API.
+
+        :param e:
+            The underlying connection error. **REQUIRED**
+        '''
+
+        return NTCoreAPIException({
+            'errors': [{
+                'code': 'COMMUNICATION_ERROR',
+                'message': 'Connection to {} failed: {}'.format(
+                    self.server,
+                    e.args[0] if e.args else e
+                )
+            }]
+        })
+
+    def _getRangeStart(self, response):
+        '''
+        Returns the first byte position of a partial response, or None if it cannot be parsed.
+
+        :param response:
+            Partial (206) response to be checked. **REQUIRED**
+        '''
+
+        contentRange = response.headers.get('Content-Range', '')
+        try:
+            return int(contentRange.split(' ', 1)[1].split('-', 1)[0])
+        except (IndexError, ValueError):
+            return None
+
+    def _hashFile(self, path, hasher, chunkSize):
+        '''
+        Feeds the content of an existing file into a hasher chunk by chunk.
+        '''
+
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunkSize), b''):
+                hasher.update(chunk)
+
     def _getRequestData(self, data):
         '''
         If encryption is enabled try to encrypt request data, otherwise no action required.
@@ -251,7 +844,13 @@ class ApiClient(ABC):
             Request data, encrypted if necessary.
         '''
 
-        return (data if data is None else self.encryption.encrypt(data)) if self.encrypted else data
+        if data is None or isMultipartBody(data):
+            # Multipart bodies are streamed as they are.
+            return data
+        if not self.encrypted:
+            return data
+        with self.stats.timeEncryption():
+            return self.encryption.encrypt(data)
 
     def putDocument(self, partialUrl, data, files):
         '''
@@ -267,10 +866,21 @@ class ApiClient(ABC):
             The API response.
         '''
 
+        body = encodeMultipart(data, files)
+
         return self._makeRequest(
             method='PUT',
             url=partialUrl,
-            data=data,
-            headers='',
-            files=files
-        )
\ No newline at end of file
+            data=body,
+            headers={'Content-Type': body.content_type}
+        )
+
+
+def _futureOutcome(future):
+    '''
+    Returns the response and error of a completed request future.
+    '''
+    if future.cancelled():
+        return None, 'CANCELLED'
+    error = future.exception()
+    return (None, error) if error is not None else (future.result(), None)
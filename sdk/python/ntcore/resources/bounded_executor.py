@@ -0,0 +1,167 @@
+import collections
+import random
+import threading
+import time
+from concurrent.futures import Executor, Future
+
+# What to do with a call submitted while the queue is full.
+QUEUE_POLICIES = ('block', 'drop_oldest', 'drop_newest', 'sample')
+
+# Seconds a call waits for room in a full queue with the block policy.
+DEFAULT_QUEUE_TIMEOUT = 1.0
+
+
+class BoundedExecutor(Executor):
+    '''
+    A thread pool whose queue of pending calls is bounded, so that a slow API bounds the memory and
+    the latency of the callers rather than letting calls pile up.
+
+    Once ``maxQueue`` calls are pending, a new call is handled by the policy:
+
+    - ``block`` waits up to ``timeout`` seconds for room, then drops the new call.
+    - ``drop_oldest`` drops the oldest pending call.
+    - ``drop_newest`` drops the new call.
+    - ``sample`` drops a pending call picked at random, so the queue keeps a uniform sample of a burst.
+
+    The future of a dropped call is cancelled. Calls that are not ``droppable`` are never dropped:
+    they are queued past ``maxQueue``, after waiting for room with the block policy.
+
+    :param maxWorkers:
+        The number of threads running the calls.
+    :param maxQueue:
+        The maximum number of pending calls, None leaves the queue unbounded.
+    :param policy:
+        One of QUEUE_POLICIES.
+    :param timeout:
+        Seconds a call waits for room with the block policy, None waits forever.
+    :param droppable:
+        Callable taking the args and kwargs of a call and returning whether the policy may drop it,
+        None lets the policy drop any call.
+    '''
+
+    def __init__(self, maxWorkers, maxQueue=None, policy='block', timeout=DEFAULT_QUEUE_TIMEOUT, droppable=None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError('Unknown queue policy {}, expected one of {}'.format(policy, ', '.join(QUEUE_POLICIES)))
+        if maxQueue is not None and maxQueue < 1:
+            raise ValueError('maxQueue should be at least 1')
+        self._maxWorkers = maxWorkers
+        self._maxQueue = maxQueue
+        self._policy = policy
+        self._timeout = timeout
+        self._droppable = droppable
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._idle = 0
+        self._shutdown = False
+        self._submitted = 0
+        self._dropped = 0
+        self._delayed = 0
+        self._delaySeconds = 0.0
+
+    def submit(self, fn, *args, **kwargs):
+        '''
+        Queues a call and returns its future, cancelled if the call was dropped.
+        '''
+
+        future = Future()
+        droppable = self._droppable is None or self._droppable(args, kwargs)
+        dropped = None
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._submitted += 1
+            if self._isFull():
+                # Pending calls the policy may drop to make room, in queue order.
+                candidates = [index for index, call in enumerate(self._queue) if call[4]]
+                if self._policy == 'block':
+                    start = time.monotonic()
+                    self._delayed += 1
+                    self._condition.wait_for(lambda: not self._isFull() or self._shutdown, self._timeout)
+                    self._delaySeconds += time.monotonic() - start
+                    if (self._isFull() or self._shutdown) and droppable:
+                        dropped = future
+                elif self._policy == 'drop_newest' or not candidates:
+                    dropped = future if droppable else None
+                else:
+                    index = candidates[0] if self._policy == 'drop_oldest' else random.choice(candidates)
+                    dropped = self._queue[index][0]
+                    del self._queue[index]
+            if dropped is not None:
+                self._dropped += 1
+            if dropped is not future:
+                self._queue.append((future, fn, args, kwargs, droppable))
+                self._condition.notify()
+                if len(self._queue) > self._idle and len(self._threads) < self._maxWorkers:
+                    self._startWorker()
+        if dropped is not None:
+            dropped.cancel()
+            dropped.set_running_or_notify_cancel()
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        '''
+        Stops the workers once the pending calls ran, or cancels the pending calls.
+        '''
+
+        with self._condition:
+            self._shutdown = True
+            cancelled = list(self._queue) if cancel_futures else []
+            if cancel_futures:
+                self._queue.clear()
+            self._condition.notify_all()
+            threads = list(self._threads)
+        for future, _, _, _, _ in cancelled:
+            future.cancel()
+            future.set_running_or_notify_cancel()
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def stats(self):
+        '''
+        Returns the counters of submitted, dropped and delayed calls, the seconds spent waiting
+        for room and the number of pending calls.
+        '''
+
+        with self._condition:
+            return dict(
+                submitted=self._submitted,
+                dropped=self._dropped,
+                delayed=self._delayed,
+                delaySeconds=self._delaySeconds,
+                queued=len(self._queue))
+
+    def _isFull(self):
+        return self._maxQueue is not None and len(self._queue) >= self._maxQueue
+
+    def _startWorker(self):
+        '''
+        Starts a worker thread, the condition must be held.
+        '''
+
+        thread = threading.Thread(name='bounded_executor_{}'.format(len(self._threads)), target=self._work)
+        thread.daemon = True
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._idle += 1
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                self._idle -= 1
+                if not self._queue:
+                    return
+                future, fn, args, kwargs, _ = self._queue.popleft()
+                # Room was made for a blocked caller.
+                self._condition.notify_all()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
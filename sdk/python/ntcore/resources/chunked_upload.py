@@ -0,0 +1,46 @@
+import io
+import os
+
+# Number of bytes of each part of a chunked upload, S3 requires at least 5 MiB but for the last part.
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+# Number of parts uploaded at the same time, keep it within the connection pool size.
+DEFAULT_UPLOAD_CONCURRENCY = 4
+
+
+def iterParts(source, partSize=DEFAULT_PART_SIZE):
+    '''
+    Yields the content of a bytes, file object or iterable source as parts of partSize bytes,
+    the last part may be shorter. An empty source yields a single empty part.
+    '''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(partSize), b'')
+    else:
+        chunks = iter(source)
+
+    buffer = bytearray()
+    yielded = False
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= partSize:
+            yield bytes(buffer[:partSize])
+            del buffer[:partSize]
+            yielded = True
+    if buffer or not yielded:
+        yield bytes(buffer)
+
+
+def sourceSize(source):
+    '''
+    Returns the number of bytes left in a bytes or file object source, or None if unknown.
+    '''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    try:
+        if isinstance(source, io.BytesIO):
+            return source.getbuffer().nbytes - source.tell()
+        return os.fstat(source.fileno()).st_size - source.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
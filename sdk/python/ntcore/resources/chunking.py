@@ -0,0 +1,113 @@
+import hashlib
+from .chunked_upload import iterParts
+
+# Content-defined chunk size bounds in bytes, chunks average about DEFAULT_CHUNK_SIZE.
+DEFAULT_MIN_CHUNK_SIZE = 256 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Number of chunks whose digests are checked against the server at a time.
+DEFAULT_CHUNK_BATCH = 16
+
+# Seed of the gear table, changing it changes every chunk boundary and so defeats deduplication.
+_GEAR_SEED = 0x6e74636f
+
+_gear = None
+
+
+def _gearTable():
+    '''
+    Returns the table of random 32 bits values of each byte value of the gear hash.
+    '''
+
+    global _gear
+    if _gear is None:
+        import numpy as np
+        _gear = np.random.RandomState(_GEAR_SEED).randint(0, 2 ** 32, size=256, dtype=np.uint64).astype(np.uint32)
+    return _gear
+
+
+def _gearHashes(data):
+    '''
+    Returns the gear hash of the 32 bytes ending at every position of data, i.e.,
+    ``sum(gear[data[i - k]] << k for k in range(32))`` modulo 2 ** 32.
+
+    The hashes are computed by doubling the window five times rather than rolling byte by byte,
+    so the work is a handful of vectorized passes over the data.
+    '''
+
+    import numpy as np
+    hashes = np.take(_gearTable(), np.frombuffer(data, dtype=np.uint8))
+    window = 1
+    while window < 32:
+        # The shifted copy is made before the addition, the slices overlap.
+        hashes[window:] += hashes[:-window] << np.uint32(window)
+        window *= 2
+    return hashes
+
+
+def _candidates(data, context, bits):
+    '''
+    Returns the offsets in data after which a chunk may end, the hashes of the first bytes of data
+    being computed with the last bytes of the previous data as context.
+    '''
+
+    import numpy as np
+    context = context[-31:]
+    hashes = _gearHashes(context + data)[len(context):]
+    if not bits:
+        return np.arange(1, len(data) + 1)
+    return np.flatnonzero((hashes >> np.uint32(32 - bits)) == 0) + 1
+
+
+def iterChunks(source, minSize=DEFAULT_MIN_CHUNK_SIZE, avgSize=DEFAULT_CHUNK_SIZE, maxSize=DEFAULT_MAX_CHUNK_SIZE):
+    '''
+    Yields the content of a bytes, file object or iterable source as content-defined chunks.
+
+    A chunk ends where the gear hash of its last 32 bytes has its top bits cleared, past minSize
+    bytes and at most maxSize bytes from its start, so inserting or removing bytes only changes the
+    chunks around the edit and the others keep their digest. An empty source yields no chunk.
+
+    :param minSize:
+        The minimum number of bytes of a chunk but the last one, at least 32.
+    :param avgSize:
+        The number of bytes chunks average, approximately.
+    :param maxSize:
+        The maximum number of bytes of a chunk.
+    '''
+
+    if not 32 <= minSize <= avgSize <= maxSize:
+        raise ValueError('Chunk sizes should be 32 <= minSize <= avgSize <= maxSize')
+    import numpy as np
+    # Boundaries are on average 2 ** bits bytes past the minimum size.
+    bits = min(max(avgSize - minSize, 1).bit_length() - 1, 31)
+
+    buffer = b''
+    candidates = np.zeros(0, dtype=np.intp)
+    blocks = iterParts(source, maxSize)
+    final = False
+    while not final:
+        block = next(blocks, None)
+        final = block is None
+        if not final:
+            candidates = np.concatenate([candidates, _candidates(block, buffer, bits) + len(buffer)])
+            buffer += block
+        # A chunk is cut once the bytes it may span are all read, so boundaries don't depend on how
+        # the source is read.
+        start = 0
+        while len(buffer) - start >= (1 if final else maxSize):
+            index = np.searchsorted(candidates, start + minSize)
+            end = min(int(candidates[index]) if index < len(candidates) else len(buffer), start + maxSize)
+            yield buffer[start:end]
+            start = end
+        if start:
+            buffer = buffer[start:]
+            candidates = candidates[candidates > start] - start
+
+
+def chunkDigest(chunk):
+    '''
+    Returns the sha256 hex digest identifying a chunk.
+    '''
+
+    return hashlib.sha256(chunk).hexdigest()
@@ -0,0 +1,52 @@
+import zlib
+try:
+    from urllib3.util.request import ACCEPT_ENCODING
+except ImportError:
+    ACCEPT_ENCODING = 'gzip,deflate'
+
+# Content encodings supported for request bodies.
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+# Default compression level of each encoding.
+DEFAULT_LEVELS = {GZIP: 6, ZSTD: 3}
+
+# Request bodies smaller than this are sent as they are.
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+
+def checkEncoding(encoding):
+    '''
+    Validates a request body encoding, importing its codec if it is optional.
+
+    :param encoding:
+        The content encoding, i.e., ``gzip`` or ``zstd``. **REQUIRED**
+    '''
+
+    if encoding == ZSTD:
+        # Optional, i.e., pip install ntcore[zstd]
+        import zstandard
+    elif encoding != GZIP:
+        raise ValueError('Unsupported compression {}, expected one of {}, {}'.format(encoding, GZIP, ZSTD))
+
+
+def compress(data, encoding, level=None):
+    '''
+    Compresses a request body.
+
+    :param data:
+        The bytes to compress. **REQUIRED**
+    :param encoding:
+        The content encoding, i.e., ``gzip`` or ``zstd``. **REQUIRED**
+    :param level:
+        The compression level, the default of the encoding if None.
+    :returns:
+        The compressed bytes.
+    '''
+
+    level = DEFAULT_LEVELS[encoding] if level is None else level
+    if encoding == ZSTD:
+        import zstandard
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
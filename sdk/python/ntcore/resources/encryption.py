@@ -5,6 +5,7 @@ import json
 import requests
 import time
 import sys
+import threading
 
 from jwcrypto import jwk, jws as cryptoJWS, jwe
 from jwcrypto.common import json_encode, json_decode
@@ -14,6 +15,13 @@ from jose import jws
 from ..exceptions.exceptions import NTCoreAPIException
 from six.moves.urllib.parse import urlparse
 
+# Minimum time in seconds between two reloads of a key set forced by unknown kids, so messages
+# with a bogus kid don't reload the key set on every message.
+DEFAULT_KEY_SET_RELOAD_INTERVAL_SECONDS = 30
+
+# Time in seconds to wait for the key server when loading a key set from a URL.
+DEFAULT_KEY_SET_TIMEOUT_SECONDS = 10
+
 
 class Encryption(object):
     '''
@@ -31,6 +39,17 @@ class Encryption(object):
         JWE body encryption method.
     :param jwsExpirationMinutes:
         Time in minutes when JWS signature is valid after creation.
+    :param keySetTtlSeconds:
+        Time in seconds a loaded JWK key set is reused before it is loaded again.
+    :param keySetReloadIntervalSeconds:
+        Minimum time in seconds between two reloads of a key set forced by unknown kids.
+    :param keySetTimeoutSeconds:
+        Time in seconds to wait for the key server when loading a key set from a URL.
+
+    Key sets are parsed once into JWK key objects and cached per location. A message
+    referring to a kid missing from the cached key set reloads it, at most once per reload
+    interval, so rotated keys are picked up before the TTL expires. Key sets are loaded
+    outside the cache lock, a slow key server only holds up the callers needing its key set.
     '''
 
     def __init__(self,
@@ -39,7 +58,10 @@ class Encryption(object):
                  encryptionAlgorithm='RSA-OAEP-256',
                  signAlgorithm='RS256',
                  encryptionMethod='A256CBC-HS512',
-                 jwsExpirationMinutes=5):
+                 jwsExpirationMinutes=5,
+                 keySetTtlSeconds=300,
+                 keySetReloadIntervalSeconds=DEFAULT_KEY_SET_RELOAD_INTERVAL_SECONDS,
+                 keySetTimeoutSeconds=DEFAULT_KEY_SET_TIMEOUT_SECONDS):
         '''
         Encryption service for ntcore client
         '''
@@ -50,7 +72,15 @@ class Encryption(object):
         self.signAlgorithm = signAlgorithm
         self.encryptionMethod = encryptionMethod
         self.jwsExpirationMinutes = jwsExpirationMinutes
+        self.keySetTtlSeconds = keySetTtlSeconds
+        self.keySetReloadIntervalSeconds = keySetReloadIntervalSeconds
+        self.keySetTimeoutSeconds = keySetTimeoutSeconds
         self.integer_types = (int, long,) if sys.version_info < (3,) else (int,)
+        self._keySets = {}
+        self._keySetsLock = threading.Lock()
+        # Time of the last forced reload and lock serializing the loads, per location.
+        self._reloadTimes = {}
+        self._loadLocks = {}
 
     def encrypt(self, body):
         '''
@@ -60,25 +90,21 @@ class Encryption(object):
             String as a result of signature and encryption of input message body
         '''
 
-        jwsKeySet = self.__getJwkKeySet(location=self.clientPrivateKeySetLocation)
-        jwkSignKey = self.__findJwkKeyByAlgorithm(jwkKeySet=jwsKeySet, algorithm=self.signAlgorithm)
-        privateKeyToSign = jwk.JWK(**jwkSignKey)
+        privateKeyToSign = self.__findJwkKey(location=self.clientPrivateKeySetLocation, algorithm=self.signAlgorithm)
         jwsToken = cryptoJWS.JWS(body.encode('utf-8'))
         jwsToken.add_signature(privateKeyToSign, None, json_encode({
             "alg": self.signAlgorithm,
-            "kid": jwkSignKey['kid'],
+            "kid": privateKeyToSign.get('kid'),
             "exp": self.__getJwsExpirationTime()
         }))
         signedBody = jwsToken.serialize(True)
 
-        jweKeySet = self.__getJwkKeySet(location=self.keySetLocation)
-        jwkEncryptKey = self.__findJwkKeyByAlgorithm(jwkKeySet=jweKeySet, algorithm=self.encryptionAlgorithm)
-        publicKeyToEncrypt = jwk.JWK(**jwkEncryptKey)
+        publicKeyToEncrypt = self.__findJwkKey(location=self.keySetLocation, algorithm=self.encryptionAlgorithm)
         protected_header = {
             "alg": self.encryptionAlgorithm,
             "enc": self.encryptionMethod,
             "typ": "JWE",
-            "kid": jwkEncryptKey['kid'],
+            "kid": publicKeyToEncrypt.get('kid'),
         }
         jweToken = jwe.JWE(signedBody.encode('utf-8'), recipient=publicKeyToEncrypt, protected=protected_header)
         return jweToken.serialize(True)
@@ -91,23 +117,147 @@ class Encryption(object):
             Decrypted body message
         '''
 
-        jweKeySet = self.__getJwkKeySet(location=self.clientPrivateKeySetLocation)
-        jwkDecryptKey = self.__findJwkKeyByAlgorithm(jwkKeySet=jweKeySet, algorithm=self.encryptionAlgorithm)
-        privateKeyToDecrypt = jwk.JWK(**jwkDecryptKey)
         jweToken = jwe.JWE()
         try:
-            jweToken.deserialize(body, key=privateKeyToDecrypt)
+            jweToken.deserialize(body)
+        except Exception as e:
+            raise NTCoreAPIException(str(e))
+        privateKeyToDecrypt = self.__findJwkKey(location=self.clientPrivateKeySetLocation,
+                                                algorithm=self.encryptionAlgorithm,
+                                                kid=jweToken.jose_header.get('kid'))
+        try:
+            jweToken.decrypt(privateKeyToDecrypt)
         except Exception as e:
             raise NTCoreAPIException(str(e))
         payload = jweToken.payload
 
         self.checkJwsExpiration(payload)
-        jwsKeySet = self.__getJwkKeySet(location=self.keySetLocation)
-        jwkCheckSignKey = self.__findJwkKeyByAlgorithm(jwkKeySet=jwsKeySet, algorithm=self.signAlgorithm)
+        publicKeyToCheckSign = self.__findJwkKey(location=self.keySetLocation,
+                                                 algorithm=self.signAlgorithm,
+                                                 kid=jws.get_unverified_header(payload).get('kid'))
+        jwsToken = cryptoJWS.JWS()
         try:
-            return jws.verify(payload, json.dumps(jwkCheckSignKey), algorithms=self.signAlgorithm)
+            jwsToken.deserialize(payload.decode('utf-8'))
+            jwsToken.verify(publicKeyToCheckSign, alg=self.signAlgorithm)
         except Exception as e:
             raise NTCoreAPIException(str(e))
+        return jwsToken.payload
+
+    def refresh(self, location=None):
+        '''
+        Drops the cached JWK key sets so they are loaded again on next use.
+
+        :param location:
+            Location of the key set to drop, all key sets are dropped if omitted.
+        '''
+
+        with self._keySetsLock:
+            if location is None:
+                self._keySets.clear()
+            else:
+                self._keySets.pop(location, None)
+
+    def __findJwkKey(self, location, algorithm, kid=None):
+        '''
+        Finds the JWK key object by algorithm, and by kid if given, in the cached key set.
+        The key set is reloaded once if it doesn't contain the kid, i.e., after a key rotation,
+        unless it was already reloaded for an unknown kid within the reload interval.
+
+        :param location:
+            Location(can be a URL or path to file) of JWK key data. **REQUIRED**
+        :param algorithm:
+            Algorithm of the JWK key to be found in key set. **REQUIRED**
+        :param kid:
+            Key id of the JWK key to be found in key set.
+        :returns:
+            JWK key object.
+        '''
+
+        keysByKid, keysByAlgorithm = self.__getCachedJwkKeySet(location)
+        if kid is not None and kid not in keysByKid and self.__allowReload(location):
+            self.refresh(location)
+            keysByKid, keysByAlgorithm = self.__getCachedJwkKeySet(location)
+
+        if kid is not None:
+            key = keysByKid.get(kid)
+            if key is None:
+                raise NTCoreAPIException('JWK set doesn\'t contain key with kid = ' + kid)
+            if key.get('alg', algorithm) != algorithm:
+                raise NTCoreAPIException('JWK key with kid = ' + kid + ' doesn\'t use algorithm = ' + algorithm)
+            return key
+
+        key = keysByAlgorithm.get(algorithm)
+        if key is None:
+            raise NTCoreAPIException('JWK set doesn\'t contain key with algorithm = ' + algorithm)
+        return key
+
+    def __getCachedJwkKeySet(self, location):
+        '''
+        Returns the JWK key objects at given location indexed by kid and by algorithm,
+        loading and parsing the key set if it is not cached or its TTL expired.
+
+        :param location:
+            Location(can be a URL or path to file) of JWK key data. **REQUIRED**
+        :returns:
+            Tuple of dictionaries of JWK key objects by kid and by algorithm.
+        '''
+
+        cached = self.__getCached(location)
+        if cached is not None:
+            return cached
+
+        with self._keySetsLock:
+            loadLock = self._loadLocks.setdefault(location, threading.Lock())
+        with loadLock:
+            # Another caller may have loaded the key set while this one waited.
+            cached = self.__getCached(location)
+            if cached is not None:
+                return cached
+
+            keySet = self.__parseJwkKeySet(self.__getJwkKeySet(location=location))
+            keysByKid, keysByAlgorithm = {}, {}
+            for key in keySet['keys']:
+                jwkKey = jwk.JWK(**key)
+                if 'kid' in key:
+                    keysByKid[key['kid']] = jwkKey
+                if 'alg' in key:
+                    # The first key of an algorithm wins, same as a linear search.
+                    keysByAlgorithm.setdefault(key['alg'], jwkKey)
+            with self._keySetsLock:
+                self._keySets[location] = (time.monotonic() + self.keySetTtlSeconds, keysByKid, keysByAlgorithm)
+            return keysByKid, keysByAlgorithm
+
+    def __getCached(self, location):
+        '''
+        Returns the cached JWK key objects at given location by kid and by algorithm,
+        None if the key set is not cached or its TTL expired.
+
+        :param location:
+            Location(can be a URL or path to file) of JWK key data. **REQUIRED**
+        '''
+
+        with self._keySetsLock:
+            cached = self._keySets.get(location)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1], cached[2]
+            return None
+
+    def __allowReload(self, location):
+        '''
+        Returns whether the key set at given location may be reloaded for an unknown kid,
+        recording the reload if so.
+
+        :param location:
+            Location(can be a URL or path to file) of JWK key data. **REQUIRED**
+        '''
+
+        with self._keySetsLock:
+            now = time.monotonic()
+            last = self._reloadTimes.get(location)
+            if last is not None and now - last < self.keySetReloadIntervalSeconds:
+                return False
+            self._reloadTimes[location] = now
+            return True
 
     def __getJwkKeySet(self, location):
         '''
@@ -121,7 +271,7 @@ class Encryption(object):
         try:
             url = urlparse(location)
             if url.scheme and url.netloc and url.path:
-                return requests.get(location).text
+                return requests.get(location, timeout=self.keySetTimeoutSeconds).text
             raise NTCoreAPIException('Failed to parse url from string = ' + location)
         except Exception as e:
             if os.path.isfile(location):
@@ -130,16 +280,14 @@ class Encryption(object):
             else:
                 raise NTCoreAPIException('Wrong JWK key set location path = ' + location)
 
-    def __findJwkKeyByAlgorithm(self, jwkKeySet, algorithm):
+    def __parseJwkKeySet(self, jwkKeySet):
         '''
-        Finds JWK key by given algorithm.
+        Parses JWK key set.
 
         :param jwkKeySet:
             JSON representation of JWK key set. **REQUIRED**
-        :param algorithm:
-            Algorithm of the JWK key to be found in key set. **REQUIRED**
         :returns:
-            JWK key with given algorithm.
+            JWK key set as a dictionary.
         '''
 
         try:
@@ -147,11 +295,9 @@ class Encryption(object):
         except ValueError:
             raise NTCoreAPIException('Wrong JWK key set ' + jwkKeySet)
 
-        for key in keySet['keys']:
-            if key['alg'] == algorithm:
-                return key
-
-        raise NTCoreAPIException('JWK set doesn\'t contain key with algorithm = ' + algorithm)
+        if not isinstance(keySet, dict) or not isinstance(keySet.get('keys'), list):
+            raise NTCoreAPIException('Wrong JWK key set ' + jwkKeySet)
+        return keySet
 
     def __getJwsExpirationTime(self):
         '''
@@ -0,0 +1,220 @@
+import collections
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from ..monitor.metric_aggregator import Histogram
+
+# Number of finished request spans kept for export.
+DEFAULT_MAX_SPANS = 1000
+
+# Path segments holding an identifier, e.g., a workspace id or a version, grouped under one endpoint.
+_IDENTIFIER_SEGMENT = re.compile(r'\d')
+
+
+def endpointTemplate(partialUrl):
+    '''
+    Returns the endpoint of a partial URL with its identifiers replaced by ``{id}``,
+    e.g., ``workspace/{id}/registry`` for ``workspace/C123/registry``.
+    '''
+
+    path = partialUrl.split('?', 1)[0].strip('/')
+    return '/'.join('{id}' if _IDENTIFIER_SEGMENT.search(segment) else segment for segment in path.split('/'))
+
+
+def bodySize(data):
+    '''
+    Returns the number of bytes of a request body, or None if it is streamed with an unknown length.
+    '''
+
+    if data is None:
+        return 0
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, str):
+        return len(data.encode('utf-8'))
+    if isinstance(data, dict):
+        return len(urlencode(data, doseq=True))
+    return getattr(data, 'len', None)
+
+
+class RequestSpan(object):
+    '''
+    A request sent to the API, handed to the request hooks and recorded by RequestStats.
+
+    Pre-request hooks may add headers to ``headers``, e.g., to propagate a trace context.
+    Post-request hooks see the outcome: ``status``, ``bytesIn``, ``retries``, ``error`` and ``duration`` in seconds.
+    '''
+
+    def __init__(self, method, url, endpoint, headers, bytesOut):
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        self.headers = headers
+        self.bytesOut = bytesOut
+        self.bytesIn = None
+        self.status = None
+        self.retries = 0
+        self.error = None
+        self.duration = None
+        self.spanId = os.urandom(8).hex()
+        self.startTime = time.time_ns()
+        self._start = time.perf_counter()
+
+    @property
+    def name(self):
+        return '{} {}'.format(self.method, self.endpoint)
+
+    def finish(self, status=None, bytesIn=None, retries=0, error=None):
+        '''
+        Records the outcome of the request, an error being an error code or an exception.
+        '''
+
+        self.duration = time.perf_counter() - self._start
+        self.status = status
+        self.bytesIn = bytesIn
+        self.retries = retries
+        if isinstance(error, BaseException):
+            error = type(error).__name__
+        elif error is None and status is not None and status >= 400:
+            error = str(status)
+        self.error = error
+
+    def toDict(self):
+        '''
+        Returns the span in the OpenTelemetry format, with the HTTP semantic convention attributes.
+        '''
+
+        attributes = {
+            'http.request.method': self.method,
+            'url.full': self.url,
+            'url.template': self.endpoint,
+            'http.request.resend_count': self.retries,
+        }
+        for key, value in (('http.response.status_code', self.status),
+                           ('http.request.body.size', self.bytesOut),
+                           ('http.response.body.size', self.bytesIn),
+                           ('error.type', self.error)):
+            if value is not None:
+                attributes[key] = value
+        return {
+            'name': self.name,
+            'kind': 'SPAN_KIND_CLIENT',
+            'spanId': self.spanId,
+            'startTimeUnixNano': self.startTime,
+            'endTimeUnixNano': self.startTime + int((self.duration or 0) * 1e9),
+            'attributes': attributes,
+            'status': {'code': 'STATUS_CODE_ERROR' if self.error is not None else 'STATUS_CODE_OK'},
+        }
+
+
+class _EndpointStats(object):
+
+    def __init__(self):
+        self.count = 0
+        self.bytesOut = 0
+        self.bytesIn = 0
+        self.retries = 0
+        self.errors = collections.Counter()
+        self.latency = Histogram()
+
+    def toDict(self):
+        return dict(
+            count=self.count,
+            bytesOut=self.bytesOut,
+            bytesIn=self.bytesIn,
+            retries=self.retries,
+            errors=dict(self.errors),
+            latency=self.latency.summary())
+
+
+class RequestStats(object):
+    '''
+    In-process statistics of the requests sent by a client: a latency histogram in seconds,
+    bytes in and out, retries and error codes per endpoint, the time spent encrypting and
+    decrypting, and the most recent spans.
+
+    :param maxSpans:
+        The number of finished spans kept for export, 0 keeps none.
+    '''
+
+    def __init__(self, maxSpans=DEFAULT_MAX_SPANS):
+        self._lock = threading.Lock()
+        self._maxSpans = maxSpans
+        self.reset()
+
+    def reset(self):
+        '''
+        Clears the statistics.
+        '''
+
+        with self._lock:
+            self._endpoints = collections.defaultdict(_EndpointStats)
+            self._spans = collections.deque(maxlen=self._maxSpans)
+            self._encryptionCount = 0
+            self._encryptionSeconds = 0.0
+
+    def record(self, span):
+        '''
+        Adds a finished span to the statistics.
+        '''
+
+        with self._lock:
+            stats = self._endpoints[span.name]
+            stats.count += 1
+            stats.bytesOut += span.bytesOut or 0
+            stats.bytesIn += span.bytesIn or 0
+            stats.retries += span.retries
+            if span.error is not None:
+                stats.errors[span.error] += 1
+            stats.latency.add(span.duration)
+            self._spans.append(span)
+
+    @contextmanager
+    def timeEncryption(self):
+        '''
+        Adds the time spent in the block to the encryption time.
+        '''
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._encryptionCount += 1
+                self._encryptionSeconds += elapsed
+
+    def toDict(self):
+        '''
+        Returns the statistics keyed by ``METHOD endpoint``, with the encryption time.
+        '''
+
+        with self._lock:
+            return dict(
+                endpoints=dict((name, stats.toDict()) for name, stats in self._endpoints.items()),
+                encryption=dict(count=self._encryptionCount, seconds=self._encryptionSeconds))
+
+    def toSpans(self):
+        '''
+        Returns the most recent spans in the OpenTelemetry format, oldest first.
+        '''
+
+        with self._lock:
+            spans = list(self._spans)
+        return [span.toDict() for span in spans]
+
+
+def runHooks(hooks, *args):
+    '''
+    Calls the request hooks, logging rather than raising their errors so they never fail a request.
+    '''
+
+    for hook in hooks:
+        try:
+            hook(*args)
+        except Exception as e:
+            logging.warning('Request hook {} failed: {}'.format(hook, e))
@@ -0,0 +1,103 @@
+import uuid
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+
+# Number of bytes read from a file source at a time while streaming a multipart body.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class ChunkedMultipartEncoder(object):
+    '''
+    Streams a multipart/form-data body whose file parts have no known length.
+
+    Iterating the encoder yields the body piece by piece, so requests sends it with chunked
+    transfer encoding and only one chunk of each file part is held in memory at a time.
+
+    :param fields:
+        Dictionary of form fields, values as ``str``/``bytes`` or ``(filename, source, content_type)``
+        tuples where the source is ``bytes``, a readable binary file object or an iterable of ``bytes``.
+    :param boundary:
+        The multipart boundary, generated if not provided.
+    '''
+
+    def __init__(self, fields, boundary=None):
+        self.fields = fields
+        self.boundary = boundary or uuid.uuid4().hex
+
+    @property
+    def content_type(self):
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def __iter__(self):
+        for name, value in self.fields.items():
+            if isinstance(value, tuple):
+                filename, source, contentType = value
+                yield self.__header(name, filename, contentType)
+                for chunk in iterSource(source):
+                    yield chunk
+            else:
+                yield self.__header(name)
+                yield _encode(value)
+            yield b'\r\n'
+        yield '--{}--\r\n'.format(self.boundary).encode('utf-8')
+
+    def __header(self, name, filename=None, contentType=None):
+        disposition = 'form-data; name="{}"'.format(name)
+        if filename is not None:
+            disposition += '; filename="{}"'.format(filename)
+        header = '--{}\r\nContent-Disposition: {}\r\n'.format(self.boundary, disposition)
+        if contentType is not None:
+            header += 'Content-Type: {}\r\n'.format(contentType)
+        return (header + '\r\n').encode('utf-8')
+
+
+def encodeMultipart(data, files):
+    '''
+    Builds a streaming multipart/form-data body from form fields and file sources.
+
+    :param data:
+        Dictionary of form fields.
+    :param files:
+        Dictionary of file parts, values as ``bytes``, readable binary file objects or iterables of ``bytes``.
+    :returns:
+        A ``MultipartEncoder`` when the length of every part is known, which is sent with a
+        Content-Length header, otherwise a ``ChunkedMultipartEncoder``.
+    '''
+
+    fields = dict((name, _encode(value)) for name, value in (data or {}).items())
+    for name, source in files.items():
+        fields[name] = (name, source, 'application/octet-stream')
+
+    if all(_hasKnownLength(source) for source in files.values()):
+        return MultipartEncoder(fields=fields)
+    return ChunkedMultipartEncoder(fields)
+
+
+def isMultipartBody(data):
+    '''
+    Returns True if the given request data is a multipart body built by encodeMultipart.
+    '''
+    return isinstance(data, (MultipartEncoder, ChunkedMultipartEncoder))
+
+
+def iterSource(source, chunkSize=UPLOAD_CHUNK_SIZE):
+    '''
+    Yields the content of a bytes, file object or iterable source in chunks.
+    '''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield bytes(source)
+    elif hasattr(source, 'read'):
+        for chunk in iter(lambda: source.read(chunkSize), b''):
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+def _hasKnownLength(source):
+    return isinstance(source, (bytes, bytearray)) or (hasattr(source, 'read') and hasattr(source, 'seek'))
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('utf-8')
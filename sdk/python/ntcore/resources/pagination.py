@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of items requested per page of a collection.
+DEFAULT_PAGE_SIZE = 100
+
+
+def pageParams(pageSize, cursor):
+    '''
+    Returns the query parameters requesting the page of pageSize items at cursor, None for the first page.
+    '''
+    params = {'limit': pageSize}
+    if cursor is not None:
+        params['cursor'] = cursor
+    return params
+
+
+def iterItems(fetchPage, prefetch=True):
+    '''
+    Yields the items of a paginated collection, fetching its pages on demand.
+
+    :param fetchPage:
+        Callable taking the cursor of a page, None for the first page, and returning a dictionary
+        with its ``items`` and the ``next`` cursor, None on the last page. A list response of an API
+        without pagination is taken as the whole collection. **REQUIRED**
+    :param prefetch:
+        Whether the next page is fetched on a background thread while the current one is consumed.
+    '''
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch_page') if prefetch else None
+    try:
+        page = fetchPage(None)
+        while not isinstance(page, list):
+            cursor = page.get('next')
+            future = executor.submit(fetchPage, cursor) if executor is not None and cursor is not None else None
+            yield from page['items']
+            if cursor is None:
+                return
+            page = future.result() if future is not None else fetchPage(cursor)
+        yield from page
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+async def aiterItems(fetchPage, prefetch=True):
+    '''
+    Yields the items of a paginated collection like iterItems, fetchPage being a coroutine function
+    and the next page prefetched on a task.
+    '''
+
+    task = None
+    try:
+        page = await fetchPage(None)
+        while not isinstance(page, list):
+            cursor = page.get('next')
+            task = asyncio.ensure_future(fetchPage(cursor)) if prefetch and cursor is not None else None
+            for item in page['items']:
+                yield item
+            if cursor is None:
+                return
+            page = await task if task is not None else await fetchPage(cursor)
+            task = None
+        for item in page:
+            yield item
+    finally:
+        if task is not None:
+            task.cancel()
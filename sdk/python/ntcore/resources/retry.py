@@ -0,0 +1,83 @@
+import random
+from urllib3.util.retry import Retry
+
+# Methods that can be sent again without changing the result on the server.
+IDEMPOTENT_METHODS = frozenset(['HEAD', 'GET', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'])
+
+# Statuses that signal a transient server side condition worth retrying.
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+# Upper bound in seconds of a single backoff, same as urllib3's default.
+BACKOFF_MAX = 120
+
+
+class JitteredRetry(Retry):
+    '''
+    Retry policy with exponential backoff plus a random jitter, so that clients failing at the
+    same time do not retry in lockstep.
+    '''
+
+    jitter = 0.0
+
+    def new(self, **kw):
+        retry = super(JitteredRetry, self).new(**kw)
+        retry.jitter = self.jitter
+        return retry
+
+    def get_backoff_time(self):
+        return super(JitteredRetry, self).get_backoff_time() + random.uniform(0, self.jitter)
+
+
+def buildRetry(maxRetries, backoffFactor, backoffJitter):
+    '''
+    Builds the retry policy mounted on the API sessions.
+
+    Connection failures are retried for every method since the request never reached the server.
+    Read failures and transient statuses are only retried for idempotent methods, so a POST is
+    never submitted twice.
+
+    :param maxRetries:
+        The maximum number of retries per request, 0 disables retries.
+    :param backoffFactor:
+        The backoff in seconds is ``backoffFactor * 2 ** (retries - 1)``.
+    :param backoffJitter:
+        The upper bound in seconds of the random jitter added to every backoff.
+    :returns:
+        The retry policy.
+    '''
+
+    options = dict(
+        total=maxRetries,
+        connect=maxRetries,
+        read=maxRetries,
+        status=maxRetries,
+        redirect=None,
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=backoffFactor,
+        raise_on_status=False,
+        respect_retry_after_header=True)
+    try:
+        retry = JitteredRetry(allowed_methods=IDEMPOTENT_METHODS, **options)
+    except TypeError:
+        # urllib3 < 1.26
+        retry = JitteredRetry(method_whitelist=IDEMPOTENT_METHODS, **options)
+    retry.jitter = backoffJitter
+    return retry
+
+
+def backoffTime(retries, backoffFactor, backoffJitter, retryAfter=None):
+    '''
+    Returns the seconds to wait before the given retry, following the same schedule as JitteredRetry.
+
+    :param retries:
+        The number of retries made so far, including the upcoming one.
+    :param retryAfter:
+        The value of a Retry-After response header, honored when it is a number of seconds.
+    '''
+
+    try:
+        return min(float(retryAfter), BACKOFF_MAX)
+    except (TypeError, ValueError):
+        pass
+    backoff = 0 if retries <= 1 else backoffFactor * (2 ** (retries - 1))
+    return min(backoff, BACKOFF_MAX) + random.uniform(0, backoffJitter)
@@ -41,6 +41,11 @@ setup(
         "click",
         "ruamel.yaml"
     ],
+    extras_require={
+        "async": ["httpx"],
+        "zstd": ["zstandard"],
+        "onnx": ["onnx", "skl2onnx"]
+    },
     entry_points={
         "console_scripts": [
             'ntcore = ntcore.cli.workflow:cli'
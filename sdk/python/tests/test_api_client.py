@@ -0,0 +1,255 @@
+from ..ntcore.resources.api_client import ApiClient
+from ..ntcore.resources.retry import buildRetry
+from ..ntcore.exceptions.exceptions import NTCoreAPIException
+from unittest import mock
+from unittest.mock import patch
+from requests.exceptions import ChunkedEncodingError
+import unittest, hashlib, json, os, tempfile, threading, time
+
+api_client = ApiClient(None, None, "http://localhost:8000/")
+
+def mock_stream_response(status_code, chunks, headers={}):
+    '''
+    Builds a streamed response that yields the given chunks.
+    '''
+    def iter_content(chunk_size=1):
+        for chunk in chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    response = mock.Mock(status_code=status_code, headers=headers)
+    response.iter_content = iter_content
+    return response
+
+class ApiClientDownloadTest(unittest.TestCase):
+    '''
+    Python ApiClient Download Test Class
+    '''
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._dir.name, "model.pt")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    @patch("requests.sessions.Session.request")
+    def test_download(self, mock_get):
+        '''
+        test download writes the streamed chunks and returns the digest
+        '''
+        mock_get.return_value = mock_stream_response(200, [b"abc", b"def"])
+        digest = api_client.doDownload("C123/models/1", self._path, digest=hashlib.sha256(b"abcdef").hexdigest())
+
+        assert digest == hashlib.sha256(b"abcdef").hexdigest()
+        assert open(self._path, "rb").read() == b"abcdef"
+        assert not os.path.exists(self._path + ".part")
+        assert mock_get.call_args.kwargs["stream"] is True
+
+    @patch("requests.sessions.Session.request")
+    def test_download_resume(self, mock_get):
+        '''
+        test an interrupted download is resumed with a range request
+        '''
+        mock_get.return_value = mock_stream_response(200, [b"abc", ChunkedEncodingError("Connection reset")])
+        with self.assertRaises(NTCoreAPIException):
+            api_client.doDownload("C123/models/1", self._path)
+        assert open(self._path + ".part", "rb").read() == b"abc"
+
+        mock_get.return_value = mock_stream_response(206, [b"def"], {"Content-Range": "bytes 3-5/6"})
+        digest = api_client.doDownload("C123/models/1", self._path)
+
+        assert mock_get.call_args.kwargs["headers"]["Range"] == "bytes=3-"
+        assert digest == hashlib.sha256(b"abcdef").hexdigest()
+        assert open(self._path, "rb").read() == b"abcdef"
+
+    @patch("requests.sessions.Session.request")
+    def test_download_range_ignored(self, mock_get):
+        '''
+        test the partial file is overwritten when the server ignores the range
+        '''
+        with open(self._path + ".part", "wb") as f:
+            f.write(b"xyz")
+        mock_get.return_value = mock_stream_response(200, [b"abcdef"])
+        api_client.doDownload("C123/models/1", self._path)
+
+        assert open(self._path, "rb").read() == b"abcdef"
+
+    @patch("requests.sessions.Session.request")
+    def test_download_checksum_mismatch(self, mock_get):
+        '''
+        test a digest mismatch raises NTCoreAPIException and discards the file
+        '''
+        mock_get.return_value = mock_stream_response(200, [b"abcdef"])
+        with self.assertRaises(NTCoreAPIException):
+            api_client.doDownload("C123/models/1", self._path, digest="0" * 64)
+
+        assert not os.path.exists(self._path)
+        assert not os.path.exists(self._path + ".part")
+
+    @patch("requests.sessions.Session.request")
+    def test_download_not_found(self, mock_get):
+        '''
+        test a missing model raises NTCoreAPIException
+        '''
+        mock_get.return_value = mock_stream_response(404, [], {"Content-Type": "text/html"})
+        mock_get.return_value.content = b"Not Found"
+        with self.assertRaises(NTCoreAPIException):
+            api_client.doDownload("C123/models/1", self._path)
+
+        assert not os.path.exists(self._path)
+
+class ApiClientUploadTest(unittest.TestCase):
+    '''
+    Python ApiClient Upload Test Class
+    '''
+    @patch("requests.sessions.Session.request")
+    def test_post_file_object(self, mock_post):
+        '''
+        test a file part is streamed with a known content length
+        '''
+        mock_post.return_value = mock.Mock(status_code=204, headers={})
+        with tempfile.TemporaryFile() as f:
+            f.write(b"model-bytes")
+            f.seek(0)
+            api_client.doPost("C123/experiment", dict(runtime="python-3.8"), files=dict(model=f))
+
+            body = mock_post.call_args.kwargs["data"]
+            headers = mock_post.call_args.kwargs["headers"]
+            assert headers["Content-Type"].startswith("multipart/form-data; boundary=")
+            content = body.read()
+        assert len(content) == body.len
+        assert b'name="runtime"\r\n\r\npython-3.8' in content
+        assert b'filename="model"' in content and b"model-bytes" in content
+
+    @patch("requests.sessions.Session.request")
+    def test_post_generator(self, mock_post):
+        '''
+        test a generator part is streamed as a chunked multipart body
+        '''
+        mock_post.return_value = mock.Mock(status_code=204, headers={})
+        chunks = (chunk for chunk in [b"model-", b"bytes"])
+        api_client.doPost("C123/experiment", dict(runtime="python-3.8"), files=dict(model=chunks))
+
+        body = mock_post.call_args.kwargs["data"]
+        boundary = mock_post.call_args.kwargs["headers"]["Content-Type"].split("boundary=")[1]
+        content = b"".join(body)
+        assert content.endswith("--{}--\r\n".format(boundary).encode("utf-8"))
+        assert b"model-bytes\r\n" in content
+
+class ApiClientChunkedUploadTest(unittest.TestCase):
+    '''
+    Python ApiClient Chunked Upload Test Class
+    '''
+    def mock_upload_server(self, delay=0.0, fail_part=None):
+        '''
+        Returns a request handler standing in for the chunked upload endpoints.
+        '''
+        self._parts = {}
+        self._active, self._max_active = 0, 0
+        lock = threading.Lock()
+        def request(method=None, url=None, data=None, **kwargs):
+            if method == "POST":
+                return mock.Mock(status_code=201, headers={'Content-Type': 'application/json'}, content=json.dumps(dict(uploadId="U1")))
+            part_number = int(url.rsplit("/", 1)[1])
+            with lock:
+                self._active += 1
+                self._max_active = max(self._max_active, self._active)
+            time.sleep(delay)
+            with lock:
+                self._active -= 1
+            if part_number == fail_part:
+                return mock.Mock(status_code=500, headers={'Content-Type': 'application/json'}, content=json.dumps(dict(error="storage failure")))
+            self._parts[part_number] = data
+            etag = hashlib.md5(data).hexdigest()
+            return mock.Mock(status_code=200, headers={'Content-Type': 'application/json'}, content=json.dumps(dict(partNumber=part_number, etag=etag)))
+        return request
+
+    @patch("requests.sessions.Session.request")
+    def test_upload_parts(self, mock_request):
+        '''
+        test the source is split in parts uploaded concurrently and reported in order
+        '''
+        mock_request.side_effect = self.mock_upload_server(delay=0.1)
+        content = os.urandom(8 * 1024 + 100)
+        progress = []
+        start = time.monotonic()
+        upload = api_client.doUploadParts("C123/uploads", content, partSize=1024, concurrency=3,
+                                          progress=lambda sent, total: progress.append((sent, total)))
+        elapsed = time.monotonic() - start
+
+        assert upload["uploadId"] == "U1"
+        assert [part["partNumber"] for part in upload["parts"]] == list(range(1, 10))
+        assert [part["etag"] for part in upload["parts"]] == [hashlib.md5(self._parts[n]).hexdigest() for n in range(1, 10)]
+        assert b"".join(self._parts[n] for n in range(1, 10)) == content
+        assert self._max_active == 3
+        assert elapsed < 9 * 0.1 / 2
+        assert progress[-1] == (len(content), len(content))
+        assert [sent for sent, _ in progress] == sorted(sent for sent, _ in progress)
+
+    @patch("requests.sessions.Session.request")
+    def test_upload_parts_generator(self, mock_request):
+        '''
+        test an iterable source is regrouped in parts of the given size
+        '''
+        mock_request.side_effect = self.mock_upload_server()
+        chunks = (bytes([i]) * 300 for i in range(10))
+        upload = api_client.doUploadParts("C123/uploads", chunks, partSize=1024)
+
+        assert [len(self._parts[part["partNumber"]]) for part in upload["parts"]] == [1024, 1024, 952]
+
+    @patch("requests.sessions.Session.request")
+    def test_upload_parts_failure(self, mock_request):
+        '''
+        test a failed part fails the upload
+        '''
+        mock_request.side_effect = self.mock_upload_server(fail_part=2)
+        with self.assertRaises(NTCoreAPIException):
+            api_client.doUploadParts("C123/uploads", os.urandom(4096), partSize=1024, concurrency=2)
+
+class ApiClientConnectionTest(unittest.TestCase):
+    '''
+    Python ApiClient Connection Test Class
+    '''
+    def test_adapter_options(self):
+        '''
+        test the pool and retry options are applied to the mounted adapter
+        '''
+        client = ApiClient(None, None, "http://localhost:8000/", pool_connections=4, pool_maxsize=32, max_retries=5)
+        adapter = client.session.get_adapter("http://localhost:8000/dsp/api/v1/workspaces")
+
+        assert adapter._pool_connections == 4
+        assert adapter._pool_maxsize == 32
+        assert adapter.max_retries.total == 5
+
+    def test_retry_idempotency(self):
+        '''
+        test transient statuses are only retried for idempotent methods
+        '''
+        retry = buildRetry(3, 0.5, 0.5)
+
+        assert retry.is_retry("GET", 503)
+        assert retry.is_retry("DELETE", 429)
+        assert not retry.is_retry("POST", 503)
+        assert not retry.is_retry("GET", 404)
+
+    def test_retry_backoff_jitter(self):
+        '''
+        test the backoff grows exponentially with a bounded jitter
+        '''
+        retry = buildRetry(5, 1.0, 0.5)
+        for _ in range(3):
+            retry = retry.increment("GET", "/dsp/api/v1/workspaces", error=ConnectionResetError())
+        backoff = retry.get_backoff_time()
+
+        assert 4.0 <= backoff <= 4.5
+
+    @patch("requests.sessions.Session.request")
+    def test_request_timeout(self, mock_get):
+        '''
+        test the connect and read timeouts are passed with every request
+        '''
+        mock_get.return_value = mock.Mock(status_code=204, headers={})
+        client = ApiClient(None, None, "http://localhost:8000/", connect_timeout=2, read_timeout=30)
+        client.doGet("workspaces")
+
+        assert mock_get.call_args.kwargs["timeout"] == (2, 30)
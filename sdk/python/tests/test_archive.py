@@ -0,0 +1,123 @@
+from ..ntcore.libs.archive import stream_tar, extract_tar
+from ..ntcore.libs.model_serializer import TensorflowModelSerializer
+from unittest.mock import patch
+import unittest, gzip, io, os, tarfile, tempfile, threading
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class ArchiveTest(unittest.TestCase):
+    '''
+    Python streaming model archive Test Class
+    '''
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.model_dir = os.path.join(self._tmp.name, 'saved_model')
+        os.makedirs(os.path.join(self.model_dir, 'variables'))
+        self.files = {
+            'saved_model.pb': os.urandom(3000),
+            os.path.join('variables', 'variables.data-00000-of-00001'): b'weights' * 5000,
+        }
+        for name, content in self.files.items():
+            with open(os.path.join(self.model_dir, name), 'wb') as f:
+                f.write(content)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def assertExtracted(self, directory):
+        for name, content in self.files.items():
+            with open(os.path.join(directory, 'model', name), 'rb') as f:
+                self.assertEqual(f.read(), content)
+
+    def test_parallel_gzip(self):
+        '''
+        test the archive is made of several gzip members that any gzip reader reads as one tar stream
+        '''
+        archive = b''.join(stream_tar(self.model_dir, 'model', threads=4, block_size=4096))
+        self.assertGreater(archive.count(b'\x1f\x8b\x08'), 1)
+        with tarfile.open(fileobj=io.BytesIO(archive), mode='r:gz') as tar:
+            names = tar.getnames()
+        self.assertIn('model/variables/variables.data-00000-of-00001', names)
+        self.assertEqual(gzip.decompress(archive)[257:262], b'ustar')
+
+        path = os.path.join(self._tmp.name, 'model.tar.gz')
+        with open(path, 'wb') as f:
+            f.write(archive)
+        extract_tar(path, os.path.join(self._tmp.name, 'extracted'))
+        self.assertExtracted(os.path.join(self._tmp.name, 'extracted'))
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        '''
+        test zstd archives are extracted as well
+        '''
+        path = os.path.join(self._tmp.name, 'model.tar.gz')
+        with open(path, 'wb') as f:
+            for chunk in stream_tar(self.model_dir, 'model', compression='zstd', threads=2):
+                f.write(chunk)
+        extract_tar(path, os.path.join(self._tmp.name, 'extracted'))
+        self.assertExtracted(os.path.join(self._tmp.name, 'extracted'))
+
+    def test_serializer_streams(self):
+        '''
+        test the serializer streams the archive and stops its threads on close
+        '''
+        serializer = TensorflowModelSerializer(threads=2)
+        source = serializer.serialize_stream(self.model_dir)
+        assert not hasattr(source, 'read')
+        first = next(iter(source))
+        self.assertEqual(first[:2], b'\x1f\x8b')
+        serializer.close()
+        assert not any(thread.name == 'write_archive' for thread in threading.enumerate())
+
+        archive = TensorflowModelSerializer().serialize(self.model_dir)
+        with tarfile.open(fileobj=io.BytesIO(archive), mode='r:gz') as tar:
+            self.assertEqual(tar.extractfile('model/saved_model.pb').read(), self.files['saved_model.pb'])
+
+    def test_errors(self):
+        '''
+        test a failure while archiving is raised to the consumer
+        '''
+        with self.assertRaises(ValueError):
+            list(stream_tar(self.model_dir, 'model', compression='lz4'))
+        with self.assertRaises(FileNotFoundError):
+            list(stream_tar(os.path.join(self._tmp.name, 'missing'), 'model'))
+
+    def malicious_archive(self, member):
+        '''
+        Returns the path of a gzip tar archive holding a regular file and the given member.
+        '''
+        path = os.path.join(self._tmp.name, 'malicious.tar.gz')
+        with tarfile.open(path, 'w:gz') as tar:
+            tar.add(self.model_dir, arcname='model')
+            if member.isreg():
+                tar.addfile(member, io.BytesIO(b'owned'))
+            else:
+                tar.addfile(member)
+        return path
+
+    def test_unsafe_members(self):
+        '''
+        test members escaping the destination are rejected, with or without the data extraction filter
+        '''
+        outside = os.path.join(self._tmp.name, 'outside')
+        members = [tarfile.TarInfo('model/../../outside'), tarfile.TarInfo('model/link'), tarfile.TarInfo(outside)]
+        members[0].size = members[2].size = 5
+        members[1].type, members[1].linkname = tarfile.SYMTYPE, '../../outside'
+        for data_filter in (tarfile.data_filter if hasattr(tarfile, 'data_filter') else None, None):
+            with patch('tarfile.data_filter', data_filter, create=True):
+                for member in members:
+                    destination = tempfile.mkdtemp(dir=self._tmp.name)
+                    try:
+                        extract_tar(self.malicious_archive(member), destination)
+                    except tarfile.TarError:
+                        pass
+                    else:
+                        # The data filter strips the leading slash of absolute paths rather than rejecting them.
+                        self.assertTrue(os.path.isabs(member.name) and data_filter is not None, member.name)
+                    self.assertFalse(os.path.lexists(outside), member.name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+from ..ntcore.async_client import AsyncClient
+from ..ntcore.monitor.async_monitor import AsyncMonitor
+from ..ntcore.exceptions.exceptions import NTCoreAPIException
+import unittest, asyncio, hashlib, json, os, tempfile
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+def mock_transport(client, handler):
+    '''
+    Routes the requests of the given client to the handler instead of the network.
+    '''
+    api_client = client._api_client
+    api_client.session = httpx.AsyncClient(headers=api_client.session.headers, transport=httpx.MockTransport(handler))
+    return client
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class AsyncClientTest(unittest.TestCase):
+    '''
+    Python AsyncClient Test Class
+    '''
+    def setUp(self):
+        self._requests = []
+
+    def run_async(self, client, coroutine):
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                await client.aclose()
+        return asyncio.run(run())
+
+    def test_get_workspace(self):
+        '''
+        test get workspace returns the decoded response
+        '''
+        def handler(request):
+            self._requests.append(request)
+            return httpx.Response(200, json={"id": "C123"})
+        client = mock_transport(AsyncClient(api_token="token", backoff_jitter=0), handler)
+        response = self.run_async(client, client.get_workspace("C123"))
+        self.assertEqual(response, {"id": "C123"})
+        self.assertEqual(str(self._requests[0].url), "http://localhost:8000/dsp/api/v1/workspace/C123")
+        self.assertEqual(self._requests[0].headers["Authorization"], "Bearer token")
+
+    def test_iter_experiments(self):
+        '''
+        test experiments are iterated over page by page
+        '''
+        experiments = [dict(version=i) for i in range(1, 6)]
+        def handler(request):
+            self._requests.append(request)
+            offset = int(request.url.params.get("cursor", 0))
+            end = offset + int(request.url.params["limit"])
+            return httpx.Response(200, json=dict(items=experiments[offset:end], next=str(end) if end < len(experiments) else None))
+        client = mock_transport(AsyncClient(), handler)
+        async def collect():
+            return [experiment async for experiment in client.iter_experiments("C123", page_size=2)]
+        self.assertEqual(self.run_async(client, collect()), experiments)
+        self.assertEqual(len(self._requests), 3)
+
+    def test_retry_idempotent(self):
+        '''
+        test transient statuses are retried for GET but not for POST
+        '''
+        def handler(request):
+            self._requests.append(request)
+            if len(self._requests) == 1 or request.method == 'POST':
+                return httpx.Response(503, headers={"Retry-After": "0"}, json={"errors": [{"code": "UNAVAILABLE", "message": ""}]})
+            return httpx.Response(200, json=[])
+        client = mock_transport(AsyncClient(backoff_factor=0, backoff_jitter=0), handler)
+        self.assertEqual(self.run_async(client, client.list_workspaces()), [])
+        self.assertEqual(len(self._requests), 2)
+
+        client = mock_transport(AsyncClient(backoff_factor=0, backoff_jitter=0), handler)
+        with self.assertRaises(NTCoreAPIException):
+            self.run_async(client, client.create_workspace("test"))
+        self.assertEqual(len(self._requests), 3)
+
+    def test_download_model(self):
+        '''
+        test download model streams the body to disk and verifies the digest
+        '''
+        body = b"model" * 1024
+        def handler(request):
+            return httpx.Response(200, content=body)
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, "model.pt")
+            client = mock_transport(AsyncClient(), handler)
+            digest = hashlib.sha256(body).hexdigest()
+            self.assertEqual(self.run_async(client, client.download_model(path, "C123", 1, digest=digest)), digest)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), body)
+
+    def test_monitor_add_metric(self):
+        '''
+        test add metric posts the metric line as JSON, as the sync monitor does
+        '''
+        def handler(request):
+            self._requests.append(request)
+            return httpx.Response(204)
+        monitor = mock_transport(AsyncMonitor("C123"), handler)
+        self.run_async(monitor, monitor.add_metric("Latency", 1.5))
+        request = self._requests[0]
+        self.assertEqual(request.url.path, "/dsp/api/v1/monitoring/metrics")
+        self.assertEqual(request.headers["Content-Type"], "application/json")
+        self.assertEqual(json.loads(request.content), dict(workspaceId="C123", name="Latency", value=1.5))
+
+    def test_monitor_log(self):
+        '''
+        test log posts the nested event as JSON
+        '''
+        def handler(request):
+            self._requests.append(request)
+            return httpx.Response(204)
+        monitor = mock_transport(AsyncMonitor("C123"), handler)
+        self.run_async(monitor, monitor.log("started"))
+        request = self._requests[0]
+        self.assertEqual(request.url.path, "/dsp/api/v1/monitoring/C123/events")
+        self.assertEqual(request.headers["Content-Type"], "application/json")
+        event = json.loads(request.content)["event"]
+        self.assertEqual(event["message"], "started")
+        self.assertIsInstance(event["time"], int)
+
+if __name__ == '__main__':
+    unittest.main()
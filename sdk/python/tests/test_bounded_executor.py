@@ -0,0 +1,110 @@
+from ..ntcore.resources.bounded_executor import BoundedExecutor
+from ..ntcore.monitor.monitor import Monitor
+from unittest import mock
+from unittest.mock import patch
+import unittest, threading, time
+
+class BoundedExecutorTest(unittest.TestCase):
+    '''
+    Python bounded request queue Test Class
+    '''
+    def fill(self, policy, timeout=None, droppable=None):
+        '''
+        Returns an executor whose single worker is busy until the returned event is set,
+        with a full queue of two calls, and the futures of the calls.
+        '''
+        executor = BoundedExecutor(1, maxQueue=2, policy=policy, timeout=timeout, droppable=droppable)
+        release, started = threading.Event(), threading.Event()
+        def busy():
+            started.set()
+            release.wait(5)
+            return 'busy'
+        futures = [executor.submit(busy)]
+        started.wait(5)
+        futures += [executor.submit(lambda i=i: i) for i in range(2)]
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        return executor, release, futures
+
+    def test_drop_newest(self):
+        '''
+        test the new call is dropped once the queue is full
+        '''
+        executor, release, futures = self.fill('drop_newest')
+        dropped = executor.submit(lambda: 2)
+        assert dropped.cancelled()
+        release.set()
+        self.assertEqual([future.result(5) for future in futures], ['busy', 0, 1])
+        self.assertEqual(executor.stats(), dict(submitted=4, dropped=1, delayed=0, delaySeconds=0.0, queued=0))
+
+    def test_drop_oldest(self):
+        '''
+        test the oldest pending call is dropped once the queue is full
+        '''
+        executor, release, futures = self.fill('drop_oldest')
+        newest = executor.submit(lambda: 2)
+        release.set()
+        assert futures[1].cancelled()
+        self.assertEqual([futures[2].result(5), newest.result(5)], [1, 2])
+
+    def test_sample(self):
+        '''
+        test a random pending call is dropped once the queue is full
+        '''
+        executor, release, futures = self.fill('sample')
+        newest = executor.submit(lambda: 2)
+        release.set()
+        self.assertEqual(newest.result(5), 2)
+        self.assertEqual(sum(future.cancelled() for future in futures[1:]), 1)
+
+    def test_block(self):
+        '''
+        test a call waits for room up to the timeout, then is dropped
+        '''
+        executor, release, futures = self.fill('block', timeout=0.05)
+        start = time.monotonic()
+        assert executor.submit(lambda: 2).cancelled()
+        assert time.monotonic() - start >= 0.05
+        threading.Timer(0.05, release.set).start()
+        executor._timeout = 5
+        self.assertEqual(executor.submit(lambda: 3).result(5), 3)
+        stats = executor.stats()
+        self.assertEqual((stats['dropped'], stats['delayed']), (1, 2))
+        assert stats['delaySeconds'] >= 0.05
+
+    def test_not_droppable(self):
+        '''
+        test calls that are not droppable are queued past the bound and never evicted
+        '''
+        executor, release, futures = self.fill('drop_oldest', droppable=lambda args, kwargs: not kwargs.get('read'))
+        reads = [executor.submit(lambda read: 'read', read=True) for _ in range(3)]
+        write = executor.submit(lambda: 'write')
+        release.set()
+        self.assertEqual([read.result(5) for read in reads], ['read'] * 3)
+        assert futures[1].cancelled() and futures[2].cancelled() and write.cancelled()
+        self.assertEqual(executor.stats()['dropped'], 3)
+
+    @patch("requests.sessions.Session.request")
+    def test_monitor_queue(self, mock_post):
+        '''
+        test monitoring calls are dropped rather than queued without bound while the API is slow
+        '''
+        release = threading.Event()
+        def slow(*args, **kwargs):
+            release.wait(5)
+            return mock.Mock(status_code=201, headers={})
+        mock_post.side_effect = slow
+        monitor = Monitor("workspace_id", pool_maxsize=1, queue_size=2, queue_policy='drop_newest')
+        futures = [monitor.add_metric("Latency", i) for i in range(10)]
+        release.set()
+        for future in futures:
+            try:
+                future.result(5)
+            except Exception:
+                pass
+        stats = monitor.get_queue_stats()
+        self.assertEqual(stats['submitted'], 10)
+        assert stats['dropped'] >= 7 and mock_post.call_count == 10 - stats['dropped']
+
+if __name__ == '__main__':
+    unittest.main()
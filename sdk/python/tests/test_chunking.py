@@ -0,0 +1,45 @@
+from ..ntcore.resources.chunking import iterChunks, chunkDigest
+import unittest, io, os
+
+class ChunkingTest(unittest.TestCase):
+    '''
+    Python content-defined chunking Test Class
+    '''
+    def setUp(self):
+        self.content = os.urandom(2 * 1024 * 1024)
+
+    def chunks(self, source):
+        return list(iterChunks(source, minSize=16 * 1024, avgSize=64 * 1024, maxSize=256 * 1024))
+
+    def test_bounds(self):
+        '''
+        test the chunks add up to the content within the size bounds
+        '''
+        chunks = self.chunks(self.content)
+        self.assertEqual(b''.join(chunks), self.content)
+        assert all(16 * 1024 <= len(chunk) <= 256 * 1024 for chunk in chunks[:-1])
+        assert 8 < len(chunks) < 100
+        self.assertEqual(self.chunks(b''), [])
+        self.assertEqual([len(chunk) for chunk in iterChunks(b'a' * 100, 32, 32, 64)], [32, 32, 32, 4])
+        with self.assertRaises(ValueError):
+            list(iterChunks(b'', 64, 32, 16))
+
+    def test_source_independent(self):
+        '''
+        test the boundaries don't depend on how the source is read
+        '''
+        blocks = [self.content[i:i + 10007] for i in range(0, len(self.content), 10007)]
+        self.assertEqual(self.chunks(io.BytesIO(self.content)), self.chunks(self.content))
+        self.assertEqual(self.chunks(iter(blocks)), self.chunks(self.content))
+
+    def test_shift_resistant(self):
+        '''
+        test inserting bytes only changes the chunks around the insertion
+        '''
+        digests = set(chunkDigest(chunk) for chunk in self.chunks(self.content))
+        middle = len(self.content) // 2
+        edited = [chunkDigest(chunk) for chunk in self.chunks(b'header' + self.content[:middle] + b'x' * 10 + self.content[middle:])]
+        self.assertGreaterEqual(sum(digest in digests for digest in edited), len(edited) - 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+from ..ntcore.client import Client
+from ..ntcore.libs.model_serializer import SklearnModelSerializer
+from ..ntcore.models.framework import Framework
+from unittest import mock
+from unittest.mock import patch
+import unittest, hashlib, json, os, pickle, tempfile, threading, time
+
+def json_response(status_code, content):
+    return mock.Mock(status_code=status_code, headers={'Content-Type': 'application/json'}, content=json.dumps(content))
+
+class ClientSaveTest(unittest.TestCase):
+    '''
+    Python Client Save Test Class
+    '''
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._model_path = os.path.join(self._dir.name, "model.pkl")
+        self._model = os.urandom(5000)
+        with open(self._model_path, "wb") as f:
+            f.write(self._model)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def start_run(self, client):
+        experiment = client.start_run("C123")
+        experiment.framework = Framework.sklearn
+        experiment.serializable_model = self._model_path
+        return experiment
+
+    @patch("requests.sessions.Session.request")
+    def test_save_in_parts(self, mock_request):
+        '''
+        test a model larger than one part is uploaded in parts and committed with the experiment
+        '''
+        parts = {}
+        def request(method=None, url=None, data=None, **kwargs):
+            if url.endswith("/uploads"):
+                return json_response(201, dict(uploadId="U1"))
+            if method == "PUT":
+                parts[int(url.rsplit("/", 1)[1])] = data
+                return json_response(200, dict(etag=hashlib.md5(data).hexdigest()))
+            return json_response(201, dict(version=1))
+        mock_request.side_effect = request
+
+        progress = []
+        client = Client(upload_part_size=2048, upload_concurrency=2, upload_progress=lambda *args: progress.append(args))
+        experiment = self.start_run(client)
+        experiment.posttraining_metadata = dict(accuracy=0.9)
+        with patch.object(SklearnModelSerializer, "metadata", return_value=dict(archive_bytes=5000)):
+            experiment.save()
+
+        assert b"".join(parts[n] for n in sorted(parts)) == self._model
+        method, url, commit = mock_request.call_args.kwargs["method"], mock_request.call_args.kwargs["url"], mock_request.call_args.kwargs["data"]
+        assert method == "POST" and url.endswith("/C123/experiment")
+        assert commit["uploadId"] == "U1" and commit["framework"] == "sklearn"
+        assert json.loads(commit["metrics"]) == dict(accuracy=0.9, archive_bytes=5000)
+        assert [part["partNumber"] for part in json.loads(commit["parts"])] == [1, 2, 3]
+        assert progress[-1] == (5000, 5000)
+
+    @patch("requests.sessions.Session.request")
+    def test_save_single_stream(self, mock_request):
+        '''
+        test a model smaller than one part is uploaded as a multipart body
+        '''
+        mock_request.return_value = json_response(201, dict(version=1))
+        client = Client(upload_part_size=8192)
+        self.start_run(client).save()
+
+        mock_request.assert_called_once()
+        assert mock_request.call_args.kwargs["headers"]["Content-Type"].startswith("multipart/form-data")
+
+    @patch("requests.sessions.Session.request")
+    def test_save_dedup(self, mock_request):
+        '''
+        test a retrained model only uploads the chunks the workspace doesn't store and commits all of them
+        '''
+        store, sent = {}, []
+        def request(method=None, url=None, data=None, **kwargs):
+            if url.endswith("/chunks/missing"):
+                return json_response(200, dict(missing=[d for d in json.loads(data["digests"]) if d not in store]))
+            if method == "PUT":
+                digest = url.rsplit("/", 1)[1]
+                assert hashlib.sha256(data).hexdigest() == digest
+                store[digest] = data
+                sent.append(len(data))
+                return json_response(200, dict(digest=digest))
+            return json_response(201, dict(version=1))
+        mock_request.side_effect = request
+        client = Client(upload_dedup=True)
+
+        model = bytearray(os.urandom(8 * 1024 * 1024))
+        with open(self._model_path, "wb") as f:
+            f.write(model)
+        self.start_run(client).save()
+        assert sum(sent) == len(model)
+
+        sent.clear()
+        model[4 * 1024 * 1024:4 * 1024 * 1024 + 100] = os.urandom(100)
+        with open(self._model_path, "wb") as f:
+            f.write(model)
+        self.start_run(client).save()
+        commit = mock_request.call_args.kwargs["data"]
+        assert b"".join(store[digest] for digest in json.loads(commit["chunks"])) == bytes(model)
+        assert 0 < sum(sent) < len(model) / 2
+
+    @patch("requests.sessions.Session.request")
+    def test_save_async(self, mock_request):
+        '''
+        test an asynchronous save uploads a snapshot of the model in the background until flushed
+        '''
+        parts, released = {}, threading.Event()
+        def request(method=None, url=None, data=None, **kwargs):
+            released.wait(5)
+            if url.endswith("/uploads"):
+                return json_response(201, dict(uploadId="U1"))
+            if method == "PUT":
+                parts[int(url.rsplit("/", 1)[1])] = data
+                return json_response(200, dict(etag=hashlib.md5(data).hexdigest()))
+            return json_response(201, dict(version=1))
+        mock_request.side_effect = request
+
+        model = dict(weights=list(range(1000)))
+        with Client(upload_part_size=256, async_save=True) as client:
+            experiment = client.start_run("C123")
+            experiment.framework = Framework.sklearn
+            future = experiment.save_model(model)
+            model["weights"].clear()
+            assert not future.done() and not client.flush(timeout=0.05)
+            released.set()
+        assert future.done() and future.result() is None
+        assert pickle.loads(b"".join(parts[n] for n in sorted(parts))) == dict(weights=list(range(1000)))
+        assert not client._active_experiments
+
+        mock_request.side_effect = None
+        mock_request.return_value = json_response(400, dict(errors=[dict(code="invalid", message="Invalid model")]))
+        client = Client(async_save=True)
+        experiment = self.start_run(client)
+        with self.assertLogs(level="WARNING"):
+            future = experiment.save()
+            assert client.flush(timeout=5)
+        self.assertIsNotNone(future.exception())
+        assert experiment in client._active_experiments
+        client.close()
+
+class ClientIterTest(unittest.TestCase):
+    '''
+    Python Client paginated iterators Test Class
+    '''
+    def pages(self, items, page_size):
+        '''
+        Returns a request side effect serving the given items in pages like the API, by offset cursors.
+        '''
+        def request(method=None, url=None, params=None, **kwargs):
+            self.assertEqual(params["limit"], page_size)
+            offset = int(params.get("cursor", 0))
+            end = offset + page_size
+            return json_response(200, dict(items=items[offset:end], next=str(end) if end < len(items) else None))
+        return request
+
+    @patch("requests.sessions.Session.request")
+    def test_iter_workspaces(self, mock_request):
+        '''
+        test workspaces are fetched page by page as they are consumed
+        '''
+        workspaces = [dict(id="C{}".format(i)) for i in range(25)]
+        mock_request.side_effect = self.pages(workspaces, 10)
+        iterator = Client().iter_workspaces(page_size=10, prefetch=False)
+        self.assertEqual(next(iterator), workspaces[0])
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(list(iterator), workspaces[1:])
+        self.assertEqual(mock_request.call_count, 3)
+        assert mock_request.call_args.kwargs["url"].endswith("/workspaces")
+
+    @patch("requests.sessions.Session.request")
+    def test_iter_experiments_prefetch(self, mock_request):
+        '''
+        test the next page is prefetched while the current one is consumed
+        '''
+        experiments = [dict(version=i) for i in range(1, 8)]
+        mock_request.side_effect = self.pages(experiments, 3)
+        iterator = Client().iter_experiments("C123", page_size=3)
+        self.assertEqual(next(iterator), experiments[0])
+        for _ in range(100):
+            if mock_request.call_count == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(list(iterator), experiments[1:])
+        assert mock_request.call_args.kwargs["url"].endswith("/workspace/C123/experiments")
+
+    @patch("requests.sessions.Session.request")
+    def test_unpaginated_response(self, mock_request):
+        '''
+        test a list response of a server without pagination is the whole collection
+        '''
+        mock_request.return_value = json_response(200, [dict(id="C1"), dict(id="C2")])
+        self.assertEqual(list(Client().iter_workspaces()), [dict(id="C1"), dict(id="C2")])
+        mock_request.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
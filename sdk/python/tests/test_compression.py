@@ -0,0 +1,155 @@
+from ..ntcore.resources.api_client import ApiClient
+from ..ntcore.monitor.monitor import Monitor
+from ..ntcore.resources.compression import compress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import unittest, gzip, hashlib, json, os, random, tempfile, threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MODEL = json.dumps([random.Random(0).random() for _ in range(20000)]).encode('utf-8')
+
+class StandInHandler(BaseHTTPRequestHandler):
+    '''
+    Stand-in for the NTCore API, decoding gzip request bodies like the body-parser middleware
+    and answering 415 to other content encodings or if gzip is turned off.
+    '''
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers['Content-Length']))
+        encoding = self.headers.get('Content-Encoding', 'identity')
+        self.server.received.append((encoding, len(raw)))
+        if encoding == 'gzip' and self.server.gzip:
+            body = gzip.decompress(raw)
+        elif encoding == 'identity':
+            body = raw
+        else:
+            return self.reply(415, dict(error='unsupported content encoding "{}"'.format(encoding)))
+        if 'application/json' in self.headers.get('Content-Type', ''):
+            return self.reply(200, json.loads(body))
+        return self.reply(200, {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()})
+
+    def do_GET(self):
+        body, headers = MODEL, {}
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body, headers = gzip.compress(MODEL), {'Content-Encoding': 'gzip'}
+        self.server.sent.append(len(body))
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply(self, status, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class CompressionTest(unittest.TestCase):
+    '''
+    Python request compression Test Class, against a local stand-in server
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls._server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls._server.received, cls._server.sent, cls._server.gzip = [], [], True
+        cls._url = 'http://127.0.0.1:{}/'.format(cls._server.server_address[1])
+        threading.Thread(target=cls._server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._server.shutdown()
+        cls._server.server_close()
+
+    def setUp(self):
+        self._server.received.clear()
+        self._server.sent.clear()
+        self._server.gzip = True
+        rows = [dict(age=random.randint(18, 90), income=round(random.uniform(1e4, 1e5), 2), segment=random.choice('ABC')) for _ in range(2000)]
+        self._input_data = json.dumps(rows)
+
+    def test_bytes_saved(self):
+        '''
+        test compressed ground truth uploads reach the server decoded with fewer bytes on the wire,
+        see benchmarks/compression.py for the bytes saved against the CPU time per level
+        '''
+        data = dict(workspaceId='C123', inputData=self._input_data, groundTruth='1')
+        sizes = []
+        for compression, level in ((None, None), ('gzip', 1), ('gzip', 6), ('gzip', 9)):
+            client = ApiClient(None, None, self._url, compression=compression, compression_level=level)
+            self.assertEqual(client.doPost('monitoring/performances', data), data)
+            encoding, wire_bytes = self._server.received[-1]
+            self.assertEqual(encoding, compression or 'identity')
+            sizes.append(wire_bytes)
+
+        self.assertLess(sizes[2], sizes[0] / 2)
+        self.assertLessEqual(sizes[3], sizes[1])
+
+    def test_threshold(self):
+        '''
+        test bodies under the threshold are sent uncompressed
+        '''
+        client = ApiClient(None, None, self._url, compression='gzip', compression_threshold=1024)
+        client.doPost('monitoring/metrics', dict(workspaceId='C123', name='Latency', value='1'))
+        self.assertEqual(self._server.received[-1][0], 'identity')
+
+    def test_monitor_json(self):
+        '''
+        test the monitor compresses its JSON bodies
+        '''
+        monitor = Monitor('C123', server=self._url, compression='gzip')
+        response = monitor.upload_ground_truth(json.loads(self._input_data), '1').result()
+        self.assertEqual(response.json()['inputData'], self._input_data)
+        self.assertEqual(self._server.received[-1][0], 'gzip')
+
+    def test_unsupported_encoding(self):
+        '''
+        test a 415 answer turns compression off and sends the body again
+        '''
+        self._server.gzip = False
+        client = ApiClient(None, None, self._url, compression='gzip')
+        data = dict(workspaceId='C123', inputData=self._input_data)
+        self.assertEqual(client.doPost('monitoring/performances', data), data)
+        self.assertEqual(client.doPost('monitoring/performances', data), data)
+        self.assertEqual([encoding for encoding, _ in self._server.received], ['gzip', 'identity', 'identity'])
+        self.assertIsNone(client.compression)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        '''
+        test zstd bodies round trip
+        '''
+        self.assertEqual(zstandard.ZstdDecompressor().decompress(compress(MODEL, 'zstd')), MODEL)
+
+    def test_download_accept_encoding(self):
+        '''
+        test downloads accept gzip and are written decoded
+        '''
+        client = ApiClient(None, None, self._url)
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'model.json')
+            digest = client.doDownload('C123/models/1', path)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), MODEL)
+        self.assertEqual(digest, hashlib.sha256(MODEL).hexdigest())
+        self.assertLess(self._server.sent[-1], len(MODEL))
+
+    def test_compress(self):
+        '''
+        test gzip bodies round trip and unknown encodings are rejected
+        '''
+        self.assertEqual(gzip.decompress(compress(MODEL, 'gzip', 1)), MODEL)
+        with self.assertRaises(ValueError):
+            ApiClient(None, None, self._url, compression='br')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+from ..ntcore.resources.encryption import Encryption
+from ..ntcore.exceptions.exceptions import NTCoreAPIException
+from jwcrypto import jwk
+from unittest import mock
+from unittest.mock import patch
+import unittest, json, os, tempfile
+
+def generate_key_set(kid_prefix):
+    '''
+    Generates a private JWK key set with a signing and an encryption key.
+    '''
+    keys = [
+        jwk.JWK.generate(kty='RSA', size=2048, alg='RS256', use='sig', kid=kid_prefix + '-sig'),
+        jwk.JWK.generate(kty='RSA', size=2048, alg='RSA-OAEP-256', use='enc', kid=kid_prefix + '-enc')
+    ]
+    private = dict(keys=[json.loads(key.export_private()) for key in keys])
+    public = dict(keys=[json.loads(key.export_public()) for key in keys])
+    return private, public
+
+class EncryptionTest(unittest.TestCase):
+    '''
+    Python Encryption Test Class
+    '''
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        client_private, self._client_public = generate_key_set('client')
+        server_private, self._server_public = generate_key_set('server')
+        self._client_private_path = self.write('client_private.json', client_private)
+        self._server_private_path = self.write('server_private.json', server_private)
+        self._client_public_path = self.write('client_public.json', self._client_public)
+        self._server_public_url = 'https://keys.ntcore.io/server/jwks.json'
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def write(self, name, keySet):
+        path = os.path.join(self._dir.name, name)
+        with open(path, 'w') as f:
+            json.dump(keySet, f)
+        return path
+
+    def mock_key_server(self, mock_get, *keySets):
+        mock_get.side_effect = [mock.Mock(text=json.dumps(keySet)) for keySet in keySets]
+
+    @patch("requests.get")
+    def test_round_trip(self, mock_get):
+        '''
+        test messages encrypted by either side are decrypted by the other one
+        and the key server is only called once
+        '''
+        self.mock_key_server(mock_get, self._server_public)
+        client = Encryption(self._client_private_path, self._server_public_url)
+        server = Encryption(self._server_private_path, self._client_public_path)
+
+        for i in range(3):
+            body = json.dumps(dict(message=i))
+            assert server.decrypt(client.encrypt(body)) == body.encode('utf-8')
+            assert client.decrypt(server.encrypt(body)) == body.encode('utf-8')
+        assert mock_get.call_count == 1
+        assert mock_get.call_args[1]['timeout'] == client.keySetTimeoutSeconds
+
+    @patch("requests.get")
+    def test_refresh(self, mock_get):
+        '''
+        test refresh and an expired TTL reload the key set
+        '''
+        self.mock_key_server(mock_get, *[self._server_public] * 3)
+        client = Encryption(self._client_private_path, self._server_public_url, keySetTtlSeconds=0)
+        client.encrypt('{}')
+        client.encrypt('{}')
+        assert mock_get.call_count == 2
+
+        client.keySetTtlSeconds = 300
+        client.refresh(self._server_public_url)
+        client.encrypt('{}')
+        client.encrypt('{}')
+        assert mock_get.call_count == 3
+
+    @patch("requests.get")
+    def test_key_rotation(self, mock_get):
+        '''
+        test a message signed with an unknown kid reloads the key set
+        '''
+        rotated_private, rotated_public = generate_key_set('rotated')
+        self.mock_key_server(mock_get, self._server_public, rotated_public)
+        client = Encryption(self._client_private_path, self._server_public_url)
+        server = Encryption(self._server_private_path, self._client_public_path)
+        assert client.decrypt(server.encrypt('{}')) == b'{}'
+
+        rotated_server = Encryption(self.write('rotated_private.json', rotated_private), self._client_public_path)
+        assert client.decrypt(rotated_server.encrypt('{}')) == b'{}'
+        assert mock_get.call_count == 2
+
+    @patch("requests.get")
+    def test_unknown_kid(self, mock_get):
+        '''
+        test a message signed with a kid missing after reload is rejected
+        and unknown kids reload the key set at most once per reload interval
+        '''
+        self.mock_key_server(mock_get, *[self._server_public] * 3)
+        client = Encryption(self._client_private_path, self._server_public_url)
+        unknown_private, _ = generate_key_set('unknown')
+        unknown_server = Encryption(self.write('unknown_private.json', unknown_private), self._client_public_path)
+        for i in range(3):
+            with self.assertRaises(NTCoreAPIException):
+                client.decrypt(unknown_server.encrypt('{}'))
+        assert mock_get.call_count == 2
+
+        client.keySetReloadIntervalSeconds = 0
+        with self.assertRaises(NTCoreAPIException):
+            client.decrypt(unknown_server.encrypt('{}'))
+        assert mock_get.call_count == 3
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+from ..ntcore.libs.import_hooks import register_post_import_hook
+import unittest, os, subprocess, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def loaded_modules(code, modules):
+    '''
+    Runs the code in a fresh interpreter and returns which of the given modules it loaded.
+    '''
+    script = "import sys\n{}\nprint(','.join(m for m in {!r} if m in sys.modules))".format(code, modules)
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return [name for name in output.strip().split(",") if name]
+
+class LazyImportTest(unittest.TestCase):
+    '''
+    Python lazy imports Test Class
+    '''
+    def test_import_ntcore(self):
+        '''
+        test importing the package loads no HTTP, JOSE or framework dependency
+        '''
+        heavy = ["requests", "requests_toolbelt", "jwcrypto", "jose", "numpy", "pandas", "httpx"]
+        self.assertEqual(loaded_modules("import ntcore", heavy), [])
+        self.assertEqual(loaded_modules("import ntcore.monitor", heavy + ["requests_futures", "psutil"]), [])
+        self.assertEqual(loaded_modules("import ntcore.cli.workflow", heavy), [])
+
+    def test_first_use(self):
+        '''
+        test public names load their dependencies on first use, without the encryption stack
+        '''
+        self.assertEqual(loaded_modules("from ntcore import Client; Client()", ["requests", "jwcrypto"]), ["requests"])
+        self.assertEqual(loaded_modules("from ntcore.monitor import Monitor", ["requests_futures", "psutil"]), ["requests_futures"])
+        self.assertEqual(loaded_modules("import ntcore.monitor as m; m.SystemMetricsPublisherDaemon", ["psutil"]), ["psutil"])
+
+    def test_post_import_hook(self):
+        '''
+        test hooks run once their module is imported, or right away if it already is
+        '''
+        with tempfile.TemporaryDirectory() as dir:
+            with open(os.path.join(dir, "ntcore_hooked_module.py"), "w") as f:
+                f.write("VALUE = 1\n")
+            sys.path.insert(0, dir)
+            try:
+                imported = []
+                register_post_import_hook("ntcore_hooked_module", lambda module: imported.append(module.VALUE))
+                self.assertEqual(imported, [])
+                import ntcore_hooked_module
+                self.assertEqual(imported, [1])
+                register_post_import_hook("ntcore_hooked_module", lambda module: imported.append(module.VALUE + 1))
+                self.assertEqual(imported, [1, 2])
+                self.assertIs(ntcore_hooked_module.__loader__, ntcore_hooked_module.__spec__.loader)
+            finally:
+                sys.path.remove(dir)
+                sys.modules.pop("ntcore_hooked_module", None)
+
+if __name__ == '__main__':
+    unittest.main()
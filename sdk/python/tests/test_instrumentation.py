@@ -0,0 +1,101 @@
+from ..ntcore.client import Client
+from ..ntcore.resources.api_client import ApiClient
+from ..ntcore.resources.instrumentation import endpointTemplate
+from ..ntcore.exceptions.exceptions import NTCoreAPIException
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from unittest.mock import patch
+from requests.exceptions import ConnectionError
+import unittest, json, threading
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    '''
+    Stand-in for the NTCore API answering 503 to every other request.
+    '''
+    def do_GET(self):
+        self.server.count += 1
+        status, body = (503, b'{}') if self.server.count % 2 else (200, json.dumps(dict(id='C123')).encode('utf-8'))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class InstrumentationTest(unittest.TestCase):
+    '''
+    Python request instrumentation Test Class
+    '''
+    def test_endpoint_template(self):
+        '''
+        test identifiers are grouped under one endpoint
+        '''
+        self.assertEqual(endpointTemplate('workspace/C123/registry'), 'workspace/{id}/registry')
+        self.assertEqual(endpointTemplate('C123/uploads/0f9a/parts/2?x=1'), '{id}/uploads/{id}/parts/{id}')
+        self.assertEqual(endpointTemplate('workspaces'), 'workspaces')
+
+    @patch("requests.sessions.Session.request")
+    def test_stats_and_hooks(self, mock_request):
+        '''
+        test requests are recorded per endpoint and the hooks see every request
+        '''
+        content = json.dumps(dict(id='C123'))
+        mock_request.return_value = mock.Mock(status_code=200, headers={'Content-Type': 'application/json'}, content=content)
+        finished = []
+        client = Client(metadata_ttl=None)
+        client.add_request_hooks(
+            pre=lambda span: span.headers.update(traceparent='00-{}-{}-01'.format('0' * 32, span.spanId)),
+            post=lambda span, response: finished.append((span.name, span.status)))
+        client.get_workspace('C123')
+        client.get_workspace('C456')
+        client.create_workspace('test')
+
+        assert mock_request.call_args.kwargs['headers']['traceparent'].startswith('00-')
+        self.assertEqual(finished, [('GET workspace/{id}', 200), ('GET workspace/{id}', 200), ('POST workspace', 200)])
+        stats = client.get_request_stats()['endpoints']
+        self.assertEqual(stats['GET workspace/{id}']['count'], 2)
+        self.assertEqual(stats['GET workspace/{id}']['bytesIn'], 2 * len(content))
+        self.assertEqual(stats['GET workspace/{id}']['latency']['Count'], 2)
+        self.assertEqual(stats['POST workspace']['bytesOut'], len('type=API&name=test'))
+
+        span = client.get_request_spans()[-1]
+        self.assertEqual(span['name'], 'POST workspace')
+        self.assertEqual(span['attributes']['http.response.status_code'], 200)
+        self.assertEqual(span['status']['code'], 'STATUS_CODE_OK')
+        self.assertGreaterEqual(span['endTimeUnixNano'], span['startTimeUnixNano'])
+
+    @patch("requests.sessions.Session.request")
+    def test_errors(self, mock_request):
+        '''
+        test error statuses and connection failures are counted by error code
+        '''
+        client = ApiClient(None, None, 'http://localhost:8000/', max_retries=0)
+        mock_request.return_value = mock.Mock(status_code=500, headers={'Content-Type': 'application/json'}, content=json.dumps(dict(error='down')))
+        self.assertRaises(NTCoreAPIException, client.doGet, 'workspaces')
+        mock_request.side_effect = ConnectionError('refused')
+        self.assertRaises(NTCoreAPIException, client.doGet, 'workspaces')
+
+        self.assertEqual(client.stats.toDict()['endpoints']['GET workspaces']['errors'], {'500': 1, 'ConnectionError': 1})
+        self.assertEqual(client.stats.toSpans()[-1]['attributes']['error.type'], 'ConnectionError')
+
+    def test_retries(self):
+        '''
+        test retries made by the retry policy are counted
+        '''
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+        server.count = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = ApiClient(None, None, 'http://127.0.0.1:{}/'.format(server.server_address[1]), backoff_factor=0, backoff_jitter=0)
+            self.assertEqual(client.doGet('workspace/C123'), dict(id='C123'))
+        finally:
+            server.shutdown()
+            server.server_close()
+        stats = client.stats.toDict()['endpoints']['GET workspace/{id}']
+        self.assertEqual((stats['count'], stats['retries']), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
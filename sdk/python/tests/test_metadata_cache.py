@@ -0,0 +1,115 @@
+from ..ntcore.client import Client
+from ..ntcore.libs.metadata_cache import MetadataCache
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from unittest.mock import patch
+import unittest, json, threading
+
+class MetadataCacheTest(unittest.TestCase):
+    '''
+    Python metadata cache Test Class
+    '''
+    def setUp(self):
+        self._now = 0
+        self._cache = MetadataCache(ttl=10, stale_ttl=60, clock=lambda: self._now)
+
+    def test_single_flight(self):
+        '''
+        test concurrent lookups of a key share a single call
+        '''
+        calls, release = [], threading.Event()
+        def load(etag):
+            calls.append(etag)
+            release.wait(5)
+            return dict(version=3), 'W/"1"'
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            futures = [executor.submit(self._cache.get, 'registry', load) for _ in range(16)]
+            threading.Timer(0.1, release.set).start()
+            results = [future.result(5) for future in futures]
+        self.assertEqual(calls, [None])
+        self.assertEqual(results, [dict(version=3)] * 16)
+
+    def test_stale_while_revalidate(self):
+        '''
+        test a stale value is returned while a single background call revalidates it
+        '''
+        self._cache.get('registry', lambda etag: (dict(version=1), 'W/"1"'))
+        calls, release = [], threading.Event()
+        def load(etag):
+            calls.append(etag)
+            release.wait(5)
+            return dict(version=2), 'W/"2"'
+
+        self._now = 30
+        self.assertEqual(self._cache.get('registry', load), dict(version=1))
+        self.assertEqual(self._cache.get('registry', load), dict(version=1))
+        flight = self._cache._flights['registry']
+        release.set()
+        flight.done.wait(5)
+        self.assertEqual(calls, ['W/"1"'])
+        self.assertEqual(self._cache.get('registry', load), dict(version=2))
+
+    def test_expired(self):
+        '''
+        test a value past the stale ttl is revalidated before it is returned, and kept if not modified
+        '''
+        self._cache.get('registry', lambda etag: (dict(version=1), 'W/"1"'))
+        self._now = 100
+        load = mock.Mock(return_value=None)
+        self.assertEqual(self._cache.get('registry', load), dict(version=1))
+        load.assert_called_once_with('W/"1"')
+        self.assertEqual(self._cache.get('registry', load), dict(version=1))
+        load.assert_called_once()
+
+    def test_error(self):
+        '''
+        test a failed lookup is raised to every caller and not cached
+        '''
+        load = mock.Mock(side_effect=[ValueError('unavailable'), (dict(version=1), None)])
+        self.assertRaises(ValueError, self._cache.get, 'registry', load)
+        self.assertEqual(self._cache.get('registry', load), dict(version=1))
+
+    def test_invalidate(self):
+        '''
+        test invalidated keys are loaded again
+        '''
+        self._cache.get('registry', lambda etag: (dict(version=1), None))
+        self._cache.invalidate('registry')
+        self.assertEqual(self._cache.get('registry', lambda etag: (dict(version=2), None)), dict(version=2))
+
+    def test_copies(self):
+        '''
+        test every caller gets its own copy of the cached value
+        '''
+        value = self._cache.get('registry', lambda etag: (dict(version=1, tags=[]), None))
+        value['tags'].append('edited')
+        self.assertEqual(self._cache.get('registry', lambda etag: None), dict(version=1, tags=[]))
+
+class ClientMetadataTest(unittest.TestCase):
+    '''
+    Python Client metadata cache Test Class
+    '''
+    @patch("requests.sessions.Session.request")
+    def test_registry_revalidation(self, mock_request):
+        '''
+        test registry lookups are cached, revalidated with If-None-Match and dropped on register
+        '''
+        registry = mock.Mock(status_code=200, headers={'Content-Type': 'application/json', 'ETag': 'W/"1"'}, content=json.dumps(dict(version=1)))
+        mock_request.return_value = registry
+        client = Client(metadata_ttl=0, metadata_stale_ttl=0)
+        self.assertEqual(client.get_registered_experiment("C123"), dict(version=1))
+        self.assertNotIn('If-None-Match', mock_request.call_args.kwargs["headers"])
+
+        mock_request.return_value = mock.Mock(status_code=304, headers={})
+        self.assertEqual(client.get_registered_experiment("C123"), dict(version=1))
+        self.assertEqual(mock_request.call_args.kwargs["headers"]["If-None-Match"], 'W/"1"')
+
+        mock_request.return_value = mock.Mock(status_code=201, headers={'Content-Type': 'application/json'}, content=json.dumps({}))
+        client.register_experiment("C123", 2)
+        mock_request.return_value = registry
+        client.get_registered_experiment("C123")
+        self.assertNotIn('If-None-Match', mock_request.call_args.kwargs["headers"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+from ..ntcore.client import Client
+from ..ntcore.libs.model_cache import ModelCache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import unittest, hashlib, os, tempfile, threading
+
+MODELS = {str(version): os.urandom(4096) for version in range(1, 4)}
+MODELS['4'] = MODELS['1']
+
+class StandInHandler(BaseHTTPRequestHandler):
+    '''
+    Stand-in for the NTCore model download API, answering 304 to a matching If-None-Match like res.download.
+    '''
+    def do_GET(self):
+        version = self.path.rsplit('/', 1)[1]
+        body = MODELS[version]
+        etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+        if self.headers.get('If-None-Match') == etag:
+            self.server.requests.append((version, 304))
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.server.requests.append((version, 200))
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ModelCacheTest(unittest.TestCase):
+    '''
+    Python model cache Test Class, against a local stand-in server
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls._server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls._server.requests = []
+        cls._url = 'http://127.0.0.1:{}'.format(cls._server.server_address[1])
+        threading.Thread(target=cls._server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._server.shutdown()
+        cls._server.server_close()
+
+    def setUp(self):
+        self._server.requests.clear()
+        self._dir = tempfile.TemporaryDirectory()
+        self._cache_dir = os.path.join(self._dir.name, 'cache')
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def download(self, client, version, name='model'):
+        path = os.path.join(self._dir.name, name)
+        digest = client.download_model(path, 'C123', version)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), MODELS[str(version)])
+        return digest
+
+    def test_conditional_download(self):
+        '''
+        test a cached model is revalidated with a 304 and placed without downloading it again
+        '''
+        client = Client(server=self._url, model_cache_dir=self._cache_dir)
+        first = self.download(client, 1, 'first')
+        second = self.download(Client(server=self._url, model_cache_dir=self._cache_dir), 1, 'second')
+        self.assertEqual(first, second)
+        self.assertEqual(self._server.requests, [('1', 200), ('1', 304)])
+        self.assertEqual(os.stat(os.path.join(self._dir.name, 'first')).st_ino, os.stat(os.path.join(self._dir.name, 'second')).st_ino)
+
+    def test_same_content(self):
+        '''
+        test versions with the same content are stored once
+        '''
+        client = Client(server=self._url, model_cache_dir=self._cache_dir)
+        self.download(client, 1)
+        self.download(client, 4)
+        self.assertEqual(ModelCache(self._cache_dir).size(), len(MODELS['1']))
+
+    def test_eviction(self):
+        '''
+        test the least recently used models are evicted beyond the budget
+        '''
+        client = Client(server=self._url, model_cache_dir=self._cache_dir, model_cache_max_bytes=2 * 4096)
+        self.download(client, 1)
+        self.download(client, 2)
+        self.download(client, 1)
+        os.utime(os.path.join(self._cache_dir, 'objects', hashlib.sha256(MODELS['2']).hexdigest()), (0, 0))
+        self.download(client, 3)
+        self.assertEqual(ModelCache(self._cache_dir).size(), 2 * 4096)
+
+        self._server.requests.clear()
+        self.download(client, 1)
+        self.download(client, 2)
+        self.assertEqual(self._server.requests, [('1', 304), ('2', 200)])
+
+    def test_digest_mismatch(self):
+        '''
+        test a cached model not matching the expected digest is downloaded again
+        '''
+        client = Client(server=self._url, model_cache_dir=self._cache_dir)
+        self.download(client, 1)
+        self.assertRaises(Exception, client.download_model, os.path.join(self._dir.name, 'model'), 'C123', 1, digest='0' * 64)
+        self.assertEqual(self._server.requests, [('1', 200), ('1', 200)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+from ..ntcore.libs.model_serializer import SklearnModelSerializer, TorchModelSerializer, OnnxModelSerializer, \
+    detect_framework, get_model_serializer, register_model_serializer, _SERIALIZERS, _BASE_CLASSES
+from ..ntcore.models.framework import Framework
+from abc import ABC
+from unittest.mock import patch
+import unittest, builtins, functools, sys, types
+try:
+    import torch
+except ImportError:
+    torch = None
+
+def define(module, name, *bases, **attributes):
+    '''
+    Returns a class pretending to be defined in the given module.
+    '''
+    return type(name, bases, dict(attributes, __module__=module))
+
+class ModelSerializerTest(unittest.TestCase):
+    '''
+    Python model serializer registry Test Class
+    '''
+    def setUp(self):
+        self._import = builtins.__import__
+        self._serializers, self._base_classes = dict(_SERIALIZERS), list(_BASE_CLASSES)
+
+    def tearDown(self):
+        _SERIALIZERS.clear()
+        _SERIALIZERS.update(self._serializers)
+        _BASE_CLASSES[:] = self._base_classes
+
+    def guarded_import(self, name, *args, **kwargs):
+        if name.split('.')[0] in ('sklearn', 'tensorflow', 'keras', 'torch'):
+            raise AssertionError('{} should not be imported'.format(name))
+        return self._import(name, *args, **kwargs)
+
+    def test_detect_by_mro(self):
+        '''
+        test the framework is detected from the model's MRO without importing any framework
+        '''
+        estimator = define('sklearn.base', 'BaseEstimator')
+        pipeline = define('sklearn.pipeline', 'Pipeline', estimator)
+        module = define('torch.nn.modules.module', 'Module')
+        keras_model = define('keras.src.models.model', 'Model')
+        with patch('builtins.__import__', self.guarded_import):
+            self.assertEqual(detect_framework(pipeline()), Framework.sklearn)
+            self.assertEqual(detect_framework(define('__main__', 'Net', module)()), Framework.pytorch)
+            self.assertEqual(detect_framework(define('__main__', 'Classifier', keras_model)()), Framework.tensorflow)
+            self.assertEqual(detect_framework(object()), Framework.unknown)
+            self.assertIsInstance(get_model_serializer(pipeline(), Framework.unknown), SklearnModelSerializer)
+
+    def test_detect_imported_virtual_subclass(self):
+        '''
+        test virtual subclasses are detected against the base classes of imported modules only
+        '''
+        base = define('torch.nn.modules.module', 'Module', ABC)
+        virtual = define('__main__', 'Scripted')
+        base.register(virtual)
+        self.assertEqual(detect_framework(virtual()), Framework.unknown)
+        with patch.dict(sys.modules, {'torch.nn': types.SimpleNamespace(Module=base)}):
+            self.assertEqual(detect_framework(virtual()), Framework.pytorch)
+
+    def test_paths_and_fallback(self):
+        '''
+        test paths use the given framework, as do models of no registered framework
+        '''
+        self.assertIsInstance(get_model_serializer('model.pt', Framework.pytorch), TorchModelSerializer)
+        self.assertIsInstance(get_model_serializer(object(), Framework.sklearn), SklearnModelSerializer)
+        with self.assertRaises(Exception):
+            get_model_serializer(object(), Framework.unknown)
+
+    def test_register(self):
+        '''
+        test a registered serializer replaces the default one of its framework
+        '''
+        class CustomSerializer(SklearnModelSerializer):
+            pass
+        register_model_serializer(Framework.sklearn, CustomSerializer, ['mylib.models.Estimator'])
+        estimator = define('mylib.models', 'Estimator')
+        self.assertIsInstance(get_model_serializer(estimator(), Framework.unknown), CustomSerializer)
+        self.assertEqual(detect_framework(define('sklearn.base', 'BaseEstimator')()), Framework.unknown)
+
+    def test_onnx(self):
+        '''
+        test ONNX models are saved as is, while exporting other models requires a sample input
+        '''
+        model_proto = define('onnx.onnx_ml_pb2', 'ModelProto', SerializeToString=lambda self: b'\x08\x07')
+        with patch('builtins.__import__', self.guarded_import):
+            serializer = get_model_serializer(model_proto(), Framework.unknown)
+            self.assertIsInstance(serializer, OnnxModelSerializer)
+            self.assertEqual(serializer.serialize(model_proto()), b'\x08\x07')
+            self.assertEqual(serializer.framework(), Framework.onnx)
+            with self.assertRaises(ValueError):
+                serializer.serialize(define('torch.nn.modules.module', 'Module')())
+        self.assertIsInstance(get_model_serializer('model.onnx', Framework.onnx), OnnxModelSerializer)
+        with self.assertRaises(ValueError):
+            OnnxModelSerializer().serialize_stream('model.pt')
+
+    def test_explicit_onnx(self):
+        '''
+        test Framework.onnx selects the ONNX serializer for convertible models only
+        '''
+        module = define('torch.nn.modules.module', 'Module')
+        estimator = define('sklearn.base', 'BaseEstimator')
+        keras_model = define('keras.src.models.model', 'Model')
+        with patch('builtins.__import__', self.guarded_import):
+            self.assertIsInstance(get_model_serializer(module(), Framework.onnx), OnnxModelSerializer)
+            self.assertIsInstance(get_model_serializer(estimator(), Framework.onnx), OnnxModelSerializer)
+            self.assertIsInstance(get_model_serializer(module(), Framework.pytorch), TorchModelSerializer)
+            self.assertIsInstance(get_model_serializer(module(), Framework.unknown), TorchModelSerializer)
+            self.assertNotIsInstance(get_model_serializer(keras_model(), Framework.onnx), OnnxModelSerializer)
+
+    @unittest.skipIf(torch is None, "torch is not installed")
+    def test_explicit_onnx_torch(self):
+        '''
+        test a torch model saved as Framework.onnx produces an ONNX artifact
+        '''
+        model = torch.nn.Sequential(torch.nn.Linear(4, 2)).eval()
+        register_model_serializer(Framework.onnx, functools.partial(OnnxModelSerializer, sample_input=torch.zeros(1, 4)))
+        serializer = get_model_serializer(model, Framework.onnx)
+        try:
+            self.assertEqual(serializer.framework(), Framework.onnx)
+            self.assertEqual(serializer.serialize(model)[:1], b'\x08')
+        finally:
+            serializer.close()
+
+if __name__ == '__main__':
+    unittest.main()
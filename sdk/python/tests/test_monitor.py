@@ -1,11 +1,16 @@
 from ..ntcore.monitor.monitor import Monitor
+from ..ntcore.monitor.metric_buffer import MetricBuffer
+from ..ntcore.monitor.spool import Spool
+from ..ntcore.monitor.metric_aggregator import Histogram, MetricAggregator
+from ..ntcore.monitor.service_metrics import service_metrics
 from ..ntcore.exceptions.exceptions import NTCoreAPIException
 from unittest import mock
 from unittest.mock import patch
 from requests.exceptions import ConnectionError
-import unittest, json
+from concurrent.futures import Future
+import unittest, json, os, random, tempfile, threading, time
 
-monitor = Monitor()
+monitor = Monitor("workspace_id", max_retries=0)
 
 class MonitorModuleTest(unittest.TestCase):
     '''
@@ -19,61 +24,341 @@ class MonitorModuleTest(unittest.TestCase):
         workspace_id = "workspace_id"
         name = "test_metrics"
         value = 0.0018
-        mock_response_content = json.dumps(dict(workspaceId=workspace_id, name=name, value=value))
-        mock_response = mock.Mock(
-            status_code=201, 
-            headers={'Content-Type': 'application/json'},
-            content=mock_response_content)
+        mock_response = mock.Mock(status_code=201, headers={'Content-Type': 'application/json'})
         mock_post.return_value = mock_response
-        res = monitor.add_metric(workspace_id, name, value)
-        
-        assert isinstance(res, dict)
-        assert res["workspaceId"] == workspace_id
-        assert res["name"] == name
-        assert res["value"] == value
+        res = monitor.add_metric(name, value).result()
+
+        assert res is mock_response
+        _, kwargs = mock_post.call_args
+        assert kwargs["url"].endswith("monitoring/metrics")
+        assert kwargs["json"] == dict(workspaceId=workspace_id, name=name, value=value)
 
     @patch("requests.sessions.Session.request")
     def test_add_metric_error(self, mock_post):
         '''
         test post metrics with connection errors
-        expects NTCoreAPIException
+        expects ConnectionError from the future
         '''
         mock_post.side_effect = ConnectionError("Connection error")
-        try:
-            monitor.add_metric("workspace_id", "test_metrics", 0.0018)
-        except Exception as e:
-            assert type(e) == NTCoreAPIException
+        with self.assertRaises(ConnectionError):
+            monitor.add_metric("test_metrics", 0.0018).result()
 
     @patch("requests.sessions.Session.request")
     def test_upload_ground_truth(self, mock_post):
         '''
-        test post evaluate_model method
+        test post upload_ground_truth method
         '''
         workspace_id = "workspace_id"
-        input_data = json.dumps(dict(x=1))
+        input_data = dict(x=1)
         ground_truth = "ground_truth"
-        
-        mock_response_content = json.dumps(dict(workspaceId=workspace_id, input_data=input_data, ground_truth=ground_truth))
-        mock_response = mock.Mock(
-            status_code=201, 
-            headers={'Content-Type': 'application/json'},
-            content=mock_response_content)
-        mock_post.return_value = mock_response
-        res = monitor.evaluate_model(workspace_id, input_data, ground_truth)
-        
-        assert isinstance(res, dict)
-        assert res["workspaceId"] == workspace_id
-        assert res["input_data"] == input_data
-        assert res["ground_truth"] == ground_truth
+        mock_post.return_value = mock.Mock(status_code=201, headers={'Content-Type': 'application/json'})
+        monitor.upload_ground_truth(input_data, ground_truth).result()
+
+        _, kwargs = mock_post.call_args
+        assert kwargs["url"].endswith("monitoring/performances")
+        assert kwargs["json"] == dict(workspaceId=workspace_id, inputData=json.dumps(input_data), groundTruth=ground_truth)
 
     @patch("requests.sessions.Session.request")
-    def test_upload_ground_truth_error(self, mock_post):
+    def test_buffered_add_metric(self, mock_post):
         '''
-        test post performances with wrong inputs
-        the error will be expected
+        test buffered add metrics posts the metric lines through the metric route once the batch size is reached
         '''
-        mock_post.side_effect = ConnectionError("Connection error")
+        mock_post.return_value = mock.Mock(status_code=204, headers={})
+        buffered_monitor = Monitor("workspace_id", buffered=True, batch_size=3, flush_interval=60)
+        try:
+            assert buffered_monitor.add_metric("Success", 1.0) is None
+            buffered_monitor.add_metric("Latency", 12)
+            mock_post.assert_not_called()
+            buffered_monitor.add_metric("Success", 1.0)
+            buffered_monitor.close()
+
+            assert mock_post.call_count == 3
+            for _, kwargs in mock_post.call_args_list:
+                assert kwargs["url"].endswith("/dsp/api/v1/monitoring/metrics")
+            assert [kwargs["json"] for _, kwargs in mock_post.call_args_list] == [
+                dict(workspaceId="workspace_id", name="Success", value=1.0),
+                dict(workspaceId="workspace_id", name="Latency", value=12),
+                dict(workspaceId="workspace_id", name="Success", value=1.0)]
+        finally:
+            buffered_monitor.close()
+
+    @patch("requests.sessions.Session.request")
+    def test_buffered_close(self, mock_post):
+        '''
+        test close sends the remaining metrics
+        '''
+        mock_post.return_value = mock.Mock(status_code=204, headers={})
+        buffered_monitor = Monitor("workspace_id", buffered=True, batch_size=100, flush_interval=60)
+        buffered_monitor.add_metric("Cpu", 12.5)
+        buffered_monitor.close()
+
+        mock_post.assert_called_once()
+        _, kwargs = mock_post.call_args
+        assert kwargs["url"].endswith("/dsp/api/v1/monitoring/metrics")
+        assert kwargs["json"] == dict(workspaceId="workspace_id", name="Cpu", value=12.5)
+        with self.assertRaises(ValueError):
+            buffered_monitor.add_metric("Cpu", 12.5)
+
+
+class MetricBufferTest(unittest.TestCase):
+    '''
+    Python MetricBuffer Test Class
+    '''
+    def test_flush_interval(self):
+        '''
+        test the buffered points are flushed once the oldest is flush_interval seconds old
+        '''
+        batches = []
+        buffer = MetricBuffer(batches.append, batch_size=100, flush_interval=0.05)
+        try:
+            buffer.add("Latency", 1, timestamp=1)
+            buffer.add("Latency", 2, timestamp=2)
+            deadline = time.monotonic() + 5
+            while not batches and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert batches == [[dict(name="Latency", value=1, timestamp=1), dict(name="Latency", value=2, timestamp=2)]]
+            assert len(buffer) == 0
+        finally:
+            buffer.close()
+
+    def test_send_error(self):
+        '''
+        test a failing batch does not raise on the caller's thread
+        '''
+        def send(batch):
+            raise NTCoreAPIException({'errors': [{'code': 'INTERNAL_ERROR', 'message': 'down'}]})
+        buffer = MetricBuffer(send, batch_size=1)
+        buffer.add("Error", 1.0)
+        buffer.close()
+
+    def test_close_waits_for_flush_thread(self):
+        '''
+        test close waits for the batch the flush thread is sending
+        '''
+        sending, release = threading.Event(), threading.Event()
+        future = Future()
+        def send(batch):
+            sending.set()
+            release.wait(5)
+            threading.Timer(0.05, future.set_result, [None]).start()
+            return future
+        buffer = MetricBuffer(send, batch_size=100, flush_interval=0.01)
+        buffer.add("Latency", 1)
+        assert sending.wait(5)
+        threading.Timer(0.05, release.set).start()
+        buffer.close()
+        assert future.done()
+
+
+class SpoolTest(unittest.TestCase):
+    '''
+    Python Spool Test Class
+    '''
+    def setUp(self):
+        self._root = tempfile.TemporaryDirectory()
+        self.root = self._root.name
+
+    def tearDown(self):
+        self._root.cleanup()
+
+    @patch("requests.sessions.Session.request")
+    def test_spooled_monitor(self, mock_post):
+        '''
+        test metrics and logs are shipped through their own routes, without waiting on the caller's thread
+        '''
+        mock_post.return_value = mock.Mock(status_code=204, headers={})
+        spooled_monitor = Monitor("workspace_id", spool_dir=self.root, spool_interval=60)
+        try:
+            assert spooled_monitor.add_metric("Success", 1.0) is None
+            assert spooled_monitor.log("started") is None
+            spooled_monitor.add_metric("Latency", 12)
+            mock_post.assert_not_called()
+            spooled_monitor.flush()
+
+            urls = [kwargs["url"] for _, kwargs in mock_post.call_args_list]
+            assert [url.rsplit("/", 2)[-2:] for url in urls] == [["monitoring", "metrics"], ["workspace_id", "events"], ["monitoring", "metrics"]]
+            metrics = [mock_post.call_args_list[i].kwargs["json"] for i in (0, 2)]
+            assert [(m["name"], m["value"]) for m in metrics] == [("Success", 1.0), ("Latency", 12)]
+        finally:
+            spooled_monitor.close()
+        assert os.listdir(self.root) == []
+
+    @patch("requests.sessions.Session.request")
+    def test_spooled_monitor_retry(self, mock_post):
+        '''
+        test a failed post ships its whole batch again, the records already accepted included
+        '''
+        answers = [503]
+        def request(*args, **kwargs):
+            status_code = answers.pop() if kwargs["url"].endswith("events") and answers else 204
+            return mock.Mock(status_code=status_code, headers={})
+        mock_post.side_effect = request
+        spooled_monitor = Monitor("workspace_id", spool_dir=self.root, spool_interval=0.05, max_retries=0)
+        try:
+            spooled_monitor.add_metric("Success", 1.0)
+            spooled_monitor.log("started")
+            spooled_monitor.add_metric("Latency", 12)
+            spooled_monitor.flush()
+
+            urls = [kwargs["url"].rsplit("/", 1)[-1] for _, kwargs in mock_post.call_args_list]
+            assert urls == ["metrics", "events", "metrics"] * 2
+            metrics = [kwargs["json"]["name"] for _, kwargs in mock_post.call_args_list if kwargs["url"].endswith("metrics")]
+            assert metrics == ["Success", "Latency", "Success", "Latency"]
+        finally:
+            spooled_monitor.close()
+
+    def test_pending_directory(self):
+        '''
+        test a spool directory is created locked and the hidden directories of starting spools are not adopted
+        '''
+        pending = os.path.join(self.root, '.123-starting')
+        os.makedirs(pending)
+        spool = Spool(self.root, lambda records: None, ship_interval=0.05)
         try:
-            monitor.evaluate_model("workspace_id", "{}", "truth")
-        except Exception as e:
-            assert type(e) == NTCoreAPIException
\ No newline at end of file
+            assert spool.flush(timeout=5)
+            assert os.path.isdir(pending) and os.path.basename(spool._dir) in os.listdir(self.root)
+        finally:
+            spool.close()
+
+    def test_survives_restart(self):
+        '''
+        test the records a spool could not ship are shipped by the next spool on the same root
+        '''
+        def fail(records):
+            raise ConnectionError("Connection error")
+        spool = Spool(self.root, fail, ship_interval=60)
+        for i in range(3):
+            spool.append(dict(i=i))
+        assert not spool.flush(timeout=0.2)
+        spool.close(timeout=0.2)
+
+        shipped = []
+        spool = Spool(self.root, shipped.extend, ship_interval=0.05)
+        try:
+            deadline = time.monotonic() + 5
+            while len(shipped) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert shipped == [dict(i=0), dict(i=1), dict(i=2)]
+        finally:
+            spool.close()
+        assert os.listdir(self.root) == []
+
+    def test_backoff(self):
+        '''
+        test failed shipments are retried with a growing backoff and resume from their checkpoint
+        '''
+        attempts = []
+        def ship(records):
+            attempts.append((time.monotonic(), records))
+            if len(attempts) < 3:
+                raise ConnectionError("Connection error")
+        spool = Spool(self.root, ship, batch_size=2, ship_interval=0.05, max_backoff=1)
+        try:
+            for i in range(3):
+                spool.append(dict(i=i))
+            assert spool.flush(timeout=5)
+        finally:
+            spool.close()
+        assert [records for _, records in attempts] == [[dict(i=0), dict(i=1)]] * 3 + [[dict(i=2)]]
+        assert attempts[2][0] - attempts[1][0] >= 0.05
+
+    def test_rotation_budget(self):
+        '''
+        test segments rotate at segment_bytes and the oldest are dropped beyond max_bytes
+        '''
+        def fail(records):
+            raise ConnectionError("Connection error")
+        spool = Spool(self.root, fail, ship_interval=60, segment_bytes=100, max_bytes=250)
+        try:
+            for i in range(20):
+                spool.append(dict(value="x" * 40, i=i))
+            assert 0 < spool.size() <= 250
+        finally:
+            spool.close(timeout=0)
+        with open(sorted(os.path.join(dirpath, name) for dirpath, _, names in os.walk(self.root) for name in names if name.endswith(".jsonl"))[-1]) as f:
+            assert json.loads(f.readline())["i"] > 10
+
+
+class HistogramTest(unittest.TestCase):
+    '''
+    Python Histogram Test Class
+    '''
+    def test_quantiles(self):
+        '''
+        test the quantiles are within the relative accuracy of the exact ones
+        '''
+        values = [random.lognormvariate(3, 1) for _ in range(10000)]
+        histogram = Histogram(relative_accuracy=0.01)
+        for value in values:
+            histogram.add(value)
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert abs(histogram.quantile(q) - exact) <= 0.01 * exact
+        assert histogram.count == len(values)
+        assert histogram.min == values[0] and histogram.max == values[-1]
+
+    def test_merge(self):
+        '''
+        test merging two histograms equals adding all the values to one
+        '''
+        left, right, both = Histogram(), Histogram(), Histogram()
+        for value in range(100):
+            (left if value % 2 else right).add(value)
+            both.add(value)
+        left.merge(right)
+        assert left.summary() == both.summary()
+        with self.assertRaises(ValueError):
+            left.merge(Histogram(relative_accuracy=0.05))
+
+    def test_empty(self):
+        '''
+        test an empty histogram only reports its count and sum
+        '''
+        assert Histogram().quantile(0.5) is None
+        assert Histogram().summary() == dict(Count=0, Sum=0.0)
+
+
+class MetricAggregatorTest(unittest.TestCase):
+    '''
+    Python MetricAggregator Test Class
+    '''
+    def test_service_metrics(self):
+        '''
+        test aggregated service metrics emit totals and latency statistics once per interval
+        '''
+        monitor = mock.Mock()
+        aggregators = []
+        def create_aggregator(*args):
+            aggregators.append(MetricAggregator(*args))
+            return aggregators[-1]
+        with patch.dict(service_metrics.__globals__, MetricAggregator=create_aggregator):
+            handler = service_metrics(monitor, aggregate=True, interval=60)(lambda x: 1 / x)
+        for x in (1, 2, 0):
+            handler(x)
+        monitor.add_metric.assert_not_called()
+
+        aggregators[0].close()
+        emitted = dict(call.args for call in monitor.add_metric.call_args_list)
+        assert emitted["Success"] == 2 and emitted["Error"] == 1
+        assert emitted["LatencyCount"] == 3
+        assert set(emitted) >= {"LatencySum", "LatencyMin", "LatencyMax", "LatencyP50", "LatencyP90", "LatencyP99"}
+        monitor.flush.assert_called_once()
+
+    def test_interval(self):
+        '''
+        test the aggregated metrics are emitted every interval
+        '''
+        monitor = mock.Mock()
+        aggregator = MetricAggregator(monitor, interval=0.05)
+        try:
+            aggregator.record("Latency", 10)
+            deadline = time.monotonic() + 5
+            while not monitor.add_metric.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+            monitor.add_metric.assert_any_call("LatencyP50", 10)
+        finally:
+            aggregator.close()
+
+if __name__ == '__main__':
+    unittest.main()
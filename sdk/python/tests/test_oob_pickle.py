@@ -0,0 +1,83 @@
+from ..ntcore.libs.oob_pickle import dump_stream, load, is_oob_pickle, BUFFER_ALIGNMENT
+from ..ntcore.libs.model_serializer import SklearnModelSerializer
+import unittest, os, pickle, tempfile
+import numpy as np
+
+class Ensemble:
+    '''
+    Stand-in for a fitted estimator holding large arrays.
+    '''
+    def __init__(self):
+        self.coef_ = np.arange(100000, dtype=np.float64).reshape(1000, 100)
+        self.trees_ = [np.full(5000 + i, i, dtype=np.int32) for i in range(3)]
+        self.classes_ = np.array(['a', 'b'])
+        self.params = dict(n_estimators=3)
+
+class OutOfBandPickleTest(unittest.TestCase):
+    '''
+    Python out-of-band pickle Test Class
+    '''
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, 'model.pkl')
+        self.model = Ensemble()
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def dump(self, chunks):
+        with open(self.path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    def assertModel(self, loaded):
+        np.testing.assert_array_equal(loaded.coef_, self.model.coef_)
+        for tree, expected in zip(loaded.trees_, self.model.trees_):
+            np.testing.assert_array_equal(tree, expected)
+        np.testing.assert_array_equal(loaded.classes_, self.model.classes_)
+        self.assertEqual(loaded.params, self.model.params)
+
+    def test_zero_copy_stream(self):
+        '''
+        test the array data is yielded as views of the arrays rather than copies
+        '''
+        chunks = list(dump_stream(self.model))
+        views = [chunk for chunk in chunks if isinstance(chunk, memoryview)]
+        assert any(np.shares_memory(np.frombuffer(view, dtype=np.uint8), self.model.coef_) for view in views)
+        assert len(chunks[0]) < 2048
+
+    def test_memory_mapped_load(self):
+        '''
+        test the arrays are aligned views of a copy-on-write mapping of the file
+        '''
+        self.dump(dump_stream(self.model))
+        assert is_oob_pickle(self.path)
+        loaded = load(self.path)
+        self.assertModel(loaded)
+        assert not loaded.coef_.flags.owndata
+        assert loaded.coef_.ctypes.data % BUFFER_ALIGNMENT == 0
+        loaded.coef_[0, 0] = -1
+        self.assertModel(load(self.path, mmap_mode=False))
+
+    def test_plain_pickle(self):
+        '''
+        test plain pickles still load
+        '''
+        with open(self.path, 'wb') as f:
+            pickle.dump(self.model, f)
+        assert not is_oob_pickle(self.path)
+        self.assertModel(load(self.path))
+
+    def test_serializer(self):
+        '''
+        test the out-of-band serializer output loads back
+        '''
+        serializer = SklearnModelSerializer(out_of_band=True)
+        try:
+            self.dump([serializer.serialize(self.model)])
+        finally:
+            serializer.close()
+        self.assertModel(load(self.path))
+
+if __name__ == '__main__':
+    unittest.main()
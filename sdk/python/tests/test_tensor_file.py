@@ -0,0 +1,82 @@
+from ..ntcore.libs import tensor_file
+from ..ntcore.libs.model_serializer import TorchModelSerializer
+import unittest, os, tempfile
+try:
+    import torch
+except ImportError:
+    torch = None
+
+if torch is not None:
+    class TiedModel(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.embedding = torch.nn.Embedding(10, 8)
+            self.output = torch.nn.Linear(8, 10, bias=False)
+            self.output.weight = self.embedding.weight
+            self.norm = torch.nn.BatchNorm1d(8)
+
+        def forward(self, x):
+            return self.output(self.norm(self.embedding(x)))
+
+@unittest.skipIf(torch is None, "torch is not installed")
+class TensorFileTest(unittest.TestCase):
+    '''
+    Python memory-mappable tensor file Test Class
+    '''
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'model.pt')
+        self.model = TiedModel().eval()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def dump(self, **kwargs):
+        with open(self.path, 'wb') as f:
+            for chunk in tensor_file.dump_stream(self.model, **kwargs):
+                f.write(chunk)
+
+    def test_load_module(self):
+        '''
+        test the module is loaded with its tensors mapped, aligned and tied as in the original
+        '''
+        self.dump()
+        self.assertTrue(tensor_file.is_tensor_file(self.path))
+        model = tensor_file.load_module(self.path)
+        self.assertIs(model.output.weight, model.embedding.weight)
+        self.assertIsInstance(model.embedding.weight, torch.nn.Parameter)
+        for name, tensor in self.model.state_dict().items():
+            self.assertTrue(torch.equal(model.state_dict()[name], tensor), name)
+        self.assertEqual(model.embedding.weight.data_ptr() % tensor_file.TENSOR_ALIGNMENT, 0)
+        x = torch.arange(10)
+        with torch.no_grad():
+            self.assertTrue(torch.equal(model(x), self.model(x)))
+
+    def test_load_state_dict(self):
+        '''
+        test the tensors are loaded without the module, which may be left out of the file
+        '''
+        self.dump(include_module=False)
+        state_dict = tensor_file.load_state_dict(self.path)
+        self.assertEqual(set(state_dict), set(self.model.state_dict()))
+        model = TiedModel()
+        model.load_state_dict(state_dict)
+        self.assertTrue(torch.equal(model.output.weight, self.model.output.weight))
+        with self.assertRaises(ValueError):
+            tensor_file.load_module(self.path)
+
+    def test_serializer(self):
+        '''
+        test the serializer streams a tensor file when mapped
+        '''
+        serializer = TorchModelSerializer(mapped=True)
+        source = serializer.serialize_stream(self.model)
+        assert not hasattr(source, 'read')
+        with open(self.path, 'wb') as f:
+            for chunk in source:
+                f.write(chunk)
+        serializer.close()
+        self.assertTrue(tensor_file.is_tensor_file(self.path))
+
+if __name__ == '__main__':
+    unittest.main()
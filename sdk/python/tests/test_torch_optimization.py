@@ -0,0 +1,54 @@
+from ..ntcore.libs.torch_optimization import optimize_torch, output_error
+from ..ntcore.libs.model_serializer import TorchModelSerializer
+import unittest
+try:
+    import torch
+except ImportError:
+    torch = None
+
+@unittest.skipIf(torch is None, "torch is not installed")
+class TorchOptimizationTest(unittest.TestCase):
+    '''
+    Python archive-time torch optimization Test Class
+    '''
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = torch.nn.Sequential(torch.nn.Linear(64, 128), torch.nn.ReLU(), torch.nn.Linear(128, 10))
+        self.sample = torch.randn(8, 64)
+
+    def test_stages(self):
+        '''
+        test the stages are applied within the tolerance and the model's mode is restored
+        '''
+        scripted, report = optimize_torch(self.model, quantize=True, freeze=True, sample_input=self.sample, tolerance=0.1)
+        self.assertEqual(report['stages'], ['quantize', 'freeze'])
+        self.assertLessEqual(report['max_error'], 0.1)
+        self.assertTrue(self.model.training)
+        with torch.no_grad():
+            self.assertLessEqual(output_error(self.model.eval()(self.sample), scripted(self.sample)), 0.1)
+
+    def test_rejected(self):
+        '''
+        test a stage exceeding the tolerance is rejected and quantizing requires a sample input
+        '''
+        _, report = optimize_torch(self.model, quantize=True, sample_input=self.sample, tolerance=0)
+        self.assertEqual(report['rejected'], ['quantize'])
+        with self.assertRaises(ValueError):
+            optimize_torch(self.model, quantize=True)
+        self.assertEqual(output_error(torch.ones(2), (torch.ones(2), torch.ones(2))), float('inf'))
+
+    def test_serializer_metadata(self):
+        '''
+        test the serializer records the optimization results
+        '''
+        serializer = TorchModelSerializer(quantize=True, sample_input=self.sample, tolerance=0.1)
+        serializer.serialize(self.model)
+        metadata = serializer.metadata()
+        serializer.close()
+        self.assertEqual(metadata['archive_stages'], 'quantize')
+        self.assertLess(metadata['archive_bytes'], metadata['archive_source_weight_bytes'])
+        with self.assertRaises(ValueError):
+            TorchModelSerializer(mapped=True, freeze=True)
+
+if __name__ == '__main__':
+    unittest.main()
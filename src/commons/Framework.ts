@@ -3,7 +3,7 @@ import { ContainerGroupType } from "../providers/container/ContainerGroupProvide
 /**
  * Frameworks.
  */
-export type Framework = "sklearn" | "tensorflow" | "pytorch"
+export type Framework = "sklearn" | "tensorflow" | "pytorch" | "onnx"
 /**
  * Framework to container group type mapping.
  */
@@ -20,4 +20,8 @@ export const FrameworkToContainerGroupTypeMapping = {
      * Pytorch.
      */
     ["pytorch" as Framework] : ContainerGroupType.PYTORCH,
+    /**
+     * ONNX, served with ONNX Runtime by the pytorch serving image.
+     */
+    ["onnx" as Framework] : ContainerGroupType.PYTORCH,
 }
\ No newline at end of file
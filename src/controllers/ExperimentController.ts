@@ -6,10 +6,16 @@ import { Framework } from "../commons/Framework";
 import { Runtime } from "../commons/Runtime";
 import { ErrorHandler } from '../libs/utils/ErrorHandler';
 import { RequestValidator } from '../libs/utils/RequestValidator';
+import { Page, Pagination } from '../libs/utils/Pagination';
 import { appConfig } from '../libs/config/AppConfigProvider';
 
 const AUTH_USER_HEADER_NAME = "X-NTCore-Auth-User";
 
+/**
+ * Returns whether a chunk digest is a sha256 hex digest, digests are used in storage paths.
+ */
+const isChunkDigest = (digest: any): boolean => typeof digest === 'string' && /^[0-9a-f]{64}$/.test(digest);
+
 export class ExperimentController 
 {
     public constructor()
@@ -21,6 +27,10 @@ export class ExperimentController
         this.registerExperimentV1 = this.registerExperimentV1.bind(this);
         this.getRegistryV1 = this.getRegistryV1.bind(this);
         this.deregisterExperimentV1 = this.deregisterExperimentV1.bind(this);
+        this.createUploadV1 = this.createUploadV1.bind(this);
+        this.uploadPartV1 = this.uploadPartV1.bind(this);
+        this.missingChunksV1 = this.missingChunksV1.bind(this);
+        this.uploadChunkV1 = this.uploadChunkV1.bind(this);
     }
 
     /**
@@ -32,14 +42,24 @@ export class ExperimentController
      *      -X POST http://localhost:8180/dsp/api/v1/workspace/C123/experiment
      */
     public async createExperimentV1(
-        req: Request<{workspaceId: string}, {}, {description: string, runtime: Runtime, framework: Framework, parameters: string, metrics: string}, {}>, 
+        req: Request<{workspaceId: string}, {}, {description: string, runtime: Runtime, framework: Framework, parameters: string, metrics: string, uploadId?: string, parts?: string, chunks?: string}, {}>, 
         res: Response<Experiment>) 
     {
         const { workspaceId } = req.params;
-        const { description, runtime, framework, parameters, metrics } = req.body;
+        const { description, runtime, framework, parameters, metrics, uploadId, parts, chunks } = req.body;
         try {
             RequestValidator.validateRequest(workspaceId);
             await RequestValidator.throwOnException(() => workspaceProvider.read(workspaceId));
+            if (uploadId) {
+                // The model was uploaded in parts, see createUploadV1.
+                RequestValidator.validateRequest(parts);
+                await storageProvider.completeUpload(workspaceId, uploadId, JSON.parse(parts));
+            } else if (chunks) {
+                // The model was uploaded as content-defined chunks, see missingChunksV1.
+                const digests = JSON.parse(chunks);
+                RequestValidator.validateRequest(Array.isArray(digests) && digests.every(isChunkDigest));
+                await storageProvider.completeChunks(workspaceId, digests);
+            }
             const state = "UNREGISTERED" as ExperimentState;
             const version = await workspaceProvider.incrementVersion(workspaceId);
             const createdBy = req.get(AUTH_USER_HEADER_NAME) ?? appConfig.account.username;
@@ -62,23 +82,121 @@ export class ExperimentController
         }
     }
 
+    /**
+     * Endpoint to start a chunked model upload. The parts are uploaded with uploadPartV1, then
+     * the experiment is created with the upload id and the part etags instead of the model file.
+     * @param req Request
+     * @param res Response
+     * Example usage:
+     * curl -X POST http://localhost:8180/dsp/api/v1/{workspaceId}/uploads
+     */
+    public async createUploadV1(
+        req: Request<{workspaceId: string}, {}, {}, {}>,
+        res: Response<{uploadId: string}>)
+    {
+        const { workspaceId } = req.params;
+        try {
+            RequestValidator.validateRequest(workspaceId);
+            await RequestValidator.throwOnException(() => workspaceProvider.read(workspaceId));
+            const uploadId = await storageProvider.createUpload(workspaceId);
+            res.status(201).send({ uploadId });
+        } catch (err) {
+            ErrorHandler.handleException(err, res);
+        }
+    }
+
+    /**
+     * Endpoint to upload a part of a chunked model upload, the raw part is the request body.
+     * @param req Request
+     * @param res Response
+     * Example usage:
+     * curl -X PUT --data-binary @part1 -H "Content-Type: application/octet-stream" \
+     *      http://localhost:8180/dsp/api/v1/{workspaceId}/uploads/{uploadId}/parts/1
+     */
+    public async uploadPartV1(
+        req: Request<{workspaceId: string, uploadId: string, partNumber: string}, {}, {}, {}>,
+        res: Response<{partNumber: number, etag: string}>)
+    {
+        const { workspaceId, uploadId } = req.params;
+        const partNumber = parseInt(req.params.partNumber);
+        const size = parseInt(req.get('Content-Length'));
+        try {
+            RequestValidator.validateRequest(workspaceId, uploadId, partNumber > 0, size >= 0);
+            const etag = await storageProvider.putPart(workspaceId, uploadId, partNumber, req, size);
+            res.status(200).send({ partNumber, etag });
+        } catch (err) {
+            ErrorHandler.handleException(err, res);
+        }
+    }
+
+    /**
+     * Endpoint to find the content-defined chunks of a model the workspace doesn't store yet. Only
+     * those are uploaded with uploadChunkV1, then the experiment is created with the digests of all
+     * the chunks in order instead of the model file.
+     * @param req Request
+     * @param res Response
+     * Example usage:
+     * curl -d 'digests=["9f86d0..."]' \
+     *      -X POST http://localhost:8180/dsp/api/v1/{workspaceId}/chunks/missing
+     */
+    public async missingChunksV1(
+        req: Request<{workspaceId: string}, {}, {digests: string}, {}>,
+        res: Response<{missing: string[]}>)
+    {
+        const { workspaceId } = req.params;
+        try {
+            RequestValidator.validateRequest(workspaceId, req.body.digests);
+            const digests = JSON.parse(req.body.digests);
+            RequestValidator.validateRequest(Array.isArray(digests) && digests.every(isChunkDigest));
+            await RequestValidator.throwOnException(() => workspaceProvider.read(workspaceId));
+            const missing = await storageProvider.missingChunks(workspaceId, digests);
+            res.status(200).send({ missing });
+        } catch (err) {
+            ErrorHandler.handleException(err, res);
+        }
+    }
+
+    /**
+     * Endpoint to upload a content-defined chunk under its sha256 hex digest, the raw chunk is the request body.
+     * @param req Request
+     * @param res Response
+     * Example usage:
+     * curl -X PUT --data-binary @chunk -H "Content-Type: application/octet-stream" \
+     *      http://localhost:8180/dsp/api/v1/{workspaceId}/chunks/{digest}
+     */
+    public async uploadChunkV1(
+        req: Request<{workspaceId: string, digest: string}, {}, {}, {}>,
+        res: Response<{digest: string}>)
+    {
+        const { workspaceId, digest } = req.params;
+        const size = parseInt(req.get('Content-Length'));
+        try {
+            RequestValidator.validateRequest(workspaceId, isChunkDigest(digest), size >= 0);
+            await storageProvider.putChunk(workspaceId, digest, req, size);
+            res.status(200).send({ digest });
+        } catch (err) {
+            ErrorHandler.handleException(err, res);
+        }
+    }
+
     /**
      * Endpoint to list experiment based on the given workspace id.
      * @param req Request
      * @param res Response
      * Example usage:
      * curl http://localhost:8180/dsp/api/v1/workspace/{workspaceId}/experiments
+     * curl "http://localhost:8180/dsp/api/v1/workspace/{workspaceId}/experiments?limit=100&cursor={next}"
      */
     public async listExperimentsV1(
-        req: Request<{workspaceId: string}, {}, {}, {}>,
-        res: Response<Experiment[]>)
+        req: Request<{workspaceId: string}, {}, {}, {limit?: string, cursor?: string}>,
+        res: Response<Experiment[] | Page<Experiment>>)
     {
         const { workspaceId } = req.params;
         try {
             RequestValidator.validateRequest(workspaceId);
             await RequestValidator.throwOnException(() => workspaceProvider.read(workspaceId));
             const experiments = await experimentProvider.list(workspaceId);
-            res.status(200).send(experiments);
+            res.status(200).send(Pagination.isPaginated(req.query) ? Pagination.paginate(experiments, req.query) : experiments);
         } catch (err) {
             ErrorHandler.handleException(err, res);
         }
@@ -5,6 +5,7 @@ import { appConfig } from '../libs/config/AppConfigProvider';
 import { Workspace } from '../providers/workspace/WorkspaceProvider';
 import { RequestValidator } from '../libs/utils/RequestValidator';
 import { ErrorHandler } from '../libs/utils/ErrorHandler';
+import { Page, Pagination } from '../libs/utils/Pagination';
 import { v4 as uuidv4 } from 'uuid';
 import short = require('short-uuid');
 
@@ -83,14 +84,15 @@ export class WorkspaceController
      * @param res Response
      * Example usage: 
      * curl http://localhost:8180/dsp/api/v1/workspaces
+     * curl "http://localhost:8180/dsp/api/v1/workspaces?limit=100&cursor={next}"
      */
     public async listWorkspacesV1(
-        req: Request<{}, {}, {}, {}>, 
-        res: Response<Workspace[]>) {
+        req: Request<{}, {}, {}, {limit?: string, cursor?: string}>, 
+        res: Response<Workspace[] | Page<Workspace>>) {
         try {
             const userId = req.get(AUTH_USER_HEADER_NAME) ?? appConfig.account.username;
             const workspaces = await workspaceProvider.list(userId);
-            res.status(200).send(workspaces);
+            res.status(200).send(Pagination.isPaginated(req.query) ? Pagination.paginate(workspaces, req.query) : workspaces);
         } catch (err) {
             ErrorHandler.handleException(err, res);
         }
@@ -0,0 +1,43 @@
+import { IllegalArgumentException } from '../../commons/Errors';
+
+const MAX_PAGE_SIZE = 1000;
+
+/**
+ * A page of a collection, next is the cursor of the following page or null on the last page.
+ */
+export interface Page<T>
+{
+    items: T[];
+    next: string;
+}
+
+export class Pagination
+{
+    /**
+     * Returns whether the request asks for a page rather than the whole collection.
+     * @param query request query
+     */
+    public static isPaginated(query: {limit?: string, cursor?: string}): boolean
+    {
+        return query.limit !== undefined || query.cursor !== undefined;
+    }
+
+    /**
+     * Slices the page of the given collection selected by the limit and opaque cursor of the request.
+     * @param items whole collection, in a stable order
+     * @param query request query
+     */
+    public static paginate<T>(items: T[], query: {limit?: string, cursor?: string}): Page<T>
+    {
+        const limit = query.limit === undefined ? MAX_PAGE_SIZE : parseInt(query.limit);
+        const offset = query.cursor === undefined ? 0 : parseInt(Buffer.from(query.cursor, 'base64').toString());
+        if (!(limit > 0 && limit <= MAX_PAGE_SIZE) || !(offset >= 0)) {
+            throw new IllegalArgumentException();
+        }
+        const end = offset + limit;
+        return {
+            items: (items ?? []).slice(offset, end),
+            next: end < (items ?? []).length ? Buffer.from(String(end)).toString('base64') : null
+        };
+    }
+}
@@ -3,8 +3,18 @@ import { StorageEngine } from "multer";
 import { DockerVolumeProvider } from "./volume/DockerVolumeProvider";
 import { S3Provider } from "../storage/s3/S3Provider";
 import { RequestHandler } from "express";
+import { Readable } from "stream";
 import S3ClientProvider from "../../libs/client/aws/S3Client";
 
+/**
+ * Part of a chunked model upload.
+ */
+export interface UploadPart
+{
+    partNumber: number,
+    etag: string
+}
+
 /**
  * Interface for volume provider.
  */
@@ -30,6 +40,30 @@ export interface StorageProvider
      * Deletes objects under a given workspace.
      */
     deleteWorkspace: (workspaceId: string) => Promise<void>;
+    /**
+     * Starts a chunked upload of a model and returns its id.
+     */
+    createUpload: (workspaceId: string) => Promise<string>;
+    /**
+     * Stores a part of a chunked upload and returns its etag, parts may arrive in any order.
+     */
+    putPart: (workspaceId: string, uploadId: string, partNumber: number, body: Readable, size: number) => Promise<string>;
+    /**
+     * Assembles the parts of a chunked upload as the object moved by putObject.
+     */
+    completeUpload: (workspaceId: string, uploadId: string, parts: UploadPart[]) => Promise<void>;
+    /**
+     * Returns the digests of the given content-defined chunks the workspace doesn't store yet.
+     */
+    missingChunks: (workspaceId: string, digests: string[]) => Promise<string[]>;
+    /**
+     * Stores a chunk under its sha256 hex digest, a chunk not matching its digest is rejected.
+     */
+    putChunk: (workspaceId: string, digest: string, body: Readable, size: number) => Promise<void>;
+    /**
+     * Concatenates stored chunks as the object moved by putObject.
+     */
+    completeChunks: (workspaceId: string, digests: string[]) => Promise<void>;
 }
 
 export class StorageProviderFactory 
@@ -1,10 +1,14 @@
 import { Request, RequestHandler, Response } from 'express';
-import { StorageProvider } from "../StorageEngineProvider";
+import { StorageProvider, UploadPart } from "../StorageEngineProvider";
 import { StorageEngine } from "multer";
 import { appConfig } from "../../../libs/config/AppConfigProvider";
 import { AppConfigS3 } from "../../../libs/config/AppConfigStorage";
 import * as S3 from "aws-sdk/clients/s3";
+import { IllegalArgumentException } from "../../../commons/Errors";
+import { PassThrough, Readable, Transform } from "stream";
+import { v4 as uuidv4 } from 'uuid';
 import multerS3 = require('multer-s3');
+import * as crypto from 'crypto';
 
 /**
  * Docker volume provider.
@@ -86,4 +90,166 @@ export class S3Provider implements StorageProvider
     {
         
     }
+
+    /**
+     * Starts a S3 multipart upload to the temporary model key of the workspace.
+     * @param workspaceId workspace id.
+     * @returns upload id.
+     */
+    public async createUpload(workspaceId: string): Promise<string>
+    {
+        const config = appConfig.storage.config as AppConfigS3;
+        const upload = await this._s3Client.createMultipartUpload({
+            Bucket: config.bucket,
+            Key: `${config.root}/${workspaceId}/models/.tmp/model`,
+        }).promise();
+        return upload.UploadId;
+    }
+
+    /**
+     * Uploads a part of a S3 multipart upload.
+     * @param workspaceId workspace id.
+     * @param uploadId upload id.
+     * @param partNumber part number, starting from 1.
+     * @param body part content.
+     * @param size part size in bytes.
+     * @returns etag of the part.
+     */
+    public async putPart(workspaceId: string, uploadId: string, partNumber: number, body: Readable, size: number): Promise<string>
+    {
+        const config = appConfig.storage.config as AppConfigS3;
+        const part = await this._s3Client.uploadPart({
+            Bucket: config.bucket,
+            Key: `${config.root}/${workspaceId}/models/.tmp/model`,
+            UploadId: uploadId,
+            PartNumber: partNumber,
+            Body: body,
+            ContentLength: size,
+        }).promise();
+        return part.ETag;
+    }
+
+    /**
+     * Completes a S3 multipart upload.
+     * @param workspaceId workspace id.
+     * @param uploadId upload id.
+     * @param parts parts with their etags.
+     */
+    public async completeUpload(workspaceId: string, uploadId: string, parts: UploadPart[]): Promise<void>
+    {
+        const config = appConfig.storage.config as AppConfigS3;
+        await this._s3Client.completeMultipartUpload({
+            Bucket: config.bucket,
+            Key: `${config.root}/${workspaceId}/models/.tmp/model`,
+            UploadId: uploadId,
+            MultipartUpload: {
+                Parts: [...parts]
+                    .sort((a, b) => a.partNumber - b.partNumber)
+                    .map(part => ({ PartNumber: part.partNumber, ETag: part.etag })),
+            },
+        }).promise();
+    }
+
+    /**
+     * Returns the chunks which aren't stored under the chunks prefix of the workspace.
+     * @param workspaceId workspace id.
+     * @param digests sha256 hex digests of the chunks.
+     * @returns digests of the missing chunks.
+     */
+    public async missingChunks(workspaceId: string, digests: string[]): Promise<string[]>
+    {
+        const config = appConfig.storage.config as AppConfigS3;
+        const stored = await Promise.all(digests.map(digest => this._s3Client.headObject({
+            Bucket: config.bucket,
+            Key: this.getChunkKey(workspaceId, digest),
+        }).promise().then(() => true, () => false)));
+        return digests.filter((digest, i) => !stored[i]);
+    }
+
+    /**
+     * Uploads a chunk to a temporary key, then copies it under its digest once verified.
+     * @param workspaceId workspace id.
+     * @param digest sha256 hex digest of the chunk.
+     * @param body chunk content.
+     * @param size chunk size in bytes.
+     */
+    public async putChunk(workspaceId: string, digest: string, body: Readable, size: number): Promise<void>
+    {
+        const config = appConfig.storage.config as AppConfigS3;
+        const tempKey = `${config.root}/${workspaceId}/chunks/.tmp/${uuidv4()}`;
+        const hash = crypto.createHash('sha256');
+        const verify = new Transform({
+            transform(chunk, encoding, callback) {
+                hash.update(chunk);
+                callback(null, chunk);
+            }
+        });
+        await this._s3Client.putObject({
+            Bucket: config.bucket,
+            Key: tempKey,
+            Body: body.pipe(verify),
+            ContentLength: size,
+        }).promise();
+        try {
+            if (hash.digest('hex') !== digest) {
+                throw new IllegalArgumentException(`Chunk doesn't match digest ${digest}`);
+            }
+            await this._s3Client.copyObject({
+                Bucket: config.bucket,
+                CopySource: `${config.bucket}/${tempKey}`,
+                Key: this.getChunkKey(workspaceId, digest),
+            }).promise();
+        } finally {
+            await this._s3Client.deleteObject({ Bucket: config.bucket, Key: tempKey }).promise();
+        }
+    }
+
+    /**
+     * Streams the chunks one after the other into the temporary model key of the workspace.
+     * @param workspaceId workspace id.
+     * @param digests sha256 hex digests of the chunks, in order.
+     */
+    public async completeChunks(workspaceId: string, digests: string[]): Promise<void>
+    {
+        const config = appConfig.storage.config as AppConfigS3;
+        const missing = await this.missingChunks(workspaceId, [...new Set(digests)]);
+        if (missing.length > 0) {
+            throw new IllegalArgumentException(`Chunks ${missing.join(', ')} weren't uploaded`);
+        }
+        const body = new PassThrough();
+        const upload = this._s3Client.upload({
+            Bucket: config.bucket,
+            Key: `${config.root}/${workspaceId}/models/.tmp/model`,
+            Body: body,
+        }).promise();
+        try {
+            for (const digest of digests) {
+                await new Promise((resolve, reject) => {
+                    const input = this._s3Client.getObject({
+                        Bucket: config.bucket,
+                        Key: this.getChunkKey(workspaceId, digest),
+                    }).createReadStream();
+                    input.on('error', reject);
+                    input.on('end', resolve);
+                    input.pipe(body, { end: false });
+                });
+            }
+        } catch (err) {
+            body.destroy(err);
+            throw err;
+        }
+        body.end();
+        await upload;
+    }
+
+    /**
+     * Returns the key of a chunk, chunks are shared by the versions of a workspace.
+     * @param workspaceId workspace id.
+     * @param digest sha256 hex digest of the chunk.
+     */
+    private getChunkKey(workspaceId: string, digest: string): string
+    {
+        const config = appConfig.storage.config as AppConfigS3;
+        return `${config.root}/${workspaceId}/chunks/${digest}`;
+    }
 }
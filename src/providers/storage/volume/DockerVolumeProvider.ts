@@ -1,9 +1,16 @@
 import { Request, RequestHandler, Response } from 'express';
 import { StorageEngine } from "multer";
-import { StorageProvider } from "../StorageEngineProvider";
+import { StorageProvider, UploadPart } from "../StorageEngineProvider";
 import { appConfig } from "../../../libs/config/AppConfigProvider";
+import { IllegalArgumentException } from "../../../commons/Errors";
+import { Readable, Transform } from "stream";
+import { v4 as uuidv4 } from 'uuid';
 import * as multer from 'multer';
+import * as crypto from 'crypto';
+import * as fs from 'fs';
+import * as util from 'util';
 const fsPromises = require('fs').promises;
+const pipeline = util.promisify(require('stream').pipeline);
 
 /**
  * Docker volume provider.
@@ -84,4 +91,168 @@ export class DockerVolumeProvider implements StorageProvider
         const toDeletePath = root + `/${workspaceId}`;
         await fsPromises.rmdir(toDeletePath, { recursive: true, force: true });
     }
+
+    /**
+     * Starts a chunked upload in the temporary folder of the workspace.
+     * @param workspaceId workspace id.
+     * @returns upload id.
+     */
+    public async createUpload(workspaceId: string): Promise<string>
+    {
+        const uploadId = uuidv4();
+        await fsPromises.mkdir(this.getUploadPath(workspaceId, uploadId), { recursive: true });
+        return uploadId;
+    }
+
+    /**
+     * Writes a part of a chunked upload, a retried part replaces the previous attempt.
+     * @param workspaceId workspace id.
+     * @param uploadId upload id.
+     * @param partNumber part number, starting from 1.
+     * @param body part content.
+     * @param size expected part size in bytes.
+     * @returns md5 hex digest of the part.
+     */
+    public async putPart(workspaceId: string, uploadId: string, partNumber: number, body: Readable, size: number): Promise<string>
+    {
+        const partPath = `${this.getUploadPath(workspaceId, uploadId)}/${partNumber}`;
+        const hash = crypto.createHash('md5');
+        let received = 0;
+        const digest = new Transform({
+            transform(chunk, encoding, callback) {
+                hash.update(chunk);
+                received += chunk.length;
+                callback(null, chunk);
+            }
+        });
+        await pipeline(body, digest, fs.createWriteStream(partPath + '.tmp'));
+        if (received !== size) {
+            await fsPromises.unlink(partPath + '.tmp');
+            throw new IllegalArgumentException(`Part ${partNumber} has ${received} bytes, expected ${size}`);
+        }
+        await fsPromises.rename(partPath + '.tmp', partPath);
+        return hash.digest('hex');
+    }
+
+    /**
+     * Concatenates the parts of a chunked upload into the temporary model file.
+     * @param workspaceId workspace id.
+     * @param uploadId upload id.
+     * @param parts parts with their etags.
+     */
+    public async completeUpload(workspaceId: string, uploadId: string, parts: UploadPart[]): Promise<void>
+    {
+        const uploadPath = this.getUploadPath(workspaceId, uploadId);
+        const tempPath = appConfig.storage.config.root + `/${workspaceId}/models/.tmp/model`;
+        const sortedParts = [...parts].sort((a, b) => a.partNumber - b.partNumber);
+        const output = fs.createWriteStream(tempPath);
+        try {
+            for (const part of sortedParts) {
+                const hash = crypto.createHash('md5');
+                await new Promise((resolve, reject) => {
+                    const input = fs.createReadStream(`${uploadPath}/${part.partNumber}`);
+                    input.on('data', (chunk) => hash.update(chunk));
+                    input.on('error', reject);
+                    input.on('end', resolve);
+                    input.pipe(output, { end: false });
+                });
+                if (hash.digest('hex') !== part.etag) {
+                    throw new IllegalArgumentException(`Part ${part.partNumber} doesn't match etag ${part.etag}`);
+                }
+            }
+        } finally {
+            await new Promise((resolve) => output.end(resolve));
+        }
+        await fsPromises.rmdir(uploadPath, { recursive: true });
+    }
+
+    /**
+     * Returns the chunks which aren't in the chunk store of the workspace.
+     * @param workspaceId workspace id.
+     * @param digests sha256 hex digests of the chunks.
+     * @returns digests of the missing chunks.
+     */
+    public async missingChunks(workspaceId: string, digests: string[]): Promise<string[]>
+    {
+        const chunksPath = this.getChunksPath(workspaceId);
+        const stored = await Promise.all(digests.map(digest =>
+            fsPromises.stat(`${chunksPath}/${digest}`).then(() => true, () => false)));
+        return digests.filter((digest, i) => !stored[i]);
+    }
+
+    /**
+     * Writes a chunk to the chunk store of the workspace once its digest is verified.
+     * @param workspaceId workspace id.
+     * @param digest sha256 hex digest of the chunk.
+     * @param body chunk content.
+     * @param size expected chunk size in bytes.
+     */
+    public async putChunk(workspaceId: string, digest: string, body: Readable, size: number): Promise<void>
+    {
+        const chunksPath = this.getChunksPath(workspaceId);
+        await fsPromises.mkdir(chunksPath, { recursive: true });
+        const tempPath = `${chunksPath}/${digest}.${uuidv4()}.tmp`;
+        const hash = crypto.createHash('sha256');
+        let received = 0;
+        const verify = new Transform({
+            transform(chunk, encoding, callback) {
+                hash.update(chunk);
+                received += chunk.length;
+                callback(null, chunk);
+            }
+        });
+        await pipeline(body, verify, fs.createWriteStream(tempPath));
+        if (received !== size || hash.digest('hex') !== digest) {
+            await fsPromises.unlink(tempPath);
+            throw new IllegalArgumentException(`Chunk doesn't match digest ${digest}`);
+        }
+        await fsPromises.rename(tempPath, `${chunksPath}/${digest}`);
+    }
+
+    /**
+     * Concatenates chunks of the chunk store into the temporary model file.
+     * @param workspaceId workspace id.
+     * @param digests sha256 hex digests of the chunks, in order.
+     */
+    public async completeChunks(workspaceId: string, digests: string[]): Promise<void>
+    {
+        const chunksPath = this.getChunksPath(workspaceId);
+        const missing = await this.missingChunks(workspaceId, digests);
+        if (missing.length > 0) {
+            throw new IllegalArgumentException(`Chunks ${missing.join(', ')} weren't uploaded`);
+        }
+        const tempPath = appConfig.storage.config.root + `/${workspaceId}/models/.tmp/model`;
+        const output = fs.createWriteStream(tempPath);
+        try {
+            for (const digest of digests) {
+                await new Promise((resolve, reject) => {
+                    const input = fs.createReadStream(`${chunksPath}/${digest}`);
+                    input.on('error', reject);
+                    input.on('end', resolve);
+                    input.pipe(output, { end: false });
+                });
+            }
+        } finally {
+            await new Promise((resolve) => output.end(resolve));
+        }
+    }
+
+    /**
+     * Returns the folder holding the content-defined chunks of a workspace, shared by its versions.
+     * @param workspaceId workspace id.
+     */
+    private getChunksPath(workspaceId: string): string
+    {
+        return appConfig.storage.config.root + `/${workspaceId}/models/.chunks`;
+    }
+
+    /**
+     * Returns the folder holding the parts of a chunked upload.
+     * @param workspaceId workspace id.
+     * @param uploadId upload id.
+     */
+    private getUploadPath(workspaceId: string, uploadId: string): string
+    {
+        return appConfig.storage.config.root + `/${workspaceId}/models/.tmp/uploads/${uploadId}`;
+    }
 }
\ No newline at end of file
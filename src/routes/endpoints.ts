@@ -51,6 +51,14 @@ export class Routes
         app.post('/dsp/api/v1/:workspaceId/experiment', 
             multer({ storage: storageProvider.getStorageEngine() }).single('model'), 
             this.experimentController.createExperimentV1);
+        app.post('/dsp/api/v1/:workspaceId/uploads',
+            this.experimentController.createUploadV1);
+        app.put('/dsp/api/v1/:workspaceId/uploads/:uploadId/parts/:partNumber',
+            this.experimentController.uploadPartV1);
+        app.post('/dsp/api/v1/:workspaceId/chunks/missing',
+            this.experimentController.missingChunksV1);
+        app.put('/dsp/api/v1/:workspaceId/chunks/:digest',
+            this.experimentController.uploadChunkV1);
         app.get('/dsp/api/v1/:workspaceId/models/:version',
             storageProvider.getObjectProxy())
     }